@@ -1,15 +1,63 @@
 from fastapi import FastAPI
 app = FastAPI()
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 import sys
 import os
+import io
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Empyrion_Tool')))
 
 import Empyrion_Tool.search_empyrion_entities as search_empyrion_entities
 import Empyrion_Tool.copy_backup as copy_backup
+from empyrion_common import LRUCache, save_identity, shared_pool, entity_type_cache
+from prefab_catalog import open_catalog, refresh_catalog
 
 # MCP integration
 
+# Blocking SQLite work runs on this bounded pool; each save keeps a few read-only
+# connections open between requests in the shared pool from empyrion_common (sized by
+# EMPYRION_POOL_PER_DB, default 8 like the search workers), which also caches entity
+# type lookups for copy_backup.
+SEARCH_WORKERS = int(os.environ.get("EMPYRION_SEARCH_WORKERS", "8"))
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+
+# Search results are cached per normalized query and the identity (path, size, mtime of
+# global.db and its -wal) of every save involved, so any change to a save makes its old
+# entries unreachable; the LRU limits then age them out. Besides the number of cached
+# searches, the rows they hold together are limited, so large unpaged results cannot
+# fill the memory (a result larger than the whole limit is not cached at all).
+CACHE_SIZE = int(os.environ.get("EMPYRION_CACHE_SIZE", "256"))
+CACHE_ROWS = int(os.environ.get("EMPYRION_CACHE_ROWS", "200000"))
+result_cache = LRUCache(max_entries=CACHE_SIZE, max_weight=CACHE_ROWS, weigh=lambda page: len(page[0]))
+
+# show_prefabs joins results against an on-disk prefab catalog. Its changed files are
+# looked for at most every EMPYRION_PREFAB_REFRESH_SECONDS per prefabs directory.
+PREFAB_CATALOG = os.environ.get("EMPYRION_PREFAB_CATALOG", "prefab_catalog.db")
+PREFAB_REFRESH_SECONDS = float(os.environ.get("EMPYRION_PREFAB_REFRESH_SECONDS", "60"))
+prefab_lock = threading.Lock()
+prefab_catalog = None
+prefab_refreshed = {}
+
+def with_prefabs(rows, prefabs):
+    """Return rows as PrefabEntityRow records joined against the catalog of the prefabs directory."""
+    global prefab_catalog
+    if not prefabs or not os.path.isdir(prefabs):
+        raise ValueError(f"Prefabs directory does not exist: {prefabs}")
+    key = os.path.abspath(prefabs)
+    with prefab_lock:
+        if prefab_catalog is None:
+            prefab_catalog = open_catalog(PREFAB_CATALOG)
+        if time.monotonic() - prefab_refreshed.get(key, float("-inf")) > PREFAB_REFRESH_SECONDS:
+            refresh_catalog(prefab_catalog, prefabs)
+            prefab_refreshed[key] = time.monotonic()
+    # Lookups read the catalog on their own pooled read-only connection, so searches
+    # annotate concurrently and only wait for a refresh in progress
+    with shared_pool.connection(PREFAB_CATALOG) as conn:
+        return list(search_empyrion_entities.annotate_prefabs(rows, conn, prefabs))
+
 
 app = FastAPI()
 
@@ -24,8 +72,14 @@ def copy_backup_endpoint(
     dest_game: str = Body(...),
     dest_id: str = Body(...),
     saves: str = Body(r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Saves\Games"),
-    verbose: bool = Body(False)
+    verbose: bool = Body(False),
+    snapshot_dir: str = Body(None),
+    store: str = Body(None),
+    link_mode: str = Body("reflink"),
+    incremental: bool = Body(False)
 ):
+    if link_mode not in copy_backup.LINK_MODES:
+        raise HTTPException(status_code=400, detail=f"link_mode must be one of {', '.join(copy_backup.LINK_MODES)}")
     import argparse
     args = argparse.Namespace(
         src_game=src_game,
@@ -33,32 +87,53 @@ def copy_backup_endpoint(
         dest_game=dest_game,
         dest_id=dest_id,
         saves=saves,
-        verbose=verbose
+        verbose=verbose,
+        snapshot_dir=snapshot_dir,
+        store=store,
+        link_mode=link_mode,
+        incremental=incremental
     )
     # Setup logging for verbose
     copy_backup.setup_logging(verbose)
     result = copy_backup.copy_backup(args, saves)
     return {"success": result}
 
-# Endpoint for search_empyrion_entities (raw output)
-@app.post("/search_entities_raw")
-def search_entities_raw_endpoint(
-    id: int = Body(None),
-    name: str = Body(None),
-    list: bool = Body(False),
-    location: str = Body(None),
+# Endpoint for batch copy_backup: items is a list of {src_game, src_id, dest_game, dest_id}
+@app.post("/copy_backup_batch")
+def copy_backup_batch_endpoint(
+    items: list = Body(...),
     saves: str = Body(r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Saves\Games"),
-    games: str = Body(None),
-    game: str = Body(None),
-    prefabs: str = Body(r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Content\Prefabs"),
+    jobs: int = Body(8),
     verbose: bool = Body(False),
-    man: bool = Body(False),
-    type: str = Body(None),
-    owner: str = Body(None),
-    removed: bool = Body(False)
+    snapshot_dir: str = Body(None),
+    store: str = Body(None),
+    link_mode: str = Body("reflink"),
+    incremental: bool = Body(False)
 ):
+    try:
+        batch = [copy_backup.CopyItem(*(str(item[field]).strip() for field in copy_backup.CopyItem._fields)) for item in items]
+    except (KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Each item needs src_game, src_id, dest_game and dest_id: {e}")
+    copy_backup.setup_logging(verbose)
+    if link_mode not in copy_backup.LINK_MODES:
+        raise HTTPException(status_code=400, detail=f"link_mode must be one of {', '.join(copy_backup.LINK_MODES)}")
+    results = copy_backup.copy_backup_batch(batch, saves, jobs, snapshot_dir, store, link_mode, incremental)
+    succeeded = sum(1 for result in results if result["success"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+# Cache counters, for tuning EMPYRION_CACHE_SIZE and EMPYRION_CACHE_ROWS
+@app.get("/cache_stats")
+def cache_stats_endpoint():
+    return {**result_cache.stats(), "entity_types": entity_type_cache.stats()}
+
+def make_search_args(id, name, list, location, saves, games, game, prefabs, verbose, man, type, owner, removed, jobs, limit=None, cursor=None, show_prefabs=False):
+    """
+    Build the search_empyrion_entities arguments of a request. The requested jobs is
+    ignored: each search runs on one search_executor thread, so EMPYRION_SEARCH_WORKERS
+    bounds the threads and connections of all searches together.
+    """
     import argparse
-    args = argparse.Namespace(
+    return argparse.Namespace(
         id=id,
         name=name,
         list=list,
@@ -71,15 +146,103 @@ def search_entities_raw_endpoint(
         man=man,
         type=type,
         owner=owner,
-        removed=removed
+        removed=removed,
+        jobs=1,
+        limit=limit,
+        cursor=cursor,
+        show_prefabs=show_prefabs
+    )
+
+def search_cache_key(args, db_files):
+    """Cache key for a search: the normalized query plus the identity of every save searched."""
+    return (
+        "search", os.path.abspath(args.saves), args.id, args.name, bool(args.list), args.location, args.game,
+        args.games.lower() if args.games else None, args.type.upper() if args.type else None,
+        args.owner, bool(args.removed), args.limit, args.cursor,
+        tuple(save_identity(db_file) for db_file in db_files),
     )
+
+def run_search(args):
+    """
+    Run a search on the calling worker thread and return (rows, next_cursor).
+    With args.limit set only one keyset page is read; next_cursor is None on the last page.
+    With args.show_prefabs the (cached) rows are joined against the prefab catalog.
+    """
+    if not args.saves or not os.path.isdir(args.saves):
+        raise ValueError(f"Saves directory does not exist: {args.saves}")
+    db_files = search_empyrion_entities.find_save_databases(args.saves, args.game, args.games)
+    key = search_cache_key(args, db_files)
+    page = result_cache.get(key)
+    if page is None:
+        if args.limit is not None:
+            page = search_empyrion_entities.search_page(args, db_files, pool=shared_pool)
+        else:
+            page = (list(search_empyrion_entities.iter_entities(args, db_files, pool=shared_pool)), None)
+        result_cache.put(key, page)
+    if args.show_prefabs:
+        return with_prefabs(page[0], args.prefabs), page[1]
+    return page
+
+async def run_search_in_pool(args):
+    """Run the blocking SQLite search on the bounded search pool, mapping bad input to HTTP 400."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(search_executor, run_search, args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoint for search_empyrion_entities (structured JSON)
+@app.post("/search_entities")
+async def search_entities_endpoint(
+    id: int = Body(None),
+    name: str = Body(None),
+    list: bool = Body(False),
+    location: str = Body(None),
+    saves: str = Body(r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Saves\Games"),
+    games: str = Body(None),
+    game: str = Body(None),
+    prefabs: str = Body(r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Content\Prefabs"),
+    verbose: bool = Body(False),
+    type: str = Body(None),
+    owner: str = Body(None),
+    removed: bool = Body(False),
+    jobs: int = Body(1),
+    limit: int = Body(None),
+    cursor: str = Body(None),
+    show_prefabs: bool = Body(False)
+):
+    args = make_search_args(id, name, list, location, saves, games, game, prefabs, verbose, False, type, owner, removed, jobs, limit, cursor, show_prefabs)
+    search_empyrion_entities.setup_logging(verbose)
+    rows, next_cursor = await run_search_in_pool(args)
+    return {"count": len(rows), "results": [row._asdict() for row in rows], "next_cursor": next_cursor}
+
+# Endpoint for search_empyrion_entities (raw output)
+@app.post("/search_entities_raw")
+async def search_entities_raw_endpoint(
+    id: int = Body(None),
+    name: str = Body(None),
+    list: bool = Body(False),
+    location: str = Body(None),
+    saves: str = Body(r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Saves\Games"),
+    games: str = Body(None),
+    game: str = Body(None),
+    prefabs: str = Body(r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Content\Prefabs"),
+    verbose: bool = Body(False),
+    man: bool = Body(False),
+    type: str = Body(None),
+    owner: str = Body(None),
+    removed: bool = Body(False),
+    jobs: int = Body(1),
+    limit: int = Body(None),
+    cursor: str = Body(None),
+    show_prefabs: bool = Body(False)
+):
+    args = make_search_args(id, name, list, location, saves, games, game, prefabs, verbose, man, type, owner, removed, jobs, limit, cursor, show_prefabs)
     # Setup logging for verbose
     search_empyrion_entities.setup_logging(verbose)
-    # Instead of printing, collect results
-    import io, sys
-    old_stdout = sys.stdout
-    sys.stdout = mystdout = io.StringIO()
-    search_empyrion_entities.search_entities(args)
-    sys.stdout = old_stdout
-    output = mystdout.getvalue()
-    return {"output": output}
+    rows, next_cursor = await run_search_in_pool(args)
+    # Render the table into a per-request buffer instead of swapping the global sys.stdout
+    output = io.StringIO()
+    fields = search_empyrion_entities.PREFAB_OUTPUT_FIELDS if show_prefabs else search_empyrion_entities.OUTPUT_FIELDS
+    search_empyrion_entities.print_table(rows, out=output, fields=fields)
+    return {"output": output.getvalue(), "next_cursor": next_cursor}
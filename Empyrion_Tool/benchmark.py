@@ -0,0 +1,273 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import datetime
+import functools
+import statistics
+import contextlib
+from fake_saves import generate_saves, fake_blocks
+from empyrion_common import get_backup_path, get_entity_type
+import search_empyrion_entities
+import update_entities
+import copy_backup
+import read_blueprint
+import epb_blocks
+import blueprint_diff
+from hex_grid import HexGrid
+import flow_routing
+import hex_render
+import hex_tiles
+import world_gen
+
+# Repeatable benchmarks for the Empyrion tools, run against a generated fake save tree.
+# Results are written as JSON so runs from different versions can be compared.
+
+def search_args(saves, **overrides):
+    args = argparse.Namespace(
+        id=None, name=None, list=False, location=None, saves=saves, games=None, game=None,
+        prefabs=None, verbose=False, man=False, type=None, owner=None, removed=False, jobs=1
+    )
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
+def first_structure(db_path):
+    """Return (entityid, owner name) of the first owned structure in a save."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT e.entityid, o.name FROM Entities e JOIN Entities o ON o.entityid = e.facid "
+            "WHERE e.etype IN (3, 4, 5) ORDER BY e.entityid LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
+
+def time_case(func, repeat, setup=None):
+    """Run func repeat times (calling setup before each run, untimed) and return timing stats in seconds."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return {
+        "runs": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+    }
+
+def build_cases(games_dir, work_dir):
+    """
+    Return a dict of case name -> factory for the generated save tree. A factory builds its
+    case's fixtures and returns (func, setup), so only the selected cases pay for them.
+    """
+    @functools.cache
+    def save():
+        """Return (game, db_path, shared entity ids) of the first save."""
+        games = sorted(d for d in os.listdir(games_dir) if search_empyrion_entities.is_main_save_dir(d))
+        game = games[0]
+        shared_ids = sorted(os.listdir(os.path.join(games_dir, game, "Shared")), key=int)
+        return game, os.path.join(games_dir, game, "global.db"), shared_ids
+
+    @functools.cache
+    def copy_args():
+        # copy_backup needs two entities of the same type with a backup.epb in the source
+        game, db_path, shared_ids = save()
+        conn = sqlite3.connect(db_path)
+        try:
+            src_type = conn.execute("SELECT etype FROM Entities WHERE entityid = ?", (int(shared_ids[0]),)).fetchone()[0]
+            dest_id = conn.execute("SELECT entityid FROM Entities WHERE etype = ? AND entityid != ? LIMIT 1",
+                                   (src_type, int(shared_ids[0]))).fetchone()[0]
+        finally:
+            conn.close()
+        return argparse.Namespace(src_game=game, src_id=shared_ids[0], dest_game=game, dest_id=str(dest_id),
+                                  saves=games_dir, verbose=False)
+
+    @functools.cache
+    def blocks():
+        # A large capital vessel's worth of blocks
+        return fake_blocks(500000)
+
+    @functools.cache
+    def rebuilt():
+        # ...and a later version of it with a part of the hull rebuilt
+        rebuilt = fake_blocks(500000)
+        rebuilt["type_id"][::50] += 1
+        return rebuilt[rebuilt["y"] != 3]
+
+    @functools.cache
+    def flow_grid():
+        return HexGrid.generate(512, 512, seed=1)
+
+    world_dir = os.path.join(work_dir, "world")
+
+    def search(**overrides):
+        return lambda: (lambda: search_empyrion_entities.search_entities(search_args(games_dir, **overrides)), None)
+
+    def search_id():
+        entity_id, _ = first_structure(save()[1])
+        return search(id=entity_id)()
+
+    def search_owner():
+        _, owner = first_structure(save()[1])
+        return search(list=True, owner=owner)()
+
+    def update():
+        rename_db = os.path.join(work_dir, "rename.db")
+
+        def reset_rename_db():
+            shutil.copy2(save()[1], rename_db)
+            for name in os.listdir(work_dir):
+                if name.startswith("rename_backup_"):
+                    os.remove(os.path.join(work_dir, name))
+        return lambda: update_entities.update_entities(rename_db, progress=None), reset_rename_db
+
+    def entity_types():
+        game, _, shared_ids = save()
+        return lambda: [get_entity_type(games_dir, game, i) for i in shared_ids], None
+
+    def copy(**extra):
+        def factory():
+            args = argparse.Namespace(**vars(copy_args()), **extra)
+            return lambda: copy_backup.copy_backup(args, games_dir), None
+        return factory
+
+    def blueprint():
+        game, _, shared_ids = save()
+        path = get_backup_path(games_dir, game, shared_ids[0])
+        return lambda: read_blueprint.read_blueprint(path), None
+
+    def block_stats():
+        data = blocks()
+        return lambda: epb_blocks.summarize(data), None
+
+    def block_diff():
+        old, new = blocks(), rebuilt()
+        return lambda: blueprint_diff.diff_blocks(old, new), None
+
+    def flow_routing_case():
+        grid = flow_grid()
+        return lambda: flow_routing.route_flow(grid), None
+
+    def render_map():
+        grid = flow_grid()
+        return lambda: hex_render.render_map(grid), None
+
+    def render_tile():
+        def ensure_tile_world():
+            hex_tiles.ensure_world(work_dir, 1, max_zoom=2)
+        return lambda: hex_tiles.render_tile(hex_tiles.world_path(work_dir, 1, max_zoom=2), 2, 1, 2), ensure_tile_world
+
+    def render_world():
+        def ensure_world():
+            if not os.path.exists(os.path.join(world_dir, "world.json")):
+                world_gen.generate_world(world_dir, 1024, 1024, 1, chunk_size=512)
+        return lambda: world_gen.render_window(world_dir, 0, 0, 1024, 1024, max_pixels=256), ensure_world
+
+    return {
+        "search_id": search_id,
+        "search_name": search(name="Miner"),
+        "search_owner": search_owner,
+        "search_list": search(list=True),
+        "search_list_jobs": search(list=True, jobs=0),
+        "update_entities": update,
+        "get_entity_type": entity_types,
+        "copy_backup": copy(),
+        "copy_backup_store": copy(store=os.path.join(work_dir, "store"), link_mode="reflink"),
+        "copy_backup_incremental": copy(incremental=True),
+        "read_blueprint": blueprint,
+        "block_stats": block_stats,
+        "block_diff": block_diff,
+        "hex_grid": lambda: (lambda: HexGrid.generate(1024, 1024, seed=1), None),
+        "flow_routing": flow_routing_case,
+        "render_map": render_map,
+        "render_tile": render_tile,
+        "world_gen": lambda: (lambda: world_gen.generate_world(world_dir, 1024, 1024, 1, chunk_size=512), None),
+        # The same world as one chunk in this process: the baseline for the speedup of world_gen
+        "world_gen_single": lambda: (lambda: world_gen.generate_world(world_dir + "_single", 1024, 1024, 1, chunk_size=1024, jobs=1), None),
+        "render_world": render_world,
+        "scan_blueprints": lambda: (lambda: sum(len(scan.entries) for scan in read_blueprint.scan_blueprints(games_dir, jobs=1)), None),
+    }
+
+def run_benchmarks(games_dir, work_dir, repeat, only=None):
+    """Run every benchmark case (or only the named ones) and return the results dict."""
+    results = {}
+    for name, factory in build_cases(games_dir, work_dir).items():
+        if only and name not in only:
+            continue
+        try:
+            func, setup = factory()
+            results[name] = time_case(func, repeat, setup)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"{name:<24} {format_result(results[name])}")
+    return results
+
+def format_result(result):
+    if "error" in result:
+        return f"ERROR {result['error']}"
+    return f"median {result['median'] * 1000:10.2f} ms   min {result['min'] * 1000:10.2f} ms"
+
+def compare_results(baseline, current):
+    """Print the median time of each case relative to a baseline results file."""
+    print(f"\n{'case':<24} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "median" not in base or "median" not in result:
+            continue
+        ratio = result["median"] / base["median"] if base["median"] else float("inf")
+        print(f"{name:<24} {base['median'] * 1000:10.2f}ms {result['median'] * 1000:10.2f}ms {ratio:7.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Empyrion tools against a generated fake save tree.")
+    parser.add_argument('--root', default='bench_saves', help='Directory holding (or to hold) the fake save tree (default: bench_saves)')
+    parser.add_argument('--regenerate', action='store_true', help='Rebuild the fake save tree even if it exists')
+    parser.add_argument('--saves', type=int, default=5, help='Number of games to generate (default: 5)')
+    parser.add_argument('--entities', type=int, default=20000, help='Entities per save (default: 20000)')
+    parser.add_argument('--structures', type=int, default=5000, help='Structures per save (default: 5000)')
+    parser.add_argument('--blueprints', type=int, default=100, help='backup.epb files per save (default: 100)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case (default: 5)')
+    parser.add_argument('--case', action='append', help='Only run this case (may be repeated)')
+    parser.add_argument('--output', default='bench_results.json', help='Write results to this JSON file (default: bench_results.json)')
+    parser.add_argument('--compare', help='Compare against a previous results JSON file')
+    args = parser.parse_args()
+
+    games_dir = os.path.join(args.root, "Saves", "Games")
+    if args.regenerate and os.path.isdir(args.root):
+        shutil.rmtree(args.root)
+    if not os.path.isdir(games_dir):
+        print(f"Generating fake saves in {args.root} ...")
+        generate_saves(args.root, saves=args.saves, entities=args.entities, structures=args.structures,
+                       blueprints=args.blueprints, seed=args.seed)
+    work_dir = os.path.join(args.root, "work")
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "params": {"saves": args.saves, "entities": args.entities, "structures": args.structures,
+                   "blueprints": args.blueprints, "seed": args.seed, "repeat": args.repeat},
+        "results": run_benchmarks(games_dir, work_dir, args.repeat, args.case),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import os
+import sys
+import shutil
+import sqlite3
+import argparse
+import logging
+import threading
+from empyrion_common import file_identity
+from snapshot import hash_file, copy_hashed
+
+# Content-addressed store for backup.epb files.
+# Every file is kept once under objects/<first 2 hex>/<sha256>, and the save files that use
+# it are recorded in index.db with the size and mtime they had when written, so unchanged
+# files never have to be hashed again. Blobs are written into the store as a reflink
+# (copy-on-write clone) where the filesystem supports it and as a plain copy otherwise,
+# never as a hardlink: the game rewrites save files in place, which would change a blob
+# linked to one. Save files are checked out from the store the same way (link mode
+# "hardlink" is taken as "reflink"), after checking the blob against its digest, so one
+# rewritten save never changes another. gc drops blobs no save file refers to any more.
+
+# Linux FICLONE ioctl: clone the whole file, sharing extents until either side is written
+FICLONE = 0x40049409
+
+LINK_MODES = ("reflink", "hardlink", "copy")
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS refs (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_refs_digest ON refs (digest);
+"""
+
+def reflink(src_path, dest_path):
+    """Clone src_path to dest_path with FICLONE. Raises OSError where reflinks are not supported."""
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflinks are only supported on Linux")
+    import fcntl
+    with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        try:
+            fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dest.close()
+            os.remove(dest_path)
+            raise
+    shutil.copystat(src_path, dest_path)
+
+def try_link(src_path, dest_path, mode="reflink"):
+    """
+    Create dest_path as a link to src_path the way mode allows: "hardlink" tries a hardlink
+    then a reflink, "reflink" a reflink and "copy" nothing. Returns the method used, or None
+    if no link could be made. Raises ValueError for an unknown mode.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"link mode must be one of {', '.join(LINK_MODES)}, not '{mode}'")
+    attempts = {"hardlink": ["hardlink", "reflink"], "reflink": ["reflink"], "copy": []}[mode]
+    for attempt in attempts:
+        try:
+            if attempt == "hardlink":
+                os.link(src_path, dest_path)
+            else:
+                reflink(src_path, dest_path)
+            return attempt
+        except OSError as e:
+            logging.debug(f"{attempt} {src_path} -> {dest_path} not possible: {e}")
+    return None
+
+def link_or_copy(src_path, dest_path, mode="reflink"):
+    """
+    Put the content of src_path at dest_path, replacing it atomically, using the cheapest
+    method mode allows (see try_link) and falling back to a plain copy. Returns the method used.
+    Hardlinked files share one inode, so a tool that rewrites one in place changes all of
+    them; reflinks and copies do not have that problem. Raises ValueError for an unknown mode.
+    """
+    tmp_path = os.path.join(os.path.dirname(dest_path), f".{os.path.basename(dest_path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    method = try_link(src_path, tmp_path, mode)
+    if method is None:
+        method = "copy"
+        shutil.copy2(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+    return method
+
+def place_verified(src_path, dest_path, digest, mode="reflink", verify_link=False):
+    """
+    Link (see try_link) or copy src_path to dest_path through a staging file that is renamed
+    into place. A copy is hashed as it is written and must hash to digest; a link shares the
+    source's data, so it must have the source's size and the source must not have changed
+    meanwhile, and with verify_link that shared data must hash to digest too. Returns the
+    method used. Raises OSError, leaving dest_path untouched, if a check fails.
+    """
+    staging = os.path.join(os.path.dirname(dest_path), f".{os.path.basename(dest_path)}.{os.getpid()}.{threading.get_ident()}.staging")
+    before = file_identity(src_path)
+    try:
+        method = try_link(src_path, staging, mode) or "copy"
+        if method == "copy":
+            copied_digest, copied, written = copy_hashed(src_path, staging)
+            shutil.copystat(src_path, staging)
+            if written != copied:
+                raise OSError(f"Short write to {dest_path}: {written} of {copied} bytes")
+            if copied_digest != digest:
+                raise OSError(f"Checksum mismatch writing {dest_path}: expected {digest}, got {copied_digest}")
+        elif file_identity(src_path) != before or os.path.getsize(staging) != before[1]:
+            raise OSError(f"{src_path} changed while it was being linked to {dest_path}")
+        elif verify_link and hash_file(staging) != digest:
+            raise OSError(f"Checksum mismatch linking {dest_path}: {src_path} does not hash to {digest}")
+        os.replace(staging, dest_path)
+    except BaseException:
+        if os.path.lexists(staging):
+            os.remove(staging)
+        raise
+    return method
+
+class BlobStore:
+    """
+    Content-addressed blob store rooted at a directory. Thread-safe: the index connection
+    is shared and guarded by a lock, blobs are written under temporary names and renamed.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.root, "index.db"), check_same_thread=False)
+        # The index can always be rebuilt with ingest, so trade durability for fewer fsyncs
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(INDEX_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _record(self, path, digest):
+        identity = file_identity(path)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?)",
+                               (identity[0], digest, identity[1], identity[2]))
+
+    def digest_of(self, path):
+        """Return the SHA-256 of a file, reusing the recorded digest if its size and mtime are unchanged."""
+        identity = file_identity(path)
+        if identity is None:
+            raise FileNotFoundError(path)
+        with self._lock:
+            row = self._conn.execute("SELECT digest, size, mtime_ns FROM refs WHERE path = ?", (identity[0],)).fetchone()
+        if row and (row[1], row[2]) == identity[1:]:
+            return row[0]
+        return hash_file(path)
+
+    def put(self, path, mode="reflink"):
+        """
+        Add a file to the store (if its content is not there yet), record it as a reference and
+        return its digest. The blob is a reflink or a copy; mode "hardlink" stores a reflink.
+        Raises OSError if the blob written does not hash to the file's digest.
+        """
+        if mode not in LINK_MODES:
+            raise ValueError(f"link mode must be one of {', '.join(LINK_MODES)}, not '{mode}'")
+        digest = self.digest_of(path)
+        blob = self.blob_path(digest)
+        if not os.path.isfile(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            place_verified(path, blob, digest, "copy" if mode == "copy" else "reflink")
+            logging.debug(f"Stored {path} as blob {digest}")
+        self._record(path, digest)
+        return digest
+
+    def checkout(self, digest, dest_path, mode="reflink"):
+        """
+        Write blob digest to dest_path (atomically, checked against the digest) and record
+        the reference. Returns the method used. dest_path is a reflink or a copy, never a
+        hardlink (mode "hardlink" checks out a reflink), so rewriting it in place cannot
+        change the blob.
+        """
+        if mode not in LINK_MODES:
+            raise ValueError(f"link mode must be one of {', '.join(LINK_MODES)}, not '{mode}'")
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        method = place_verified(self.blob_path(digest), dest_path, digest,
+                                "copy" if mode == "copy" else "reflink", verify_link=True)
+        self._record(dest_path, digest)
+        return method
+
+    def copy(self, src_path, dest_path, mode="reflink"):
+        """Copy src_path to dest_path through the store. Returns (digest, method)."""
+        digest = self.put(src_path, mode)
+        return digest, self.checkout(digest, dest_path, mode)
+
+    def ingest(self, saves_root, mode="reflink", relink=False):
+        """
+        Add every Shared/<entityid>/backup.epb under saves_root to the store. With relink,
+        each file is then replaced by a link to its blob so identical files share storage.
+        Returns (files, distinct blobs).
+        """
+        digests = set()
+        files = 0
+        for game in sorted(os.listdir(saves_root)):
+            shared = os.path.join(saves_root, game, "Shared")
+            if not os.path.isdir(shared):
+                continue
+            for entity_id in sorted(os.listdir(shared)):
+                path = os.path.join(shared, entity_id, "backup.epb")
+                if not os.path.isfile(path):
+                    continue
+                digest = self.put(path, mode)
+                if relink:
+                    self.checkout(digest, path, mode)
+                digests.add(digest)
+                files += 1
+        return files, len(digests)
+
+    def gc(self, dry_run=False):
+        """
+        Drop references to files that are gone or now hold other content, then remove
+        every blob nothing refers to. Returns (blobs removed, bytes freed).
+        """
+        with self._lock:
+            refs = self._conn.execute("SELECT path, digest, size, mtime_ns FROM refs").fetchall()
+        stale = []
+        for path, digest, size, mtime_ns in refs:
+            identity = file_identity(path)
+            if identity is None:
+                stale.append(path)
+            elif identity[1:] != (size, mtime_ns):
+                if hash_file(path) == digest:
+                    self._record(path, digest)
+                else:
+                    stale.append(path)
+        if not dry_run:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM refs WHERE path = ?", ((path,) for path in stale))
+        with self._lock:
+            live = {row[0] for row in self._conn.execute("SELECT DISTINCT digest FROM refs")}
+        if dry_run:
+            live = {digest for path, digest, _, _ in refs if path not in stale}
+
+        removed = freed = 0
+        objects = os.path.join(self.root, "objects")
+        for prefix in sorted(os.listdir(objects)):
+            for digest in sorted(os.listdir(os.path.join(objects, prefix))):
+                if digest in live:
+                    continue
+                blob = os.path.join(objects, prefix, digest)
+                removed += 1
+                freed += os.path.getsize(blob)
+                if not dry_run:
+                    os.remove(blob)
+                    logging.debug(f"Removed unreferenced blob {digest}")
+        return removed, freed
+
+    def stats(self):
+        """Return counts and sizes of the references and blobs in the store."""
+        with self._lock:
+            refs, referenced = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM refs").fetchone()
+        blobs = stored = 0
+        objects = os.path.join(self.root, "objects")
+        for prefix in os.listdir(objects):
+            for digest in os.listdir(os.path.join(objects, prefix)):
+                blobs += 1
+                stored += os.path.getsize(os.path.join(objects, prefix, digest))
+        return {"refs": refs, "referenced_bytes": referenced, "blobs": blobs, "stored_bytes": stored}
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed store for Empyrion backup.epb files.")
+    parser.add_argument('store', help='Blob store directory')
+    parser.add_argument('--verbose', action='store_true', help='Enable debug logging')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest = commands.add_parser('ingest', help='Add every Shared/<id>/backup.epb of a Saves/Games directory to the store')
+    ingest.add_argument('saves', help='Path to the Saves/Games directory')
+    ingest.add_argument('--relink', action='store_true', help='Replace each file with a reflink or copy of its blob (game must be stopped)')
+    ingest.add_argument('--link-mode', choices=LINK_MODES, default='reflink', help='How files are linked to blobs: reflink or copy; hardlink is taken as reflink (default: reflink, falling back to a copy)')
+    gc = commands.add_parser('gc', help='Remove blobs that no save file refers to any more')
+    gc.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+    commands.add_parser('stats', help='Show the size of the store')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    store = BlobStore(args.store)
+    try:
+        if args.command == 'ingest':
+            files, blobs = store.ingest(args.saves, args.link_mode, args.relink)
+            print(f"Stored {files} files as {blobs} distinct blobs in {store.root}")
+        elif args.command == 'gc':
+            removed, freed = store.gc(args.dry_run)
+            print(f"{'Would remove' if args.dry_run else 'Removed'} {removed} unreferenced blobs ({freed} bytes)")
+        else:
+            for key, value in store.stats().items():
+                print(f"{key:<17} {value}")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
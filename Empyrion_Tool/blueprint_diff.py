@@ -0,0 +1,116 @@
+import os
+import sys
+import argparse
+import numpy as np
+from collections import namedtuple
+from epb_blocks import BLOCK_DTYPE, load_blocks, value_counts
+
+# Block-level diff of two versions of a blueprint, e.g. a vessel's backup.epb before and
+# after copy_backup replaced it. Positions are packed into one uint64 key per block so both
+# versions can be matched with sorted, vectorized set operations instead of nested loops.
+
+RETYPED_DTYPE = np.dtype([("x", "<i2"), ("y", "<i2"), ("z", "<i2"), ("old_type", "<u2"), ("new_type", "<u2")])
+
+# added and removed are BLOCK_DTYPE arrays, retyped a RETYPED_DTYPE array; all sorted by position
+BlueprintDiff = namedtuple("BlueprintDiff", ["added", "removed", "retyped", "unchanged"])
+
+def pack_positions(blocks):
+    """Return one uint64 key per block with its x, y and z (offset to unsigned 16 bits) packed together."""
+    return ((blocks["x"].astype(np.int64) + 32768) << 32 |
+            (blocks["y"].astype(np.int64) + 32768) << 16 |
+            (blocks["z"].astype(np.int64) + 32768)).astype(np.uint64)
+
+def sorted_by_position(blocks):
+    """Return (keys, blocks) sorted by packed position, keeping the last block where a position repeats."""
+    keys = pack_positions(blocks)
+    # Reverse first so np.unique's first occurrence is the last block written at a position
+    keys, first = np.unique(keys[::-1], return_index=True)
+    return keys, blocks[::-1][first]
+
+def diff_blocks(old, new):
+    """Compare two BLOCK_DTYPE arrays and return a BlueprintDiff."""
+    old_keys, old = sorted_by_position(old)
+    new_keys, new = sorted_by_position(new)
+    _, old_common, new_common = np.intersect1d(old_keys, new_keys, assume_unique=True, return_indices=True)
+
+    removed_mask = np.ones(len(old), dtype=bool)
+    removed_mask[old_common] = False
+    added_mask = np.ones(len(new), dtype=bool)
+    added_mask[new_common] = False
+
+    changed = old["type_id"][old_common] != new["type_id"][new_common]
+    old_changed, new_changed = old[old_common[changed]], new[new_common[changed]]
+    retyped = np.empty(len(old_changed), dtype=RETYPED_DTYPE)
+    for axis in ("x", "y", "z"):
+        retyped[axis] = old_changed[axis]
+    retyped["old_type"] = old_changed["type_id"]
+    retyped["new_type"] = new_changed["type_id"]
+    return BlueprintDiff(new[added_mask], old[removed_mask], retyped, int(len(old_common) - changed.sum()))
+
+def type_changes(old, new):
+    """Return (type_ids, old counts, new counts) for every block type whose count differs between the versions."""
+    old_types, old_counts = value_counts(old["type_id"])
+    new_types, new_counts = value_counts(new["type_id"])
+    type_ids = np.union1d(old_types, new_types)
+    old_full = np.zeros(len(type_ids), dtype=np.int64)
+    new_full = np.zeros(len(type_ids), dtype=np.int64)
+    old_full[np.searchsorted(type_ids, old_types)] = old_counts
+    new_full[np.searchsorted(type_ids, new_types)] = new_counts
+    differs = old_full != new_full
+    return type_ids[differs], old_full[differs], new_full[differs]
+
+def load_any(path, cache_dir=None):
+    """Load a blueprint's blocks from an .epb (through epbtools) or from a saved .npy array."""
+    if path.lower().endswith(".npy"):
+        blocks = np.load(path)
+        if blocks.dtype != BLOCK_DTYPE:
+            raise ValueError(f"{path} does not hold a block array")
+        return blocks
+    return load_blocks(path, cache_dir)
+
+def print_diff_summary(diff, old, new, top=10, out=None):
+    """Print the number of added, removed and retyped blocks and the block types whose counts changed most."""
+    print(f"Blocks: {len(old)} -> {len(new)}", file=out)
+    print(f"  added:     {len(diff.added):>8}", file=out)
+    print(f"  removed:   {len(diff.removed):>8}", file=out)
+    print(f"  retyped:   {len(diff.retyped):>8}", file=out)
+    print(f"  unchanged: {diff.unchanged:>8}", file=out)
+    type_ids, old_counts, new_counts = type_changes(old, new)
+    if len(type_ids):
+        order = np.argsort(-np.abs(new_counts - old_counts), kind="stable")[:top]
+        print("\nLargest block type changes:", file=out)
+        for i in order:
+            print(f"  {type_ids[i]:>6}  {old_counts[i]:>8} -> {new_counts[i]:<8} ({new_counts[i] - old_counts[i]:+d})", file=out)
+
+def print_diff_blocks(diff, out=None):
+    """Print one line per changed block: + added, - removed, ~ retyped (old type -> new type)."""
+    for b in diff.removed.tolist():
+        print(f"- ({b[1]}, {b[2]}, {b[3]}) {b[0]}", file=out)
+    for b in diff.added.tolist():
+        print(f"+ ({b[1]}, {b[2]}, {b[3]}) {b[0]}", file=out)
+    for b in diff.retyped.tolist():
+        print(f"~ ({b[0]}, {b[1]}, {b[2]}) {b[3]} -> {b[4]}", file=out)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the block differences between two versions of an Empyrion blueprint.")
+    parser.add_argument('old', help='Old blueprint (.epb, or a .npy block array)')
+    parser.add_argument('new', help='New blueprint (.epb, or a .npy block array)')
+    parser.add_argument('--blocks', action='store_true', help='List every added (+), removed (-) and retyped (~) block instead of the summary')
+    parser.add_argument('--top', type=int, default=10, help='Number of block types listed in the summary (default: 10)')
+    parser.add_argument('--cache-dir', help='Cache the parsed block arrays of .epb files in this directory')
+    args = parser.parse_args()
+
+    old = load_any(args.old, args.cache_dir)
+    new = load_any(args.new, args.cache_dir)
+    diff = diff_blocks(old, new)
+    try:
+        if args.blocks:
+            print_diff_blocks(diff)
+        else:
+            print_diff_summary(diff, old, new, args.top)
+    except BrokenPipeError:
+        # The reader (e.g. head) went away; stop quietly like other command line tools
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 import os
+import csv
+import json
 import shutil
+import threading
 import argparse
 import sqlite3
 import logging
-from empyrion_common import get_backup_path, get_entity_type, etype_to_abbr
+from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from empyrion_common import get_backup_path, get_entity_type, get_entity_types, etype_to_abbr
+from snapshot import snapshot_database, snapshot_file, hash_file, copy_hashed
+from blob_store import BlobStore, LINK_MODES
 
 # Logging setup
 def setup_logging(verbose):
@@ -14,14 +21,83 @@ def setup_logging(verbose):
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
-def copy_backup(args, saves_root):
+def files_identical(src_path, dest_path):
+    """
+    Return (identical, src_digest) for two files. Different sizes mean different files and
+    equal size and mtime (copy2 and copy_verified keep the mtime) mean identical ones;
+    otherwise both are hashed and src_digest is the source's SHA-256. A file that cannot be
+    read counts as different, so the copy goes ahead and reports the error.
+    """
+    try:
+        src_stat, dest_stat = os.stat(src_path), os.stat(dest_path)
+        if src_stat.st_size != dest_stat.st_size:
+            return False, None
+        if src_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+            return True, None
+        src_digest = hash_file(src_path)
+        return src_digest == hash_file(dest_path), src_digest
+    except OSError:
+        return False, None
+
+def copy_verified(src_path, dest_path, expected_digest=None):
+    """
+    Copy src_path to dest_path through a temporary file in the destination folder that is
+    renamed into place, hashing the data as it is copied (there is no second read pass).
+    The destination is left untouched (and OSError raised) if the source changed during
+    the copy, fewer bytes were written than read, or the data does not match
+    expected_digest. Returns the SHA-256 of the copied data.
+    """
+    tmp_path = os.path.join(os.path.dirname(dest_path), f".{os.path.basename(dest_path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    before = os.stat(src_path)
+    try:
+        digest, copied, written = copy_hashed(src_path, tmp_path)
+        after = os.stat(src_path)
+        if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns) or copied != before.st_size:
+            raise OSError(f"{src_path} changed while it was being copied")
+        if written != copied:
+            raise OSError(f"Short write to {dest_path}: {written} of {copied} bytes")
+        if expected_digest and digest != expected_digest:
+            raise OSError(f"Checksum mismatch copying {src_path}: expected {expected_digest}, got {digest}")
+        shutil.copystat(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest
+
+def copy_file(src_path, dest_path, store=None, link_mode="reflink", src_digest=None):
+    """
+    Copy src_path to dest_path, through the BlobStore store if given so the destination
+    becomes a reflink to the stored blob where possible (the store checks every file it
+    writes against the blob's digest), and with copy_verified (also checked against
+    src_digest if known) otherwise. Raises OSError if a check fails. Returns the method used.
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    if store is None:
+        copy_verified(src_path, dest_path, src_digest)
+        return "copy"
+    digest, method = store.copy(src_path, dest_path, link_mode)
+    logging.debug(f"{dest_path} is blob {digest} ({method})")
+    return method
+
+def copy_backup(args, saves_root, entity_type_lookup=get_entity_type):
+    """
+    Copy the source entity's backup.epb over the destination's after checking both exist
+    and have the same type. entity_type_lookup(saves_root, game, entity_id) can be replaced
+    by a caching lookup in long-running callers. If args.snapshot_dir is set, the
+    destination game's global.db and the backup.epb being replaced are snapshotted first.
+    If args.store is set, the copy goes through that blob store (see blob_store.py).
+    With args.incremental nothing is snapshotted or written when the destination is
+    already identical to the source.
+    """
     src_path = get_backup_path(saves_root, args.src_game, args.src_id)
     dest_path = get_backup_path(saves_root, args.dest_game, args.dest_id)
     logging.debug(f"Source path: {src_path}")
     logging.debug(f"Destination path: {dest_path}")
     # Check entity types in their respective databases
-    src_type = get_entity_type(saves_root, args.src_game, args.src_id)
-    dest_type = get_entity_type(saves_root, args.dest_game, args.dest_id)
+    src_type = entity_type_lookup(saves_root, args.src_game, args.src_id)
+    dest_type = entity_type_lookup(saves_root, args.dest_game, args.dest_id)
     logging.debug(f"Source entity type: {src_type}")
     logging.debug(f"Destination entity type: {dest_type}")
     if src_type is None:
@@ -40,24 +116,193 @@ def copy_backup(args, saves_root):
         logging.error(f"Source backup.ebp not found: {src_path}")
         print(f"Source backup.ebp not found: {src_path}")
         return False
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-    shutil.copy2(src_path, dest_path)
+    identical, src_digest = files_identical(src_path, dest_path) if getattr(args, 'incremental', False) else (False, None)
+    if identical:
+        logging.info(f"Skipped {dest_path}: already identical to {src_path}")
+        print(f"Skipped {dest_path}: already identical to {src_path} (type: {etype_to_abbr(src_type)})")
+        return True
+    snapshot_dir = getattr(args, 'snapshot_dir', None)
+    if snapshot_dir:
+        dest_db = os.path.join(saves_root, args.dest_game, 'global.db')
+        db_snapshot = snapshot_database(dest_db, snapshot_dir, stem=f"{args.dest_game}_global.db")
+        logging.info(f"Snapshot of {dest_db}: {db_snapshot}")
+        if os.path.isfile(dest_path):
+            epb_snapshot = snapshot_file(dest_path, snapshot_dir, stem=f"{args.dest_game}_{args.dest_id}_backup.epb")
+            logging.info(f"Snapshot of {dest_path}: {epb_snapshot}")
+    store = BlobStore(args.store) if getattr(args, 'store', None) else None
+    try:
+        copy_file(src_path, dest_path, store, getattr(args, 'link_mode', None) or "reflink", src_digest=src_digest)
+    finally:
+        if store:
+            store.close()
     logging.info(f"Copied {src_path} to {dest_path} (type: {etype_to_abbr(src_type)})")
     print(f"Copied {src_path} to {dest_path} (type: {etype_to_abbr(src_type)})")
     return True
 
+# One copy in a batch manifest
+CopyItem = namedtuple("CopyItem", ["src_game", "src_id", "dest_game", "dest_id"])
+
+def load_manifest(path):
+    """
+    Read a batch manifest of (src game, src id, dest game, dest id) items.
+    JSON manifests hold a list of objects with src_game/src_id/dest_game/dest_id keys (or
+    4-element lists); anything else is read as CSV with those four columns and an optional
+    header row.
+    """
+    with open(path, newline='') as f:
+        text = f.read()
+    if path.lower().endswith('.json'):
+        entries = json.loads(text)
+        rows = [[e[k] for k in CopyItem._fields] if isinstance(e, dict) else e for e in entries]
+    else:
+        rows = [row for row in csv.reader(text.splitlines()) if row and not row[0].startswith('#')]
+        if rows and [c.strip().lower() for c in rows[0]] == list(CopyItem._fields):
+            rows = rows[1:]
+    items = []
+    for row in rows:
+        if len(row) != 4:
+            raise ValueError(f"Manifest entry must have 4 fields (src_game, src_id, dest_game, dest_id): {row}")
+        items.append(CopyItem(*(str(value).strip() for value in row)))
+    return items
+
+def check_copy(item, src_type, dest_type, src_path):
+    """Return the reason a copy may not go ahead, or None if it can."""
+    if src_type is None:
+        return f"Source entity ID {item.src_id} not found in {item.src_game} database."
+    if dest_type is None:
+        return f"Destination entity ID {item.dest_id} not found in {item.dest_game} database."
+    if src_type != dest_type:
+        return f"Entity type mismatch. Source ID {item.src_id} type: {etype_to_abbr(src_type)}, Destination ID {item.dest_id} type: {etype_to_abbr(dest_type)}"
+    if not os.path.isfile(src_path):
+        return f"Source backup.ebp not found: {src_path}"
+    return None
+
+def copy_backup_batch(items, saves_root, jobs=8, snapshot_dir=None, store=None, link_mode="reflink", incremental=False):
+    """
+    Copy many backup.epb files. Entity types are validated up front with one query per
+    database, then the valid copies run concurrently on a pool of jobs threads, through
+    the blob store directory store if given. With incremental, destinations already
+    identical to their source are skipped (and not snapshotted). A failure of one item
+    or game (including a locked or corrupt save) only fails the items it affects.
+    Returns one result dict per item, in manifest order.
+    """
+    ids_by_game = defaultdict(set)
+    for item in items:
+        ids_by_game[item.src_game].add(item.src_id)
+        ids_by_game[item.dest_game].add(item.dest_id)
+    types = {}
+    lookup_errors = {}
+    for game, ids in ids_by_game.items():
+        try:
+            types[game] = get_entity_types(saves_root, game, ids)
+        except Exception as e:
+            logging.error(f"Entity type lookup in {game} failed: {e}")
+            types[game] = {}
+            lookup_errors[game] = f"Entity type lookup in {game} failed: {e}"
+    logging.debug(f"Looked up {sum(len(ids) for ids in ids_by_game.values())} entity types in {len(types)} databases")
+
+    results = []
+    todo = []
+    dest_paths = {}
+    for index, item in enumerate(items):
+        src_type = types[item.src_game].get(item.src_id)
+        dest_type = types[item.dest_game].get(item.dest_id)
+        src_path = get_backup_path(saves_root, item.src_game, item.src_id)
+        dest_path = get_backup_path(saves_root, item.dest_game, item.dest_id)
+        error = lookup_errors.get(item.src_game) or lookup_errors.get(item.dest_game) or check_copy(item, src_type, dest_type, src_path)
+        if error is None and dest_path in dest_paths:
+            error = f"Destination {item.dest_game}/{item.dest_id} is already written by manifest entry {dest_paths[dest_path] + 1}."
+        results.append({**item._asdict(), "type": etype_to_abbr(src_type) if src_type else None,
+                        "success": False, "unchanged": False, "message": error or ""})
+        if error is None:
+            dest_paths[dest_path] = index
+            todo.append((index, src_path, dest_path, None))
+
+    def run_copy(task):
+        index, src_path, dest_path, src_digest = task
+        item = items[index]
+        try:
+            if snapshot_dir and os.path.isfile(dest_path):
+                snapshot_file(dest_path, snapshot_dir, stem=f"{item.dest_game}_{item.dest_id}_backup.epb")
+            method = copy_file(src_path, dest_path, blob_store, link_mode, src_digest=src_digest)
+            return True, f"Copied {src_path} to {dest_path}" + (f" ({method})" if blob_store else "")
+        except Exception as e:
+            # One bad item (unreadable file, locked or corrupt save) must not stop the batch
+            logging.error(f"Copy {src_path} -> {dest_path} failed: {e}")
+            return False, f"Copy failed: {e}"
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        if incremental:
+            changed = []
+            for (index, src_path, dest_path, _), (identical, src_digest) in zip(todo, executor.map(lambda task: files_identical(task[1], task[2]), todo)):
+                if identical:
+                    results[index].update(success=True, unchanged=True, message=f"Skipped {dest_path}: already identical")
+                else:
+                    changed.append((index, src_path, dest_path, src_digest))
+            todo = changed
+
+        if snapshot_dir and todo:
+            # Copies into a game whose database could not be snapshotted are not made
+            failed_games = {}
+            for game in sorted({items[index].dest_game for index, _, _, _ in todo}):
+                dest_db = os.path.join(saves_root, game, 'global.db')
+                try:
+                    logging.info(f"Snapshot of {dest_db}: {snapshot_database(dest_db, snapshot_dir, stem=f'{game}_global.db')}")
+                except Exception as e:
+                    logging.error(f"Snapshot of {dest_db} failed: {e}")
+                    failed_games[game] = f"Snapshot of {game}/global.db failed: {e}"
+            for index, _, _, _ in todo:
+                if items[index].dest_game in failed_games:
+                    results[index]["message"] = failed_games[items[index].dest_game]
+            todo = [task for task in todo if items[task[0]].dest_game not in failed_games]
+
+        blob_store = BlobStore(store) if store and todo else None
+        try:
+            for (index, _, _, _), (success, message) in zip(todo, executor.map(run_copy, todo)):
+                results[index]["success"] = success
+                results[index]["message"] = message
+        finally:
+            if blob_store:
+                blob_store.close()
+    return results
+
+def print_batch_report(results):
+    """Print one line per batch item and a summary."""
+    for number, result in enumerate(results, 1):
+        status = "OK  " if result["success"] else "FAIL"
+        print(f"{number:>4} {status} {result['src_game']}/{result['src_id']} -> {result['dest_game']}/{result['dest_id']}: {result['message']}")
+    succeeded = sum(1 for result in results if result["success"])
+    unchanged = sum(1 for result in results if result.get("unchanged"))
+    print(f"{succeeded} of {len(results)} copies succeeded ({unchanged} already identical), {len(results) - succeeded} failed.")
+
 def main():
     parser = argparse.ArgumentParser(description="Copy Empyrion backup.ebp between games/entities.")
-    parser.add_argument('--src-game', required=True, help='Source game name')
-    parser.add_argument('--src-id', required=True, help='Source entity ID')
-    parser.add_argument('--dest-game', required=True, help='Destination game name')
-    parser.add_argument('--dest-id', required=True, help='Destination entity ID')
+    parser.add_argument('--src-game', help='Source game name')
+    parser.add_argument('--src-id', help='Source entity ID')
+    parser.add_argument('--dest-game', help='Destination game name')
+    parser.add_argument('--dest-id', help='Destination entity ID')
+    parser.add_argument('--manifest', help='Copy every (src_game, src_id, dest_game, dest_id) entry of this CSV or JSON file instead')
+    parser.add_argument('--jobs', type=int, default=8, help='With --manifest: number of copies run concurrently (default: 8)')
+    parser.add_argument('--report', help='With --manifest: also write the per-item results to this JSON file')
     parser.add_argument('--saves', default=r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Saves\Games", help='Path to saves folder (default: C:\\SteamLibrary\\steamapps\\common\\Empyrion - Galactic Survival\\Saves\\Games)')
+    parser.add_argument('--snapshot-dir', help='Snapshot the destination global.db and backup.epb into this directory before copying')
+    parser.add_argument('--store', help='Copy through this content-addressed blob store so identical backup.epb files share storage')
+    parser.add_argument('--link-mode', choices=LINK_MODES, default='reflink', help='With --store: reflink (copy-on-write clone) or copy; hardlink is taken as reflink, and a reflink falls back to a copy where unsupported (default: reflink)')
+    parser.add_argument('--incremental', action='store_true', help='Skip destinations that are already identical to the source (size and mtime, then SHA-256)')
     parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
     args = parser.parse_args()
 
     setup_logging(args.verbose)
     logging.debug(f"Arguments: {args}")
+    if args.manifest:
+        results = copy_backup_batch(load_manifest(args.manifest), args.saves, args.jobs, args.snapshot_dir, args.store, args.link_mode, args.incremental)
+        print_batch_report(results)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(results, f, indent=2)
+        return
+    if not (args.src_game and args.src_id and args.dest_game and args.dest_id):
+        parser.error("--src-game, --src-id, --dest-game and --dest-id are required unless --manifest is given")
     copy_backup(args, args.saves)
 
 if __name__ == "__main__":
@@ -11,12 +11,210 @@ def etype_abbr_to_id(abbr):
     }
     return abbr_map.get(abbr.upper())
 import os
+import json
 import sqlite3
+import logging
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.request import pathname2url
 
 def get_backup_path(saves_root, game, entity_id):
     """Return the path to backup.epb for a given game and entity."""
     return os.path.join(saves_root, game, 'Shared', entity_id, 'backup.epb')
 
+def connect_readonly(db_path):
+    """Open a read-only connection to a save database that may be shared across threads."""
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+class ConnectionPool:
+    """
+    Thread-safe pool of read-only connections. At most max_per_db connections to each
+    database file are borrowed at a time (further borrowers wait for one to be returned),
+    and up to max_per_db of them (max_idle in total) are kept idle so repeated lookups and
+    searches skip connect and schema load. Connections left idle for more than
+    idle_timeout seconds are closed the next time the pool is used.
+    """
+    def __init__(self, max_per_db=4, max_idle=32, idle_timeout=300):
+        self.max_per_db = max_per_db
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._returned = threading.Condition(self._lock)
+        self._idle = OrderedDict()  # db path -> [(conn, returned_at)], least recently used first
+        self._borrowed = {}  # db path -> number of connections borrowed
+        self._watchers = {}  # db path -> (conn, file identity), see data_version()
+
+    def _evict(self, now):
+        """Pop idle connections that timed out or exceed max_idle. Call with the lock held; returns them for closing."""
+        evicted = []
+        for key in list(self._idle):
+            fresh = [(conn, t) for conn, t in self._idle[key] if now - t <= self.idle_timeout]
+            evicted.extend(conn for conn, t in self._idle[key] if now - t > self.idle_timeout)
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+        total = sum(len(idle) for idle in self._idle.values())
+        while total > self.max_idle:
+            key, idle = next(iter(self._idle.items()))
+            evicted.append(idle.pop(0)[0])
+            if not idle:
+                del self._idle[key]
+            total -= 1
+        return evicted
+
+    @contextmanager
+    def connection(self, db_path):
+        """
+        Borrow a read-only connection to db_path, waiting while max_per_db are already
+        borrowed, and return it to the pool afterwards.
+        """
+        key = os.path.abspath(db_path)
+        with self._returned:
+            while self._borrowed.get(key, 0) >= self.max_per_db:
+                self._returned.wait()
+            self._borrowed[key] = self._borrowed.get(key, 0) + 1
+            evicted = self._evict(time.monotonic())
+            idle = self._idle.get(key)
+            conn = idle.pop()[0] if idle else None
+        try:
+            for old in evicted:
+                old.close()
+            if conn is None:
+                conn = connect_readonly(key)
+            yield conn
+        except BaseException:
+            # Don't return a connection that may be mid-statement or broken
+            if conn is not None:
+                conn.close()
+            raise
+        else:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                self._idle.move_to_end(key)
+                if len(idle) < self.max_per_db:
+                    idle.append((conn, time.monotonic()))
+                    conn = None
+                evicted = self._evict(time.monotonic())
+            for old in evicted + ([conn] if conn is not None else []):
+                old.close()
+        finally:
+            with self._returned:
+                self._borrowed[key] -= 1
+                if not self._borrowed[key]:
+                    del self._borrowed[key]
+                self._returned.notify_all()
+
+    def data_version(self, db_path):
+        """
+        Return a token that changes whenever db_path is modified: its file identity plus
+        PRAGMA data_version, which also catches commits that only touch the -wal file.
+        data_version is only comparable on the same connection, so one watcher connection
+        is kept per database, reopened whenever the file identity changes (e.g. a restored save).
+        The watcher is taken out of the pool while it is used, so a slow or locked save never
+        holds the pool lock.
+        """
+        key = os.path.abspath(db_path)
+        identity = file_identity(key)
+        with self._lock:
+            conn, watched = self._watchers.pop(key, (None, None))
+        if conn is not None and watched != identity:
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = connect_readonly(key)
+        try:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            conn.close()
+            raise
+        with self._lock:
+            # Another thread may have put back its own watcher meanwhile; keep only one
+            extra = conn if key in self._watchers else None
+            if extra is None:
+                self._watchers[key] = (conn, identity)
+        if extra is not None:
+            extra.close()
+        return (identity, version)
+
+    def close(self):
+        """Close every idle and watcher connection."""
+        with self._lock:
+            idle, self._idle = self._idle, OrderedDict()
+            watchers, self._watchers = self._watchers, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+        for conn, _ in watchers.values():
+            conn.close()
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with hit/miss counters, limited to max_entries
+    entries and, if weigh is given, to a total weight (e.g. rows) of max_weight, where
+    weigh(value) is the weight of one entry. A value heavier than max_weight is not cached.
+    """
+    def __init__(self, max_entries=256, max_weight=None, weigh=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, weight)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        weight = self.weigh(value) if self.weigh else 0
+        with self._lock:
+            if key in self._entries:
+                self.weight -= self._entries.pop(key)[1]
+            if self.max_weight is not None and weight > self.max_weight:
+                return
+            self._entries[key] = (value, weight)
+            self.weight += weight
+            while len(self._entries) > self.max_entries or (self.max_weight is not None and self.weight > self.max_weight):
+                self.weight -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def stats(self):
+        with self._lock:
+            stats = {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_entries": self.max_entries}
+            if self.weigh:
+                stats.update(weight=self.weight, max_weight=self.max_weight)
+            return stats
+
+def file_identity(path):
+    """Return (path, size, mtime_ns) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+def save_identity(db_path):
+    """
+    Return the identity of a save database: its own file identity plus that of its -wal file,
+    since a running game commits to the WAL without touching global.db.
+    """
+    return (file_identity(db_path), file_identity(db_path + "-wal"))
+
 etype_map = {
     1: "PLAYER",
     2: "BA",
@@ -31,17 +229,52 @@ etype_map = {
 def etype_to_abbr(etype):
     return etype_map.get(etype, str(etype))
 
+def game_db_path(saves_root, game):
+    """Return the path to global.db for a given game."""
+    return os.path.join(saves_root, game, 'global.db')
+
+# Shared by every tool in the process: read-only connections per game database, and
+# etype lookups cached under the database's data_version token so any commit to the
+# save (including one by the running game) makes the old entries unreachable.
+# EMPYRION_POOL_PER_DB connections per database can be borrowed at a time; a server
+# should set it to at least its number of search workers.
+shared_pool = ConnectionPool(max_per_db=int(os.environ.get("EMPYRION_POOL_PER_DB", "8")))
+entity_type_cache = LRUCache(max_entries=4096)
+
 def get_entity_type(saves_root, game, entity_id):
     """Return the etype for the given entityid from the global.db in the specified game."""
-    db_path = os.path.join(saves_root, game, 'global.db')
-    if not os.path.isfile(db_path):
-        return None
+    return get_entity_types(saves_root, game, [entity_id]).get(str(entity_id).strip())
+
+def get_entity_types(saves_root, game, entity_ids):
+    """
+    Return {entity_id: etype} (ids as strings) for the given entityids from the global.db
+    of the specified game. Cached ids are answered from entity_type_cache, the rest are
+    looked up with a single query on a pooled connection. Unknown ids are left out.
+    """
+    db_path = game_db_path(saves_root, game)
+    numeric_ids = {str(i).strip(): int(i) for i in entity_ids if str(i).strip().lstrip('-').isdigit()}
+    if not numeric_ids or not os.path.isfile(db_path):
+        return {}
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT etype FROM Entities WHERE entityid = ?", (entity_id,))
-        row = cursor.fetchone()
-        conn.close()
-        return row[0] if row else None
-    except Exception:
-        return None
+        version = shared_pool.data_version(db_path)
+        etypes = {}
+        missing = set()
+        for entityid in numeric_ids.values():
+            etype = entity_type_cache.get((version, entityid))
+            if etype is None:
+                missing.add(entityid)
+            else:
+                etypes[entityid] = etype
+        if missing:
+            with shared_pool.connection(db_path) as conn:
+                rows = conn.execute(
+                    "SELECT entityid, etype FROM Entities WHERE entityid IN (SELECT value FROM json_each(?))",
+                    (json.dumps(sorted(missing)),)
+                ).fetchall()
+            for entityid, etype in rows:
+                entity_type_cache.put((version, entityid), etype)
+                etypes[entityid] = etype
+    except sqlite3.Error as e:
+        logging.debug(f"Entity type lookup in {db_path} failed: {e}")
+        return {}
+    return {key: etypes[entityid] for key, entityid in numeric_ids.items() if entityid in etypes}
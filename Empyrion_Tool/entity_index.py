@@ -0,0 +1,204 @@
+import os
+import json
+import sqlite3
+import struct
+import argparse
+import logging
+from empyrion_common import connect_readonly, file_identity, etype_to_abbr
+from entity_query import EntityRow, get_schema, schema_source
+
+# Sidecar index that merges the entities of every save into one table.
+# Each save is re-read only when its global.db (or its -wal file) changes.
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS saves (
+    db TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    change_counter INTEGER,
+    wal_size INTEGER,
+    wal_mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS entities (
+    db TEXT NOT NULL,
+    entityid INTEGER NOT NULL,
+    name TEXT,
+    etype INTEGER,
+    playfield TEXT,
+    starsystem TEXT,
+    facid INTEGER,
+    facgroup INTEGER,
+    owner TEXT,
+    bpname TEXT,
+    isremoved INTEGER,
+    PRIMARY KEY (db, entityid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entities_entityid ON entities (entityid);
+DROP INDEX IF EXISTS idx_entities_owner;
+CREATE INDEX IF NOT EXISTS idx_entities_db_name ON entities (db, name);
+CREATE INDEX IF NOT EXISTS idx_entities_facid ON entities (db, facid);
+CREATE INDEX IF NOT EXISTS idx_entities_etype ON entities (etype);
+CREATE INDEX IF NOT EXISTS idx_entities_playfield ON entities (playfield);
+"""
+
+def read_change_counter(db_path):
+    """
+    Return the file change counter from the SQLite header (bytes 24-27).
+    Unlike PRAGMA data_version it is stored in the file, so it can be compared across runs.
+    """
+    try:
+        with open(db_path, 'rb') as f:
+            header = f.read(28)
+    except OSError:
+        return None
+    if len(header) < 28:
+        return None
+    return struct.unpack('>I', header[24:28])[0]
+
+def save_signature(db_path):
+    """Return the (size, mtime_ns, change_counter, wal_size, wal_mtime_ns) signature of a save database."""
+    identity = file_identity(db_path)
+    if identity is None:
+        return None
+    wal_identity = file_identity(db_path + "-wal")
+    wal_size, wal_mtime_ns = (wal_identity[1], wal_identity[2]) if wal_identity else (None, None)
+    return (identity[1], identity[2], read_change_counter(db_path), wal_size, wal_mtime_ns)
+
+def open_index(index_path):
+    """Open (and create if needed) the sidecar index database."""
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(INDEX_SCHEMA)
+    return conn
+
+def build_index_query(schema):
+    """
+    Return the statement that reads every entity of a save with the given SchemaInfo, as
+    (entityid, name, etype, playfield, starsystem, facid, facgroup, owner, bpname, isremoved).
+    """
+    playfield_col, starsystem_col, bpname_col, from_clause = schema_source(schema)
+    isremoved_col = "e.isremoved" if schema.isremoved else "0"
+    return f"""
+        SELECT e.entityid, e.name, e.etype, {playfield_col}, {starsystem_col}, e.facid, e.facgroup, o.name, {bpname_col}, {isremoved_col}
+        {from_clause}
+    """
+
+def read_save_rows(db_file):
+    """
+    Read every entity of one save, with its playfield, star system, owner name and blueprint
+    name, using the joins its schema supports. Raises sqlite3.Error if the save can't be read.
+    """
+    conn = connect_readonly(db_file)
+    try:
+        return conn.execute(build_index_query(get_schema(conn, db_file))).fetchall()
+    finally:
+        conn.close()
+
+def refresh_index(conn, saves_directory, db_files):
+    """
+    Bring the index up to date for the given save databases.
+    Saves whose signature is unchanged are skipped; deleted saves are dropped from the index.
+    Returns the number of saves that were re-read.
+    """
+    known = {row[0]: tuple(row[1:]) for row in conn.execute(
+        "SELECT db, size, mtime_ns, change_counter, wal_size, wal_mtime_ns FROM saves")}
+
+    refreshed = 0
+    for db_file in db_files:
+        rel_db_file = os.path.relpath(db_file, saves_directory)
+        signature = save_signature(db_file)
+        if signature is None or known.get(rel_db_file) == signature:
+            logging.debug(f"Index up to date for {rel_db_file}")
+            continue
+        logging.debug(f"Refreshing index for {rel_db_file}")
+        try:
+            rows = read_save_rows(db_file)
+        except sqlite3.Error as e:
+            # Leave the signature unrecorded so the save is read again next time
+            logging.warning(f"Could not index {rel_db_file}: {e}")
+            continue
+        with conn:
+            conn.execute("DELETE FROM entities WHERE db = ?", (rel_db_file,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO entities (db, entityid, name, etype, playfield, starsystem, facid, facgroup, owner, bpname, isremoved) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((rel_db_file,) + tuple(row) for row in rows)
+            )
+            conn.execute("INSERT OR REPLACE INTO saves VALUES (?, ?, ?, ?, ?, ?)", (rel_db_file,) + signature)
+        refreshed += 1
+
+    # Drop saves that no longer exist on disk
+    for rel_db_file in known:
+        if not os.path.isfile(os.path.join(saves_directory, rel_db_file)):
+            logging.debug(f"Removing deleted save from index: {rel_db_file}")
+            with conn:
+                conn.execute("DELETE FROM entities WHERE db = ?", (rel_db_file,))
+                conn.execute("DELETE FROM saves WHERE db = ?", (rel_db_file,))
+    return refreshed
+
+def search_index(conn, saves_directory, db_files, args, etype_id=None, after=None, limit=None):
+    """
+    Run the entity search against the index and yield EntityRow records ordered by db then id.
+    after=(db, entityid) and limit select one keyset page using the (db, entityid) primary key.
+    Filters and owners match a live search (entity_query) of the same saves.
+    """
+    where_clauses = ["db IN (SELECT value FROM json_each(?))"]
+    params = [json.dumps([os.path.relpath(f, saves_directory) for f in db_files])]
+    if args.owner is not None:
+        # Like the live search: the owner is the lowest entityid of that name in the same save
+        where_clauses.append("facid = (SELECT o.entityid FROM entities o WHERE o.db = entities.db AND o.name = ? ORDER BY o.entityid LIMIT 1)")
+        params.append(args.owner)
+    if args.id is not None:
+        where_clauses.append("entityid = ?")
+        params.append(args.id)
+    elif args.name:
+        where_clauses.append("name LIKE ?")
+        params.append(f"%{args.name}%")
+    if args.location:
+        where_clauses.append("playfield = ?")
+        params.append(args.location)
+    if etype_id is not None:
+        where_clauses.append("etype = ?")
+        params.append(etype_id)
+    where_clauses.append("isremoved = ?")
+    params.append(1 if args.removed else 0)
+    if after is not None:
+        where_clauses.append("(db, entityid) > (?, ?)")
+        params.extend(after)
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = " LIMIT ?"
+        params.append(limit)
+
+    query = (
+        "SELECT db, bpname, starsystem, playfield, entityid, facid, owner, etype, name FROM entities "
+        f"WHERE {' AND '.join(where_clauses)} ORDER BY db, entityid{limit_clause}"
+    )
+    for db, bpname, starsystem, playfield, entityid, facid, owner, etype, name in conn.execute(query, params):
+        yield EntityRow(db, bpname or "", starsystem or "", playfield or "", entityid, (owner or "") if facid else "", etype_to_abbr(etype), name or "")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the cross-save Empyrion entity index.")
+    parser.add_argument('--saves', default=r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Saves\Games", help='Root SAVES directory')
+    parser.add_argument('--index', required=True, help='Path to the index database file')
+    parser.add_argument('--rebuild', action='store_true', help='Discard the existing index and re-read every save')
+    parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    args = parser.parse_args()
+
+    from search_empyrion_entities import setup_logging, find_save_databases
+    setup_logging(args.verbose)
+    db_files = find_save_databases(args.saves)
+    conn = open_index(args.index)
+    try:
+        if args.rebuild:
+            with conn:
+                conn.execute("DELETE FROM entities")
+                conn.execute("DELETE FROM saves")
+        refreshed = refresh_index(conn, args.saves, db_files)
+    finally:
+        conn.close()
+    print(f"Indexed {len(db_files)} saves ({refreshed} refreshed) into {args.index}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import sqlite3
+import logging
+import json
+import base64
+from collections import namedtuple
+from functools import lru_cache
+from empyrion_common import LRUCache, file_identity
+
+# Set-based query layer for the entity search.
+# Owner names, blueprint names, playfields and star systems are resolved with joins in a
+# single statement per database instead of one lookup per result row. Each database's
+# schema is probed once (cached by file identity) and the statement text for a schema and
+# set of filters is compiled once, so sqlite3's statement cache reuses the prepared
+# statement across databases and calls; all values are bound as parameters.
+
+# One search result. id is the integer entityid, type the game abbreviation (CV, SV, ...).
+EntityRow = namedtuple("EntityRow", ["db", "bp", "starsystem", "playfield", "id", "owner", "type", "name"])
+
+# What a save's schema supports.
+# variant: "full" (Entities.pfid -> Playfields), "playfield_column" (older saves that store
+#          the playfield name on Entities) or "minimal" (no playfield information at all)
+# starsystem: Playfields.ssid -> SolarSystems is available
+# structures: Structures(entityid, bpname) is available
+# isremoved: Entities.isremoved is available
+SchemaInfo = namedtuple("SchemaInfo", ["variant", "starsystem", "structures", "isremoved"])
+
+# Indexes that keep the joins and filters above from scanning whole tables.
+# Each entry is (index name, table, column).
+SEARCH_INDEXES = [
+    ("idx_entities_facid", "Entities", "facid"),
+    ("idx_entities_name", "Entities", "name"),
+    ("idx_structures_entityid", "Structures", "entityid"),
+]
+
+_schema_cache = LRUCache(max_entries=256)
+
+def probe_schema(conn):
+    """
+    Work out which search features a database supports from PRAGMA table_info on
+    Entities, Playfields, SolarSystems and Structures. Raises sqlite3.OperationalError
+    if there is no Entities table.
+    """
+    def columns(table):
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+    entity_cols = columns("Entities")
+    if not entity_cols:
+        raise sqlite3.OperationalError("no such table: Entities")
+    playfield_cols = columns("Playfields")
+    if "pfid" in entity_cols and {"pfid", "name"} <= playfield_cols:
+        variant = "full"
+    elif "playfield" in entity_cols:
+        variant = "playfield_column"
+    else:
+        variant = "minimal"
+    starsystem = variant == "full" and "ssid" in playfield_cols and {"ssid", "name"} <= columns("SolarSystems")
+    structures = {"entityid", "bpname"} <= columns("Structures")
+    return SchemaInfo(variant, starsystem, structures, "isremoved" in entity_cols)
+
+def get_schema(conn, db_file=None):
+    """
+    Return the SchemaInfo for the database behind conn, probing it only once per
+    file identity (path, size, mtime) of db_file.
+    """
+    identity = file_identity(db_file) if db_file else None
+    schema = _schema_cache.get(identity) if identity else None
+    if schema is None:
+        schema = probe_schema(conn)
+        logging.debug(f"Probed schema of {db_file}: {schema}")
+        if identity:
+            _schema_cache.put(identity, schema)
+    return schema
+
+def schema_source(schema):
+    """
+    Return (playfield_col, starsystem_col, bpname_col, from_clause): the columns and joins
+    that resolve an entity's playfield, star system, owner (o) and blueprint in a schema.
+    """
+    if schema.variant == "full":
+        playfield_col = "p.name"
+        from_clause = "FROM Entities e\n        LEFT JOIN Playfields p ON e.pfid = p.pfid"
+        if schema.starsystem:
+            starsystem_col = "s.name"
+            from_clause += "\n        LEFT JOIN SolarSystems s ON p.ssid = s.ssid"
+        else:
+            starsystem_col = "''"
+    else:
+        playfield_col = "e.playfield" if schema.variant == "playfield_column" else "''"
+        starsystem_col = "''"
+        from_clause = "FROM Entities e"
+    from_clause += "\n        LEFT JOIN Entities o ON o.entityid = e.facid"
+    if schema.structures:
+        bpname_col = "st.bpname"
+        from_clause += "\n        LEFT JOIN Structures st ON st.entityid = e.entityid"
+    else:
+        bpname_col = "''"
+    return playfield_col, starsystem_col, bpname_col, from_clause
+
+@lru_cache(maxsize=512)
+def compile_search_sql(schema, owner, entity_id, name, location, etype, removed, after_id, limit):
+    """
+    Return the search statement for a schema and the set of filters in use (the filter
+    arguments are flags). Parameters are bound in the order owner, id or name, location,
+    etype, removed, after_id, limit.
+    """
+    playfield_col, starsystem_col, bpname_col, from_clause = schema_source(schema)
+    where_clauses = []
+    if owner:
+        # Uncorrelated scalar subquery: evaluated once, picks the same entity as a name lookup would
+        where_clauses.append("e.facid = (SELECT entityid FROM Entities WHERE name = ?)")
+    if entity_id:
+        where_clauses.append("e.entityid = ?")
+    elif name:
+        where_clauses.append("e.name LIKE ?")
+    if location:
+        where_clauses.append(f"{playfield_col} = ?")
+    if etype:
+        where_clauses.append("e.etype = ?")
+    # Filter by removed status; saves without the column have no removed entities
+    if schema.isremoved:
+        where_clauses.append("e.isremoved = ?")
+    elif removed:
+        where_clauses.append("0")
+    if after_id:
+        where_clauses.append("e.entityid > ?")
+
+    return f"""
+        SELECT e.entityid, e.name, e.etype, {playfield_col}, {starsystem_col}, e.facid, e.facgroup, o.name, {bpname_col}
+        {from_clause}
+        WHERE {" AND ".join(where_clauses) or "1=1"}
+        ORDER BY e.entityid
+        {"LIMIT ?" if limit else ""}
+    """
+
+def build_search_query(args, schema, etype_id=None, after_id=None, limit=None):
+    """
+    Build the set-based search statement for a database with the given SchemaInfo.
+    after_id and limit turn it into a keyset page: rows with entityid > after_id, at most limit.
+    Returns (sql, params). Result columns are:
+    entityid, name, etype, playfield, starsystem, facid, facgroup, owner, bpname
+    """
+    sql = compile_search_sql(
+        schema, args.owner is not None, args.id is not None, bool(args.name), bool(args.location),
+        etype_id is not None, bool(args.removed), after_id is not None, limit is not None
+    )
+    params = []
+    if args.owner is not None:
+        params.append(args.owner)
+    if args.id is not None:
+        params.append(args.id)
+    elif args.name:
+        params.append(f"%{args.name}%")
+    if args.location:
+        params.append(args.location)
+    if etype_id is not None:
+        params.append(etype_id)
+    if schema.isremoved:
+        params.append(1 if args.removed else 0)
+    if after_id is not None:
+        params.append(after_id)
+    if limit is not None:
+        params.append(limit)
+    return sql, params
+
+def run_search_query(conn, args, etype_id=None, after_id=None, limit=None, db_file=None):
+    """
+    Run the search against an open connection using the statement compiled for its schema.
+    Returns a cursor over the result rows (see build_search_query) so callers can stream them.
+    """
+    sql, params = build_search_query(args, get_schema(conn, db_file), etype_id, after_id, limit)
+    return conn.execute(sql, params)
+
+def encode_cursor(db, entityid):
+    """Return an opaque page cursor that resumes after entity entityid of database db."""
+    payload = json.dumps({"db": db, "id": entityid}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Return the (db, entityid) position stored in a page cursor. Raises ValueError if it is malformed."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(payload)
+        db, entityid = position["db"], position["id"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError(f"invalid cursor '{cursor}'")
+    if not isinstance(db, str) or not isinstance(entityid, int):
+        raise ValueError(f"invalid cursor '{cursor}'")
+    return db, entityid
+
+def has_index_on(conn, table, column):
+    """Return True if column is the rowid alias or the leading column of an index on table."""
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    pk_cols = [row for row in info if row[5] > 0]
+    if len(pk_cols) == 1 and pk_cols[0][1] == column and pk_cols[0][2].upper() == "INTEGER":
+        return True
+    for index in conn.execute(f"PRAGMA index_list({table})"):
+        index_info = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+        if index_info and index_info[0][2] == column:
+            return True
+    return False
+
+def ensure_indexes(db_file):
+    """
+    Create the indexes used by the search on demand, skipping columns that are already indexed.
+    This writes to the save, so it should only be run while the game is not using it.
+    Returns the names of the indexes that were created.
+    """
+    created = []
+    conn = sqlite3.connect(db_file)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for index_name, table, column in SEARCH_INDEXES:
+            if table not in tables:
+                continue
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if column not in columns or has_index_on(conn, table, column):
+                continue
+            logging.debug(f"Creating index {index_name} on {table}({column}) in {db_file}")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({column})")
+            created.append(index_name)
+        conn.commit()
+    finally:
+        conn.close()
+    return created
+
+def explain_search_query(conn, args, etype_id=None, db_file=None):
+    """
+    Return (schema, plan) for the search statement, where plan is the list of
+    (id, parent, detail) rows from EXPLAIN QUERY PLAN.
+    """
+    schema = get_schema(conn, db_file)
+    sql, params = build_search_query(args, schema, etype_id)
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return schema, [(row[0], row[1], row[3]) for row in rows]
+
+def check_query_plan(plan):
+    """
+    Return a list of problems found in a query plan.
+    Only the driving Entities scan may visit every row. A correlated subquery, or a further
+    table scan in the main loop, means the statement does per-row work (N+1). Scans inside
+    an uncorrelated subquery run once and are allowed.
+    """
+    details = {node_id: detail for node_id, _, detail in plan}
+    parents = {node_id: parent for node_id, parent, _ in plan}
+
+    def runs_once(node_id):
+        while node_id in parents:
+            detail = details[node_id]
+            if "SUBQUERY" in detail and "CORRELATED" not in detail:
+                return True
+            node_id = parents[node_id]
+        return False
+
+    problems = []
+    main_scans = [detail for node_id, _, detail in plan
+                  if detail.startswith("SCAN ") and "CONSTANT ROW" not in detail and not runs_once(node_id)]
+    for detail in main_scans[1:]:
+        problems.append(f"nested table scan: {detail}")
+    for _, _, detail in plan:
+        if "CORRELATED" in detail:
+            problems.append(f"per-row subquery: {detail}")
+        elif "AUTOMATIC" in detail:
+            problems.append(f"temporary index rebuilt on every search (see --create-indexes): {detail}")
+    return problems
@@ -0,0 +1,118 @@
+import os
+import hashlib
+import numpy as np
+from empyrion_common import file_identity
+
+# Compact block model for blueprint analysis.
+# epbtools parses a blueprint into one Python object per block; the loader below copies
+# them once into a NumPy structured array (8 bytes per block) and every summary works on
+# whole columns, so a capital vessel with hundreds of thousands of blocks is analyzed in
+# milliseconds. Parsed arrays can be cached as .npy files, so a blueprint is only parsed
+# again when it changes.
+
+BLOCK_DTYPE = np.dtype([("type_id", "<u2"), ("x", "<i2"), ("y", "<i2"), ("z", "<i2")])
+
+AXES = ("x", "y", "z")
+
+def blocks_from_entities(entities, count=-1):
+    """Return a BLOCK_DTYPE array from objects with type_id, x, y and z attributes (count = len(entities) if known)."""
+    return np.fromiter(((b.type_id, b.x, b.y, b.z) for b in entities), dtype=BLOCK_DTYPE, count=count)
+
+def cache_path(bp_path, cache_dir):
+    """Return the .npy cache file for a blueprint, named after its path, size and mtime."""
+    key = hashlib.sha256(repr(file_identity(bp_path)).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(bp_path))[0]}_{key}.npy")
+
+def load_blocks(bp_path, cache_dir=None):
+    """
+    Load the blocks of an .epb blueprint as a BLOCK_DTYPE array using epbtools.
+    With cache_dir the array is stored as .npy and reused until the blueprint changes.
+    """
+    cached = cache_path(bp_path, cache_dir) if cache_dir else None
+    if cached and os.path.isfile(cached):
+        return np.load(cached)
+    from epbtools.readepb import Blueprint
+    entities = Blueprint(bp_path).block_data.entities
+    blocks = blocks_from_entities(entities, len(entities))
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cached, blocks)
+    return blocks
+
+def coordinates(blocks):
+    """Return the block positions as an (n, 3) int32 array."""
+    return np.stack([blocks[axis].astype(np.int32) for axis in AXES], axis=1)
+
+def value_counts(values):
+    """Return (values, counts) of the distinct integers in values, in ascending order, with one bincount pass."""
+    if len(values) == 0:
+        return values[:0], np.zeros(0, dtype=np.intp)
+    values = values.astype(np.int32)
+    low = values.min()
+    counts = np.bincount(values - low)
+    present = np.flatnonzero(counts)
+    return present + low, counts[present]
+
+def type_histogram(blocks):
+    """Return (type_ids, counts) sorted by count, most common first."""
+    type_ids, counts = value_counts(blocks["type_id"])
+    order = np.argsort(-counts, kind="stable")
+    return type_ids[order], counts[order]
+
+def bounding_box(blocks):
+    """Return (min, max) corner coordinates as int arrays of (x, y, z), or None for an empty blueprint."""
+    if len(blocks) == 0:
+        return None
+    return (np.array([int(blocks[axis].min()) for axis in AXES]),
+            np.array([int(blocks[axis].max()) for axis in AXES]))
+
+def layer_counts(blocks, axis="y"):
+    """Return (levels, counts): the number of blocks in each layer along axis, lowest layer first."""
+    return value_counts(blocks[axis])
+
+def center_of_mass(blocks, masses=None):
+    """
+    Return the (x, y, z) center of mass. masses maps type_id to a block mass; block types
+    missing from it (or every block when masses is None) weigh 1.
+    """
+    if len(blocks) == 0:
+        return None
+    weights = None
+    if masses:
+        table = np.ones(int(blocks["type_id"].max()) + 1)
+        for type_id, mass in masses.items():
+            if type_id < len(table):
+                table[type_id] = mass
+        weights = table[blocks["type_id"]]
+    return np.array([np.average(blocks[axis], weights=weights) for axis in AXES])
+
+def summarize(blocks, axis="y", top=10, masses=None):
+    """Return a dict with the block count, the top block types, bounding box, layers and center of mass."""
+    type_ids, counts = type_histogram(blocks)
+    box = bounding_box(blocks)
+    levels, per_level = layer_counts(blocks, axis)
+    com = center_of_mass(blocks, masses)
+    return {
+        "blocks": int(len(blocks)),
+        "block_types": int(len(type_ids)),
+        "top_types": [(int(t), int(c)) for t, c in zip(type_ids[:top], counts[:top])],
+        "min": box[0].tolist() if box else None,
+        "max": box[1].tolist() if box else None,
+        "size": (box[1] - box[0] + 1).tolist() if box else None,
+        "layer_axis": axis,
+        "layers": [(int(l), int(c)) for l, c in zip(levels, per_level)],
+        "center_of_mass": [round(float(v), 3) for v in com] if com is not None else None,
+    }
+
+def print_summary(summary, out=None):
+    """Print a summary from summarize() as plain text."""
+    print(f"Total blocks: {summary['blocks']} ({summary['block_types']} block types)", file=out)
+    if summary["min"] is not None:
+        print(f"Bounding box: {summary['min']} .. {summary['max']} (size {summary['size']})", file=out)
+        print(f"Center of mass: {summary['center_of_mass']}", file=out)
+    print("\nMost common block types:", file=out)
+    for type_id, count in summary["top_types"]:
+        print(f"  {type_id:>6}  {count:>8}  {100 * count / summary['blocks']:5.1f}%", file=out)
+    print(f"\nBlocks per layer ({summary['layer_axis']}):", file=out)
+    for level, count in summary["layers"]:
+        print(f"  {level:>6}  {count:>8}", file=out)
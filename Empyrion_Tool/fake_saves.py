@@ -0,0 +1,167 @@
+import os
+import random
+import shutil
+import sqlite3
+import zipfile
+import argparse
+import datetime
+from empyrion_common import get_backup_path
+
+# Builds realistic fake Empyrion save trees for testing and benchmarking:
+#   <root>/Saves/Games/<game>/global.db
+#   <root>/Saves/Games/<game>-YYMMDD-HHMM/global.db   (timestamped backups)
+#   <root>/Saves/Games/<game>/Shared/<entityid>/backup.epb
+
+SCHEMA = """
+CREATE TABLE SolarSystems (ssid INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE Playfields (pfid INTEGER PRIMARY KEY, name TEXT, ssid INTEGER);
+CREATE TABLE Entities (
+    entityid INTEGER PRIMARY KEY,
+    name TEXT,
+    etype INTEGER,
+    pfid INTEGER,
+    facid INTEGER,
+    facgroup INTEGER,
+    isremoved INTEGER
+);
+CREATE TABLE Structures (entityid INTEGER PRIMARY KEY, bpname TEXT);
+"""
+
+PLANET_NAMES = ["Akua", "Omicron", "Ningh", "Masperon", "Zeyhines", "Aestus", "Skillon", "Tallodar", "Roggery", "Oscutune"]
+SHIP_WORDS = ["Miner", "Hauler", "Warp", "Scout", "Lancer", "Falcon", "Outpost", "Refinery", "Harvester", "Trader"]
+SHIP_PREFIXES = ["Eldon", "CV", "SV", "HV", "Mk", "Nova", "Polaris", "Vega"]
+# Non-player etypes and how often they appear among structures: BA, CV, SV, HV
+STRUCTURE_TYPES = [2, 3, 4, 5]
+STRUCTURE_WEIGHTS = [3, 2, 4, 2]
+
+def fake_ship_name(rng, entityid):
+    """Return a ship name in one of the formats update_entities knows how to clean up."""
+    base = f"{rng.choice(SHIP_PREFIXES)} {rng.choice(SHIP_WORDS)}"
+    style = rng.randrange(5)
+    if style == 0:
+        return f"{base} {rng.randint(1, 9)}{rng.choice('abc')}"
+    if style == 1:
+        return f"{base} ({rng.randint(1, 9)}{rng.choice('abc')})"
+    if style == 2:
+        return f"{base} {entityid}"
+    if style == 3:
+        return f"{base}.{rng.randint(1, 9)}"
+    return base
+
+def write_blueprint(path, bpname, blueprint_size):
+    """Write a zip-format backup.epb whose content only depends on bpname, so equal blueprints are byte-identical."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = random.Random(bpname)
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        info = zipfile.ZipInfo("info.txt", date_time=(2024, 8, 1, 15, 30, 0))
+        z.writestr(info, f"name={bpname}\n")
+        info = zipfile.ZipInfo("blocks.bin", date_time=(2024, 8, 1, 15, 30, 0))
+        z.writestr(info, (rng.randbytes(max(1, blueprint_size // 4)) * 4)[:blueprint_size])
+
+def fake_blocks(count, seed=1, size=(120, 40, 200)):
+    """
+    Return a BLOCK_DTYPE array (see epb_blocks) of count blocks at distinct positions
+    inside a size = (x, y, z) box centred on the origin, with a skewed mix of block types.
+    """
+    import numpy as np
+    from epb_blocks import BLOCK_DTYPE
+    rng = np.random.default_rng(seed)
+    cells = rng.choice(size[0] * size[1] * size[2], size=min(count, size[0] * size[1] * size[2]), replace=False)
+    x, y, z = np.unravel_index(cells, size)
+    blocks = np.empty(len(cells), dtype=BLOCK_DTYPE)
+    blocks["x"] = x - size[0] // 2
+    blocks["y"] = y
+    blocks["z"] = z - size[2] // 2
+    blocks["type_id"] = np.minimum(rng.zipf(1.5, len(cells)), 2000)
+    return blocks
+
+def create_save(db_path, rng, entities, playfields, factions, structures, removed_ratio=0.02):
+    """
+    Create one global.db with the given number of entities, playfields, factions (player
+    entities that own structures) and structures. Returns the list of (entityid, bpname)
+    of the structures.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(SCHEMA)
+        system_count = max(1, playfields // 4)
+        conn.executemany("INSERT INTO SolarSystems VALUES (?, ?)",
+                         ((ssid, f"System {ssid}") for ssid in range(1, system_count + 1)))
+        conn.executemany("INSERT INTO Playfields VALUES (?, ?, ?)",
+                         ((pfid, f"{PLANET_NAMES[pfid % len(PLANET_NAMES)]} {pfid}", rng.randint(1, system_count))
+                          for pfid in range(1, playfields + 1)))
+
+        next_id = 1000
+        faction_ids = list(range(next_id, next_id + factions))
+        conn.executemany("INSERT INTO Entities VALUES (?, ?, 1, ?, 0, 0, 0)",
+                         ((fid, f"Player {i}", rng.randint(1, playfields)) for i, fid in enumerate(faction_ids)))
+        next_id += factions
+
+        structure_rows = []
+        entity_rows = []
+        for entityid in range(next_id, next_id + entities - factions):
+            is_structure = len(structure_rows) < structures
+            if is_structure:
+                etype = rng.choices(STRUCTURE_TYPES, STRUCTURE_WEIGHTS)[0]
+                name = fake_ship_name(rng, entityid)
+                owner = rng.choice(faction_ids) if faction_ids and rng.random() < 0.7 else 0
+                structure_rows.append((entityid, f"BP_{rng.randrange(max(1, structures // 10))}"))
+            else:
+                etype = rng.choice([6, 7, 8])
+                name = f"Entity {entityid}"
+                owner = 0
+            entity_rows.append((entityid, name, etype, rng.randint(1, playfields), owner, 1 if owner else 0,
+                                1 if rng.random() < removed_ratio else 0))
+        conn.executemany("INSERT INTO Entities VALUES (?, ?, ?, ?, ?, ?, ?)", entity_rows)
+        conn.executemany("INSERT INTO Structures VALUES (?, ?)", structure_rows)
+        conn.commit()
+    finally:
+        conn.close()
+    return structure_rows
+
+def generate_saves(root, saves=3, entities=10000, playfields=40, factions=20, structures=2000,
+                   backups=2, blueprints=200, blueprint_size=4096, seed=1):
+    """
+    Build a fake Saves/Games tree under root and return the path of the Games directory.
+    Each save gets `backups` timestamped copies and `blueprints` Shared/<id>/backup.epb files.
+    """
+    rng = random.Random(seed)
+    games_dir = os.path.join(root, "Saves", "Games")
+    os.makedirs(games_dir, exist_ok=True)
+    start = datetime.datetime(2024, 8, 1, 15, 30)
+    for i in range(saves):
+        game = f"Game{i:03d}"
+        db_path = os.path.join(games_dir, game, "global.db")
+        structure_rows = create_save(db_path, rng, entities, playfields, factions, min(structures, entities - factions))
+        for entityid, bpname in structure_rows[:blueprints]:
+            write_blueprint(get_backup_path(games_dir, game, str(entityid)), bpname, blueprint_size)
+        for b in range(backups):
+            stamp = (start + datetime.timedelta(hours=b)).strftime("%y%m%d-%H%M")
+            backup_dir = os.path.join(games_dir, f"{game}-{stamp}")
+            os.makedirs(backup_dir, exist_ok=True)
+            shutil.copy2(db_path, os.path.join(backup_dir, "global.db"))
+    return games_dir
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a fake Empyrion Saves/Games tree for testing and benchmarks.")
+    parser.add_argument('root', help='Directory to create the Saves/Games tree in')
+    parser.add_argument('--saves', type=int, default=3, help='Number of games (default: 3)')
+    parser.add_argument('--entities', type=int, default=10000, help='Entities per save (default: 10000)')
+    parser.add_argument('--playfields', type=int, default=40, help='Playfields per save (default: 40)')
+    parser.add_argument('--factions', type=int, default=20, help='Player factions per save (default: 20)')
+    parser.add_argument('--structures', type=int, default=2000, help='Structures per save (default: 2000)')
+    parser.add_argument('--backups', type=int, default=2, help='Timestamped backup dirs per save (default: 2)')
+    parser.add_argument('--blueprints', type=int, default=200, help='Shared/<id>/backup.epb files per save (default: 200)')
+    parser.add_argument('--blueprint-size', type=int, default=4096, help='Uncompressed size of each blueprint in bytes (default: 4096)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    games_dir = generate_saves(args.root, args.saves, args.entities, args.playfields, args.factions,
+                               args.structures, args.backups, args.blueprints, args.blueprint_size, args.seed)
+    print(f"Generated {args.saves} saves in {games_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import heapq
+import numpy as np
+from collections import namedtuple
+from hex_grid import NO_DIRECTION
+
+# Flow routing for HexGrid maps: depression filling, flow direction and flow accumulation.
+# Depressions are filled with a priority flood (Barnes et al., 2014) seeded from the map
+# edge, which drains off the map. Every hex flows to the hex it was reached from, so each
+# hex has exactly one downstream path to the edge and pits can no longer stop a river.
+# The flood visits elevations level by level, and each level is a breadth-first wave
+# expanded for all hexes of the wave at once, so Python only loops once per wave. The
+# visiting order is a topological order of the flow graph, which gives flow accumulation
+# in one pass in reverse.
+
+# Direction pointing back the opposite way (see hex_grid.EVEN_COLUMN_NEIGHBORS)
+OPPOSITE = np.array([1, 0, 5, 4, 3, 2], dtype=np.int8)
+
+# filled: elevations with depressions raised to their spill level
+# direction: int8 flow direction of each hex, NO_DIRECTION on the map edge (drains off the map)
+# accumulation: number of hexes draining through each hex, itself included
+FlowRouting = namedtuple("FlowRouting", ["filled", "direction", "accumulation"])
+
+def elevation_levels(elevation):
+    """Return elevation as integer levels; float elevations are rounded to whole levels."""
+    if np.issubdtype(elevation.dtype, np.integer):
+        return elevation
+    return np.rint(elevation).astype(np.int64)
+
+def edge_indices(grid):
+    """Return the flat indices of the hexes on the edge of the grid."""
+    edge = np.zeros(grid.shape, dtype=bool)
+    edge[[0, -1], :] = True
+    edge[:, [0, -1]] = True
+    return np.flatnonzero(edge)
+
+def priority_flood(grid, seeds=None, seed_levels=None):
+    """
+    Fill the depressions of a HexGrid and route every hex towards the map edge, or towards
+    the seeds (flat indices) given, flooded from seed_levels (default: their elevation).
+    Returns (filled, direction, batches): batches lists the flat indices of the hexes in
+    the order they were reached, each batch only flowing into hexes of earlier batches.
+    Hexes not connected to any seed are in no batch.
+    """
+    levels = elevation_levels(grid.elevation).ravel()
+    filled = levels.copy()
+    direction = np.full(grid.size, NO_DIRECTION, dtype=np.int8)
+    queued = np.zeros(grid.size, dtype=bool)
+    buckets = {}
+    pending = []
+
+    def enqueue(cells):
+        # Group newly reached hexes by level so each level is flooded as one wave
+        cells = cells[np.argsort(filled[cells], kind="stable")]
+        cell_levels, starts = np.unique(filled[cells], return_index=True)
+        ends = np.append(starts[1:], len(cells))
+        for level, start, end in zip(cell_levels.tolist(), starts.tolist(), ends.tolist()):
+            if level not in buckets:
+                buckets[level] = []
+                heapq.heappush(pending, level)
+            buckets[level].append(cells[start:end])
+
+    seeds = edge_indices(grid) if seeds is None else np.asarray(seeds)
+    if seed_levels is not None:
+        filled[seeds] = seed_levels
+    queued[seeds] = True
+    batches = [seeds]
+    enqueue(seeds)
+    directions = np.arange(6, dtype=np.int8)
+    while pending:
+        level = heapq.heappop(pending)
+        wave = np.concatenate(buckets.pop(level))
+        while wave.size:
+            neighbors = grid.neighbor_index(wave[:, None], directions[None, :])
+            reached = (neighbors >= 0)
+            reached[reached] = ~queued[neighbors[reached]]
+            cells, first = np.unique(neighbors[reached], return_index=True)
+            if not cells.size:
+                break
+            queued[cells] = True
+            direction[cells] = OPPOSITE[np.nonzero(reached)[1][first]]
+            filled[cells] = np.maximum(filled[cells], level)
+            batches.append(cells)
+            # Hexes no higher than the water level are flooded in the next wave of this
+            # level; higher ones wait for their own level
+            same = filled[cells] == level
+            if not same.all():
+                enqueue(cells[~same])
+            wave = cells[same]
+    return filled.reshape(grid.shape), direction.reshape(grid.shape), batches
+
+def flow_accumulation(grid, direction, batches, weights=None):
+    """
+    Return the number of hexes draining through each hex, from priority_flood's batches and
+    a direction array (priority_flood's, or one with more hexes set to NO_DIRECTION to stop
+    the flow there). weights gives each hex's own contribution instead of 1.
+    """
+    if weights is None:
+        accumulation = np.ones(grid.size, dtype=np.int64)
+    else:
+        accumulation = weights.astype(np.int64).ravel()
+    flat_direction = direction.ravel()
+    for cells in reversed(batches):
+        downstream = grid.neighbor_index(cells, flat_direction[cells])
+        flows = downstream >= 0
+        if not flows.all():
+            cells, downstream = cells[flows], downstream[flows]
+        np.add.at(accumulation, downstream, accumulation[cells])
+    return accumulation.reshape(grid.shape)
+
+def route_flow(grid):
+    """Return the FlowRouting (filled elevations, flow direction, accumulation) of a HexGrid."""
+    filled, direction, batches = priority_flood(grid)
+    return FlowRouting(filled, direction, flow_accumulation(grid, direction, batches))
+
+def default_threshold(grid):
+    """Return the default river threshold: hexes draining at least sqrt(hex count) hexes carry a river."""
+    return max(2, int(np.sqrt(grid.size)))
+
+def mark_rivers(grid, routing, threshold=None):
+    """
+    Set grid.river on every hex whose accumulation reaches threshold (default:
+    default_threshold) and grid.next_dir along their flow. Returns the number of river hexes.
+    """
+    if threshold is None:
+        threshold = default_threshold(grid)
+    np.greater_equal(routing.accumulation, threshold, out=grid.river)
+    grid.next_dir[...] = np.where(grid.river, routing.direction, NO_DIRECTION)
+    return int(grid.river.sum())
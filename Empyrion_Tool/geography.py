@@ -1,65 +1,65 @@
-from flask import Flask, send_file
-import numpy as np
-import matplotlib.pyplot as plt
-import random
+import io
+import os
+from flask import Flask, Response, abort, request, send_file
+from flow_routing import route_flow, mark_rivers
+from hex_grid import HexGrid
+from hex_render import render_map
+from hex_tiles import MAX_ZOOM, get_tile
 
-def generate_hex_grid(rows, cols):
-    """Generate a hexagonal grid with random elevations."""
-    hexes = {}
-    for r in range(rows):
-        for c in range(cols):
-            x = c * 1.5  # Adjust spacing to form hex grid
-            y = r * np.sqrt(3) + (c % 2) * (np.sqrt(3) / 2)  # Offset every other column
-            elevation = random.randint(1, 100)  # Random elevation
-            hexes[(r, c)] = {'x': x, 'y': y, 'elevation': elevation, 'river': False}
-    return hexes
+def generate_hex_grid(rows, cols, seed=None):
+    """Generate a hexagonal grid with random elevations (reproducible for a given seed)."""
+    return HexGrid.generate(rows, cols, seed)
 
-def find_lowest_neighbor(hexes, pos, rows, cols):
-    """Find the lowest neighboring hex."""
-    r, c = pos
-    neighbors = [
-        (r-1, c), (r+1, c), (r, c-1), (r, c+1),
-        (r-1, c-1), (r+1, c+1) if c % 2 == 0 else (r-1, c+1), (r+1, c-1)
-    ]
-    neighbors = [(nr, nc) for nr, nc in neighbors if (nr, nc) in hexes]
-    if not neighbors:
-        return None
-    return min(neighbors, key=lambda n: hexes[n]['elevation'])
+def generate_rivers(hexes, rows, cols, threshold=None):
+    """
+    Route water over the whole map (see flow_routing) and put rivers where at least
+    threshold hexes drain through (default: flow_routing.default_threshold).
+    """
+    return mark_rivers(hexes, route_flow(hexes), threshold)
 
-def generate_rivers(hexes, rows, cols, num_rivers=5):
-    """Simulate river generation from high points."""
-    sorted_hexes = sorted(hexes.keys(), key=lambda k: -hexes[k]['elevation'])
-    sources = sorted_hexes[:num_rivers]
-    
-    for source in sources:
-        pos = source
-        while pos:
-            hexes[pos]['river'] = True
-            next_pos = find_lowest_neighbor(hexes, pos, rows, cols)
-            if next_pos and hexes[next_pos]['elevation'] < hexes[pos]['elevation']:
-                pos = next_pos
-            else:
-                break
-
-def plot_rivers(hexes, filename="river_map.png"):
+def plot_rivers(hexes, filename="river_map.png", draw_flow=False):
     """Plot the hex grid and rivers and save to a file."""
-    fig, ax = plt.subplots(figsize=(10, 10))
-    for (r, c), data in hexes.items():
-        color = 'blue' if data['river'] else 'lightgray'
-        ax.scatter(data['x'], data['y'], color=color, s=50)
-    ax.set_aspect('equal')
-    plt.savefig(filename)
-    plt.close()
+    with open(filename, 'wb') as f:
+        f.write(render_map(hexes, draw_flow=draw_flow).getvalue())
+
+# Largest rows/cols a /generate request may ask for
+MAX_GRID_SIZE = 4096
+
+# The world of every seed and its rendered tiles are kept here besides the in-memory cache
+TILE_CACHE_DIR = os.environ.get("TILE_CACHE_DIR", "tile_cache")
+# Seconds a client is asked to wait before retrying a tile whose world is being generated
+WORLD_RETRY_SECONDS = 30
+
+def create_app(draw_flow=False):
+    """Return the geography Flask app; draw_flow adds the flow line of every river hex to /generate maps."""
+    app = Flask(__name__)
+
+    @app.route('/generate')
+    def generate_image():
+        total_rows = max(1, min(request.args.get('rows', 10, type=int), MAX_GRID_SIZE))
+        total_cols = max(1, min(request.args.get('cols', 10, type=int), MAX_GRID_SIZE))
+        hex_grid = generate_hex_grid(total_rows, total_cols, request.args.get('seed', type=int))
+        generate_rivers(hex_grid, total_rows, total_cols, request.args.get('threshold', type=int))
+        return send_file(render_map(hex_grid, draw_flow=draw_flow), mimetype='image/png')
+
+    @app.route('/tiles/<int:seed>/<int:z>/<int(signed=True):x>/<int(signed=True):y>')
+    def tile_image(seed, z, x, y):
+        """
+        Serve one TILE_SIZE x TILE_SIZE tile of the world of seed (see hex_tiles), or 503
+        while that world is still being generated in the background.
+        """
+        if not 0 <= z <= MAX_ZOOM:
+            abort(404)
+        png = get_tile(seed, z, x, y, TILE_CACHE_DIR, wait=False)
+        if png is None:
+            return Response("The world of this seed is being generated, try again shortly", status=503,
+                            headers={"Retry-After": str(WORLD_RETRY_SECONDS)}, mimetype='text/plain')
+        # A tile never changes for a given seed, so clients may keep it
+        return send_file(io.BytesIO(png), mimetype='image/png', max_age=86400)
 
-app = Flask(__name__)
+    return app
 
-@app.route('/generate')
-def generate_image():
-    total_rows, total_cols = 10, 10
-    hex_grid = generate_hex_grid(total_rows, total_cols)
-    generate_rivers(hex_grid, total_rows, total_cols)
-    plot_rivers(hex_grid)
-    return send_file("river_map.png", mimetype='image/png')
+app = create_app()
 
 if __name__ == '__main__':
     app.run(debug=True)
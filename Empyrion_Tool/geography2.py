@@ -1,71 +1,14 @@
-from flask import Flask, send_file
-import numpy as np
-import matplotlib.pyplot as plt
-import random
+from geography import create_app, generate_hex_grid, generate_rivers
+from geography import plot_rivers as plot_map
 
-def generate_hex_grid(rows, cols):
-    """Generate a hexagonal grid with random elevations."""
-    hexes = {}
-    for r in range(rows):
-        for c in range(cols):
-            x = c * 1.5  # Adjust spacing to form hex grid
-            y = r * np.sqrt(3) + (c % 2) * (np.sqrt(3) / 2)  # Offset every other column
-            elevation = random.randint(1, 100)  # Random elevation
-            hexes[(r, c)] = {'x': x, 'y': y, 'elevation': elevation, 'river': False, 'next': None}
-    return hexes
-
-def find_lowest_neighbor(hexes, pos, rows, cols):
-    """Find the lowest neighboring hex."""
-    r, c = pos
-    neighbors = [
-        (r-1, c), (r+1, c), (r, c-1), (r, c+1),
-        (r-1, c-1), (r+1, c+1) if c % 2 == 0 else (r-1, c+1), (r+1, c-1)
-    ]
-    neighbors = [(nr, nc) for nr, nc in neighbors if (nr, nc) in hexes]
-    if not neighbors:
-        return None
-    return min(neighbors, key=lambda n: hexes[n]['elevation'])
-
-def generate_rivers(hexes, rows, cols, num_rivers=5):
-    """Simulate river generation from high points."""
-    sorted_hexes = sorted(hexes.keys(), key=lambda k: -hexes[k]['elevation'])
-    sources = sorted_hexes[:num_rivers]
-    
-    for source in sources:
-        pos = source
-        while pos:
-            hexes[pos]['river'] = True
-            next_pos = find_lowest_neighbor(hexes, pos, rows, cols)
-            if next_pos and hexes[next_pos]['elevation'] < hexes[pos]['elevation']:
-                hexes[pos]['next'] = next_pos
-                pos = next_pos
-            else:
-                break
+# The geography app (see geography.py) with the flow line of every river hex drawn on
+# its maps.
 
 def plot_rivers(hexes, filename="river_map.png"):
-    """Plot the hex grid and rivers and save to a file."""
-    fig, ax = plt.subplots(figsize=(10, 10))
-    for (r, c), data in hexes.items():
-        color = 'blue' if data['river'] else 'lightgray'
-        ax.scatter(data['x'], data['y'], color=color, s=50)
-        if data['river'] and data['next']:
-            next_r, next_c = data['next']
-            x_vals = [data['x'], hexes[data['next']]['x']]
-            y_vals = [data['y'], hexes[data['next']]['y']]
-            ax.plot(x_vals, y_vals, 'blue', linewidth=2)
-    ax.set_aspect('equal')
-    plt.savefig(filename)
-    plt.close()
-
-app = Flask(__name__)
+    """Plot the hex grid, rivers and their flow lines and save to a file."""
+    plot_map(hexes, filename, draw_flow=True)
 
-@app.route('/generate')
-def generate_image():
-    total_rows, total_cols = 10, 10
-    hex_grid = generate_hex_grid(total_rows, total_cols)
-    generate_rivers(hex_grid, total_rows, total_cols)
-    plot_rivers(hex_grid)
-    return send_file("river_map.png", mimetype='image/png')
+app = create_app(draw_flow=True)
 
 if __name__ == '__main__':
     app.run(debug=True)
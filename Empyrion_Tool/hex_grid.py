@@ -0,0 +1,84 @@
+import numpy as np
+
+# Array-backed hex grid for the geography map generators.
+# Hexes are laid out in columns ("odd-q"): column c sits at x = 1.5 * c and every odd
+# column is shifted half a hex up, y = sqrt(3) * (r + 0.5 * (c % 2)). Each per-hex value is
+# one contiguous (rows, cols) array, and a hex is addressed either by (r, c) or by its flat
+# index r * cols + c. A 4096 x 4096 grid takes about 50 MB.
+
+SQRT3 = np.sqrt(3)
+
+# (dr, dc) of the six neighbors of a hex in an even and in an odd column. Direction d
+# points the same way in both: 0 down, 1 up, 2 down-left, 3 up-left, 4 down-right, 5 up-right.
+EVEN_COLUMN_NEIGHBORS = ((-1, 0), (1, 0), (-1, -1), (0, -1), (-1, 1), (0, 1))
+ODD_COLUMN_NEIGHBORS = ((-1, 0), (1, 0), (0, -1), (1, -1), (0, 1), (1, 1))
+
+# The same offsets as (parity, direction) lookup tables, with NO_DIRECTION (-1) at index 6
+NEIGHBOR_DR = np.array([[dr for dr, _ in EVEN_COLUMN_NEIGHBORS] + [0], [dr for dr, _ in ODD_COLUMN_NEIGHBORS] + [0]])
+NEIGHBOR_DC = np.array([[dc for _, dc in EVEN_COLUMN_NEIGHBORS] + [0], [dc for _, dc in ODD_COLUMN_NEIGHBORS] + [0]])
+
+NO_DIRECTION = -1
+
+def neighbor_rowcol(r, c, direction):
+    """Return (r, c) of the neighbors of hexes (r, c) in direction, whether or not they exist."""
+    parity = c & 1
+    return r + NEIGHBOR_DR[parity, direction], c + NEIGHBOR_DC[parity, direction]
+
+class HexGrid:
+    """
+    Hex map stored as arrays:
+      elevation  (rows, cols) elevations, any numeric dtype (generate() uses uint8)
+      river      (rows, cols) bool, True where a river flows
+      next_dir   (rows, cols) int8, direction (see EVEN_COLUMN_NEIGHBORS) of the hex a
+                 river flows on to, or NO_DIRECTION
+    Positions are not stored; positions() computes them for the hexes that need them.
+    """
+    def __init__(self, elevation):
+        self.elevation = np.ascontiguousarray(elevation)
+        self.rows, self.cols = self.elevation.shape
+        self.river = np.zeros(self.elevation.shape, dtype=bool)
+        self.next_dir = np.full(self.elevation.shape, NO_DIRECTION, dtype=np.int8)
+
+    @classmethod
+    def generate(cls, rows, cols, seed=None, low=1, high=100):
+        """Return a grid with uniformly random integer elevations in [low, high] drawn from a seeded RNG."""
+        rng = np.random.default_rng(seed)
+        return cls(rng.integers(low, high + 1, size=(rows, cols), dtype=np.uint8))
+
+    @property
+    def shape(self):
+        return self.elevation.shape
+
+    @property
+    def size(self):
+        return self.elevation.size
+
+    def index(self, r, c):
+        """Return the flat index of hex (r, c); works on arrays too."""
+        return np.asarray(r) * self.cols + c
+
+    def rowcol(self, index):
+        """Return (r, c) of a flat index (or arrays of them)."""
+        return np.divmod(index, self.cols)
+
+    def positions(self, index=None):
+        """Return the (x, y) plot coordinates of the hexes at the flat indices given (default: all, flattened)."""
+        if index is None:
+            index = np.arange(self.size)
+        r, c = self.rowcol(np.asarray(index))
+        x = (c * 1.5).astype(np.float32)
+        y = ((r + 0.5 * (c % 2)) * SQRT3).astype(np.float32)
+        return x, y
+
+    def neighbor_index(self, index, direction):
+        """Return the flat index of the neighbor of each hex in index in the given directions, or -1 outside the grid."""
+        r, c = self.rowcol(np.asarray(index))
+        direction = np.asarray(direction)
+        nr, nc = neighbor_rowcol(r, c, direction)
+        inside = (direction != NO_DIRECTION) & (nr >= 0) & (nr < self.rows) & (nc >= 0) & (nc < self.cols)
+        return np.where(inside, nr * self.cols + nc, -1)
+
+    def next_index(self, index):
+        """Return the flat index of the hex a river flows on to from each hex in index, or -1."""
+        index = np.asarray(index)
+        return self.neighbor_index(index, self.next_dir.ravel()[index])
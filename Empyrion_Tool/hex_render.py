@@ -0,0 +1,66 @@
+import io
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from hex_grid import NO_DIRECTION, SQRT3
+
+# Renders a HexGrid to PNG in memory.
+# Small maps are drawn as one scatter of all hexes plus one LineCollection of all river
+# segments; maps with more hexes than SCATTER_LIMIT are rasterized into an image array of
+# at most the output resolution, so rendering cost stops growing with the map. Figures
+# are created without pyplot, so concurrent requests never share global plotting state.
+
+LAND_COLOR = (211, 211, 211)    # lightgray
+RIVER_COLOR = (0, 0, 255)       # blue
+
+# Above this many hexes a map is rasterized instead of drawn hex by hex
+SCATTER_LIMIT = 40000
+
+def marker_size(grid, figsize):
+    """Return a scatter marker area (points^2) that keeps neighboring hexes from overlapping much."""
+    extent = max(grid.cols * 1.5, grid.rows * SQRT3, 1)
+    return min(50, (72 * figsize / extent) ** 2)
+
+def river_segments(grid):
+    """Return an (n, 2, 2) array of the start and end points of every river segment."""
+    index = np.flatnonzero(grid.next_dir.ravel() != NO_DIRECTION)
+    x0, y0 = grid.positions(index)
+    x1, y1 = grid.positions(grid.next_index(index))
+    return np.stack([np.stack([x0, y0], axis=1), np.stack([x1, y1], axis=1)], axis=1)
+
+def raster_image(grid, max_pixels):
+    """
+    Return an RGB image of the grid with at most max_pixels rows and columns. Each pixel
+    covers a block of hexes and shows a river if any hex in the block has one.
+    """
+    factor = max(1, -(-max(grid.rows, grid.cols) // max_pixels))
+    river = np.pad(grid.river, ((0, -grid.rows % factor), (0, -grid.cols % factor)))
+    rows, cols = river.shape
+    river = river.reshape(rows // factor, factor, cols // factor, factor).any(axis=(1, 3))
+    image = np.empty(river.shape + (3,), dtype=np.uint8)
+    image[...] = LAND_COLOR
+    image[river] = RIVER_COLOR
+    return image
+
+def render_map(grid, draw_flow=True, figsize=10, dpi=100):
+    """
+    Render a HexGrid and its rivers and return the PNG as an io.BytesIO positioned at 0.
+    draw_flow adds a line from every river hex to the hex it flows into (scatter mode only).
+    """
+    fig = Figure(figsize=(figsize, figsize), dpi=dpi)
+    ax = fig.add_subplot()
+    if grid.size <= SCATTER_LIMIT:
+        x, y = grid.positions()
+        colors = np.where(grid.river.ravel()[:, None], np.array(RIVER_COLOR) / 255, np.array(LAND_COLOR) / 255)
+        ax.scatter(x, y, c=colors, s=marker_size(grid, figsize))
+        if draw_flow:
+            ax.add_collection(LineCollection(river_segments(grid), colors="blue", linewidths=2))
+    else:
+        # Odd columns are shifted half a hex; at this scale that is below one pixel
+        ax.imshow(raster_image(grid, figsize * dpi), origin="lower", interpolation="nearest",
+                  extent=(0, (grid.cols - 1) * 1.5, 0, (grid.rows - 0.5) * SQRT3))
+    ax.set_aspect('equal')
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,145 @@
+import io
+import os
+import shutil
+import logging
+import threading
+import numpy as np
+import matplotlib.image
+from empyrion_common import LRUCache
+from terrain import RIVER_THRESHOLD, TERRAIN_COLORS
+from world_gen import generate_world, open_world, render_window
+
+# Seeded map tiles of a hex world.
+# Every seed has one world of TILE_SIZE << MAX_ZOOM hexes per side, generated once by
+# world_gen (elevation, depression filling and flow routing over the whole world) and
+# kept as memory-mapped arrays in the cache directory. A tile only reads its window of
+# those arrays, so every hex has exactly one river state and rivers run on across tile
+# edges without seams. The world is finite: tiles outside it are open sea. Generating a
+# world takes a while, so servers start it in the background (see start_world) and have
+# no tile until it is done. Tiles are kept in an LRU memory cache and on disk, so a tile
+# is rendered only once.
+
+TILE_SIZE = 256         # pixels per tile side
+MAX_ZOOM = 4            # at MAX_ZOOM a pixel is one hex; every zoom level below halves the detail
+TILE_VERSION = 2        # part of every cache key; bump it when the generated tiles change
+
+tile_cache = LRUCache(1024)
+
+# One lock per world directory, so concurrent requests generate a world only once
+world_locks = {}
+world_locks_lock = threading.Lock()
+# World directory -> thread generating it in the background (see start_world)
+world_builds = {}
+
+def world_path(cache_dir, seed, max_zoom=MAX_ZOOM):
+    """Return the directory of the world of seed with TILE_SIZE << max_zoom hexes per side."""
+    return os.path.join(cache_dir, f"v{TILE_VERSION}", str(seed), f"world{TILE_SIZE << max_zoom}")
+
+def ensure_world(cache_dir, seed, max_zoom=MAX_ZOOM, jobs=0):
+    """
+    Return the world directory of seed, generating the world (TILE_SIZE << max_zoom hexes
+    per side, with jobs worker processes) first if it does not exist yet. The world is
+    generated under a temporary name and renamed, so a world directory is always complete.
+    """
+    path = world_path(cache_dir, seed, max_zoom)
+    if os.path.isdir(path):
+        return path
+    with world_locks_lock:
+        lock = world_locks.setdefault(path, threading.Lock())
+    with lock:
+        if os.path.isdir(path):
+            return path
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        size = TILE_SIZE << max_zoom
+        logging.info(f"Generating the {size}x{size} world of seed {seed} into {path}")
+        try:
+            generate_world(tmp_path, size, size, seed, jobs=jobs)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another process finished the same world first
+            if not os.path.isdir(path):
+                raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+def start_world(cache_dir, seed, max_zoom=MAX_ZOOM, jobs=0):
+    """
+    Return the world directory of seed if the world exists, otherwise start generating it
+    in a background thread (unless that is already under way) and return None.
+    """
+    path = world_path(cache_dir, seed, max_zoom)
+    if os.path.isdir(path):
+        return path
+
+    def build():
+        try:
+            ensure_world(cache_dir, seed, max_zoom, jobs)
+        except Exception:
+            logging.exception(f"Generating the world of seed {seed} failed")
+        finally:
+            with world_locks_lock:
+                world_builds.pop(path, None)
+    with world_locks_lock:
+        if path not in world_builds:
+            world_builds[path] = threading.Thread(target=build, name=f"world-{seed}", daemon=True)
+            world_builds[path].start()
+    return None
+
+def world_zoom(meta):
+    """Return the zoom level at which a tile pixel is one hex of the world with metadata meta."""
+    return (meta["rows"] // TILE_SIZE).bit_length() - 1
+
+def render_tile(world_dir, z, x, y):
+    """
+    Return the RGB image (TILE_SIZE x TILE_SIZE) of tile (z, x, y) of a world: terrain colored
+    by elevation, lakes and rivers on top. Below the world's full zoom each pixel covers a
+    block of hexes, and a river needs as many more hexes draining through it. Raises
+    ValueError for a zoom level beyond the world's full zoom.
+    """
+    meta, _ = open_world(world_dir)
+    if not 0 <= z <= world_zoom(meta):
+        raise ValueError(f"zoom must be between 0 and {world_zoom(meta)}")
+    step = 1 << (world_zoom(meta) - z)
+    span = TILE_SIZE * step
+    if not (0 <= x * span < meta["cols"] and 0 <= y * span < meta["rows"]):
+        return np.broadcast_to(TERRAIN_COLORS[0], (TILE_SIZE, TILE_SIZE, 3)).copy()
+    return render_window(world_dir, y * span, x * span, span, span, TILE_SIZE, RIVER_THRESHOLD * step * step)
+
+def tile_path(cache_dir, seed, z, x, y, max_zoom=MAX_ZOOM):
+    """Return the disk cache file of a tile of the world of seed with TILE_SIZE << max_zoom hexes per side."""
+    return os.path.join(cache_dir, f"v{TILE_VERSION}", str(seed), f"tiles{TILE_SIZE << max_zoom}", str(z), str(x), f"{y}.png")
+
+def get_tile(seed, z, x, y, cache_dir, wait=True, max_zoom=MAX_ZOOM):
+    """
+    Return the PNG bytes of tile (z, x, y) of world seed (TILE_SIZE << max_zoom hexes per
+    side), from the memory cache, the disk cache or freshly rendered. The world is generated
+    in cache_dir on first use; without wait that happens in the background and None is
+    returned until it is done. Raises ValueError for a zoom level outside 0..max_zoom.
+    """
+    if not 0 <= z <= max_zoom:
+        raise ValueError(f"zoom must be between 0 and {max_zoom}")
+    key = (TILE_VERSION, seed, max_zoom, z, x, y)
+    png = tile_cache.get(key)
+    if png is not None:
+        return png
+    path = tile_path(cache_dir, seed, z, x, y, max_zoom)
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            png = f.read()
+    else:
+        world_dir = (ensure_world if wait else start_world)(cache_dir, seed, max_zoom)
+        if world_dir is None:
+            return None
+        buffer = io.BytesIO()
+        matplotlib.image.imsave(buffer, render_tile(world_dir, z, x, y), format="png")
+        png = buffer.getvalue()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+        logging.debug(f"Cached tile {key} at {path}")
+    tile_cache.put(key, png)
+    return png
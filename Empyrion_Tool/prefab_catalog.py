@@ -0,0 +1,126 @@
+import os
+import json
+import sqlite3
+import argparse
+import logging
+from collections import namedtuple
+from read_blueprint import find_blueprints, scan_paths
+
+# On-disk catalog of the prefab blueprints under Content/Prefabs.
+# Each .epb is read once (its zip central directory only, see read_blueprint) and is
+# re-read only when its size or mtime changes, so looking up where a structure's bpname
+# came from never rescans the prefab folder.
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prefabs (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    members INTEGER,
+    data_size INTEGER,
+    newest_member TEXT,
+    error TEXT,
+    PRIMARY KEY (root, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_prefabs_name ON prefabs (root, name COLLATE NOCASE);
+"""
+
+# One catalogued prefab. path is relative to the prefabs directory, name is the file name
+# without .epb (what Structures.bpname refers to). members, data_size (uncompressed bytes)
+# and newest_member (ISO mtime of the newest member) come from the zip central directory.
+PrefabInfo = namedtuple("PrefabInfo", ["path", "name", "size", "mtime_ns", "members", "data_size", "newest_member", "error"])
+
+def open_catalog(catalog_path):
+    """Open (and create if needed) the prefab catalog database."""
+    conn = sqlite3.connect(catalog_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(CATALOG_SCHEMA)
+    return conn
+
+def prefab_name(path):
+    """Return the blueprint name of a prefab file: its file name without the .epb extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+def refresh_catalog(conn, prefabs_dir, jobs=1):
+    """
+    Bring the catalog up to date for prefabs_dir. Files whose size and mtime are unchanged
+    are skipped, changed or new ones are scanned (by jobs worker processes, 0 = one per
+    CPU) and deleted ones dropped. Returns the number of files that were scanned.
+    """
+    root = os.path.abspath(prefabs_dir)
+    known = {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute(
+        "SELECT path, size, mtime_ns FROM prefabs WHERE root = ?", (root,))}
+    current = {}
+    for bp_path in find_blueprints(root):
+        try:
+            st = os.stat(bp_path)
+        except OSError:
+            continue
+        current[os.path.relpath(bp_path, root)] = (st.st_size, st.st_mtime_ns)
+
+    changed = [path for path, signature in current.items() if known.get(path) != signature]
+    deleted = [path for path in known if path not in current]
+    rows = []
+    for scan in scan_paths([os.path.join(root, path) for path in changed], jobs):
+        path = os.path.relpath(scan.path, root)
+        newest = max((e.mtime for e in scan.entries if e.mtime), default=None)
+        rows.append((root, path, prefab_name(path)) + current[path] + (
+            len(scan.entries), sum(e.file_size for e in scan.entries),
+            newest.isoformat() if newest else None, scan.error))
+    with conn:
+        conn.executemany("DELETE FROM prefabs WHERE root = ? AND path = ?", ((root, path) for path in deleted))
+        conn.executemany("INSERT OR REPLACE INTO prefabs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    logging.debug(f"Prefab catalog for {root}: {len(changed)} scanned, {len(deleted)} removed, {len(current)} total")
+    return len(changed)
+
+def lookup_prefabs(conn, prefabs_dir, names):
+    """
+    Return {name: PrefabInfo} for the blueprint names that exist in the catalog of
+    prefabs_dir, matched case-insensitively. Missing names are left out.
+    """
+    names = sorted({name for name in names if name})
+    if not names:
+        return {}
+    rows = conn.execute(
+        "SELECT j.value, p.path, p.name, p.size, p.mtime_ns, p.members, p.data_size, p.newest_member, p.error "
+        "FROM json_each(?) j JOIN prefabs p ON p.root = ? AND p.name = j.value COLLATE NOCASE "
+        "ORDER BY p.path",
+        (json.dumps(names), os.path.abspath(prefabs_dir))
+    )
+    found = {}
+    for row in rows:
+        found.setdefault(row[0], PrefabInfo(*row[1:]))
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the catalog of Empyrion prefab blueprints.")
+    parser.add_argument('--prefabs', default=r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Content\Prefabs", help='Directory containing blueprint .epb files')
+    parser.add_argument('--catalog', default='prefab_catalog.db', help='Path to the catalog database file (default: prefab_catalog.db)')
+    parser.add_argument('--rebuild', action='store_true', help='Discard the catalog of this directory and rescan every prefab')
+    parser.add_argument('--jobs', type=int, default=0, help='Number of worker processes used to scan changed prefabs (default: 0 = one per CPU)')
+    parser.add_argument('--lookup', nargs='+', metavar='NAME', help='Show the catalog entries for these blueprint names')
+    parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    conn = open_catalog(args.catalog)
+    try:
+        if args.rebuild:
+            with conn:
+                conn.execute("DELETE FROM prefabs WHERE root = ?", (os.path.abspath(args.prefabs),))
+        scanned = refresh_catalog(conn, args.prefabs, args.jobs)
+        total = conn.execute("SELECT COUNT(*) FROM prefabs WHERE root = ?", (os.path.abspath(args.prefabs),)).fetchone()[0]
+        print(f"Catalogued {total} prefabs ({scanned} scanned) from {args.prefabs} into {args.catalog}")
+        if args.lookup:
+            found = lookup_prefabs(conn, args.prefabs, args.lookup)
+            for name in args.lookup:
+                info = found.get(name)
+                print(f"{name}: {info.path} ({info.members} members, {info.data_size} bytes)" if info else f"{name}: missing")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
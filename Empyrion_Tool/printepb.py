@@ -1,17 +1,30 @@
 # Add check for  git+https://github.com/geostar1024/epbtools.git
 
-
+import argparse
 from epbtools.readepb import Blueprint
+from epb_blocks import blocks_from_entities, summarize, print_summary, AXES
 
 # Load your blueprint file
 if __name__ == "__main__":
-    bp = Blueprint("MyBlueprint.epb")
+    parser = argparse.ArgumentParser(description="Print the header and blocks of an Empyrion blueprint (.epb).")
+    parser.add_argument("blueprint", nargs="?", default="MyBlueprint.epb", help="Path to the blueprint file (default: MyBlueprint.epb)")
+    parser.add_argument("--stats", action="store_true", help="Print block statistics (type histogram, bounding box, layers, center of mass) instead of every block")
+    parser.add_argument("--axis", choices=AXES, default="y", help="With --stats: axis the per-layer counts are taken along (default: y)")
+    parser.add_argument("--top", type=int, default=10, help="With --stats: number of block types listed (default: 10)")
+    args = parser.parse_args()
+
+    bp = Blueprint(args.blueprint)
 
     print("Header information:")
     print(bp.header)
 
-    print(f"\nTotal blocks: {bp.num_blocks}")
+    if args.stats:
+        entities = bp.block_data.entities
+        print()
+        print_summary(summarize(blocks_from_entities(entities, len(entities)), args.axis, args.top))
+    else:
+        print(f"\nTotal blocks: {bp.num_blocks}")
 
-    print("\nBlocks (type_id 2 position):")
-    for block in bp.block_data.entities:
-        print(f"- ID {block.type_id} at ({block.x}, {block.y}, {block.z})")
+        print("\nBlocks (type_id 2 position):")
+        for block in bp.block_data.entities:
+            print(f"- ID {block.type_id} at ({block.x}, {block.y}, {block.z})")
@@ -1,5 +1,160 @@
 import os
+import sys
+import csv
+import json
+import mmap
+import time
+import struct
 import zipfile
+import datetime
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# One member of a blueprint archive, as recorded in the zip central directory.
+# mtime is a datetime, or None if the stored DOS timestamp is invalid.
+BlueprintEntry = namedtuple("BlueprintEntry", ["name", "compressed_size", "file_size", "crc", "mtime"])
+
+# Result of scanning one blueprint file: its entries, or the error that stopped the scan
+BlueprintScan = namedtuple("BlueprintScan", ["path", "entries", "error"])
+
+# Zip central directory records (see APPNOTE.TXT)
+EOCD = struct.Struct("<4s4H2LH")                # end of central directory
+EOCD64_LOCATOR = struct.Struct("<4sLQL")        # zip64 end of central directory locator
+EOCD64 = struct.Struct("<4sQ2H2L4Q")            # zip64 end of central directory
+CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")   # central directory file header
+EOCD_MAX_SEARCH = EOCD.size + 0xFFFF            # the record may be followed by a 64 KiB comment
+
+def dos_datetime(dos_date, dos_time):
+    """Convert a DOS date and time to a datetime, or None if they are not a valid timestamp."""
+    try:
+        return datetime.datetime(
+            (dos_date >> 9) + 1980, (dos_date >> 5) & 0xF, dos_date & 0x1F,
+            dos_time >> 11, (dos_time >> 5) & 0x3F, (dos_time & 0x1F) * 2
+        )
+    except ValueError:
+        return None
+
+def zip64_sizes(extra, file_size, compressed_size):
+    """Read the real sizes from a zip64 extra field where the central header has 0xFFFFFFFF."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<2H", extra, pos)
+        if header_id == 1:
+            values = struct.unpack_from(f"<{length // 8}Q", extra, pos + 4)
+            index = 0
+            if file_size == 0xFFFFFFFF:
+                file_size, index = values[index], index + 1
+            if compressed_size == 0xFFFFFFFF:
+                compressed_size = values[index]
+            break
+        pos += 4 + length
+    return file_size, compressed_size
+
+def find_central_directory(mm):
+    """Return (offset, size, entry count) of the central directory in a mapped zip archive."""
+    start = max(0, len(mm) - EOCD_MAX_SEARCH)
+    eocd_pos = mm.rfind(b"PK\x05\x06", start)
+    if eocd_pos < 0:
+        raise zipfile.BadZipFile("end of central directory not found")
+    _, _, _, _, count, cd_size, cd_offset, _ = EOCD.unpack_from(mm, eocd_pos)
+    locator_pos = eocd_pos - EOCD64_LOCATOR.size
+    if locator_pos >= 0 and mm[locator_pos:locator_pos + 4] == b"PK\x06\x07":
+        _, _, eocd64_offset, _ = EOCD64_LOCATOR.unpack_from(mm, locator_pos)
+        eocd64_pos = locator_pos - EOCD64.size
+        if eocd64_pos >= 0 and mm[eocd64_pos:eocd64_pos + 4] == b"PK\x06\x06":
+            fields = EOCD64.unpack_from(mm, eocd64_pos)
+            count, cd_size, cd_offset = fields[7], fields[8], fields[9]
+            eocd_pos = eocd64_pos
+    # Data prepended to the archive shifts every offset by the same amount
+    prefix = eocd_pos - cd_size - cd_offset
+    if prefix < 0:
+        raise zipfile.BadZipFile("central directory offset out of range")
+    return cd_offset + prefix, cd_size, count
+
+def iter_blueprint_entries(bp_path):
+    """
+    Yield a BlueprintEntry for every member of a blueprint archive, read only from the zip
+    central directory through an mmap; nothing is decompressed. Raises zipfile.BadZipFile
+    if the file is not a zip archive.
+    """
+    with open(bp_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise zipfile.BadZipFile("file is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos, cd_size, count = find_central_directory(mm)
+            end = pos + cd_size
+            for _ in range(count):
+                if pos + CENTRAL_HEADER.size > end or mm[pos:pos + 4] != b"PK\x01\x02":
+                    raise zipfile.BadZipFile("bad central directory header")
+                (_, _, _, flags, _, dos_time, dos_date, crc, compressed_size, file_size,
+                 name_len, extra_len, comment_len, _, _, _, _) = CENTRAL_HEADER.unpack_from(mm, pos)
+                pos += CENTRAL_HEADER.size
+                name = mm[pos:pos + name_len].decode("utf-8" if flags & 0x800 else "cp437")
+                if file_size == 0xFFFFFFFF or compressed_size == 0xFFFFFFFF:
+                    file_size, compressed_size = zip64_sizes(mm[pos + name_len:pos + name_len + extra_len], file_size, compressed_size)
+                pos += name_len + extra_len + comment_len
+                yield BlueprintEntry(name, compressed_size, file_size, crc, dos_datetime(dos_date, dos_time))
+
+def scan_blueprint(bp_path):
+    """Return a BlueprintScan with every entry of one blueprint, or the error that prevented reading it."""
+    try:
+        return BlueprintScan(bp_path, list(iter_blueprint_entries(bp_path)), None)
+    except (OSError, ValueError, zipfile.BadZipFile, struct.error) as e:
+        return BlueprintScan(bp_path, [], f"{type(e).__name__}: {e}")
+
+def find_blueprints(root):
+    """Return every .epb file under root, sorted by path."""
+    found = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs.sort()
+        found.extend(os.path.join(dirpath, name) for name in sorted(files) if name.lower().endswith('.epb'))
+    return found
+
+def scan_paths(paths, jobs=0):
+    """
+    Yield a BlueprintScan for each blueprint in paths, in order, scanned by a pool of jobs
+    worker processes (0 = one per CPU, 1 = in this process).
+    """
+    workers = min(jobs or os.cpu_count() or 1, max(1, len(paths)))
+    if workers <= 1:
+        yield from map(scan_blueprint, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(scan_blueprint, paths, chunksize=max(1, min(256, len(paths) // (workers * 4))))
+
+def scan_blueprints(root, jobs=0):
+    """Yield a BlueprintScan for every .epb file under root, in path order (see scan_paths)."""
+    yield from scan_paths(find_blueprints(root), jobs)
+
+def write_scans(scans, output_format, out, root=None):
+    """
+    Write one line per blueprint member as a table, csv or ndjson, with paths relative to root.
+    Returns (files, entries, errors) counts.
+    """
+    fields = ["path", "name", "compressed_size", "file_size", "crc", "mtime", "error"]
+    writer = None
+    if output_format == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(fields)
+    files = entries = errors = 0
+    for scan in scans:
+        files += 1
+        path = os.path.relpath(scan.path, root) if root else scan.path
+        if scan.error:
+            errors += 1
+        rows = [[path, e.name, e.compressed_size, e.file_size, f"{e.crc:08x}", e.mtime.isoformat() if e.mtime else "", ""]
+                for e in scan.entries] or [[path, "", "", "", "", "", scan.error or ""]]
+        entries += len(scan.entries)
+        for row in rows:
+            if output_format == "ndjson":
+                out.write(json.dumps(dict(zip(fields, row))) + "\n")
+            elif writer:
+                writer.writerow(row)
+            elif row[-1]:
+                out.write(f"{path}  ERROR {row[-1]}\n")
+            else:
+                out.write(f"{path}  {row[1]:<24} {row[2]:>10} {row[3]:>10}  {row[4]}  {row[5]}\n")
+    return files, entries, errors
 
 def read_blueprint(bp_path, verbose=False):
     """
@@ -22,9 +177,8 @@ def read_blueprint(bp_path, verbose=False):
         # Blueprint is a .epb file (zip format)
         if verbose:
             print(f"Reading blueprint archive: {bp_path}")
-        with zipfile.ZipFile(bp_path, 'r') as z:
-            for name in z.namelist():
-                print(name)
+        for entry in iter_blueprint_entries(bp_path):
+            print(entry.name)
     else:
         print("Unknown blueprint format. Please provide a .epb file or blueprint folder.")
 
@@ -33,6 +187,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Read and list contents of an Empyrion blueprint (.epb or folder).")
     parser.add_argument("blueprint", type=str, help="Path to blueprint file (.epb) or folder")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--details", action="store_true", help="List each member's sizes, CRC and mtime from the zip central directory")
+    parser.add_argument("--scan", action="store_true", help="Treat the folder as a prefabs tree and list the members of every .epb under it")
+    parser.add_argument("--jobs", type=int, default=0, help="With --scan: number of worker processes (default: 0 = one per CPU)")
+    parser.add_argument("--format", choices=["table", "csv", "ndjson"], default="table", help="Output format for --details and --scan (default: table)")
     args = parser.parse_args()
 
-    read_blueprint(args.blueprint, args.verbose)
\ No newline at end of file
+    if args.scan:
+        start = time.perf_counter()
+        files, entries, errors = write_scans(scan_blueprints(args.blueprint, args.jobs), args.format, sys.stdout, args.blueprint)
+        print(f"Scanned {files} blueprints, {entries} members, {errors} errors in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    elif args.details:
+        write_scans([scan_blueprint(args.blueprint)], args.format, sys.stdout)
+    else:
+        read_blueprint(args.blueprint, args.verbose)
@@ -1,11 +1,18 @@
 import sqlite3
 import os
-from empyrion_common import etype_to_abbr, etype_abbr_to_id
+from empyrion_common import etype_to_abbr, etype_abbr_to_id, shared_pool
 import glob
 import argparse
 import re
 import sys
 import logging
+import json
+import csv
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from entity_index import open_index, refresh_index, search_index
+from prefab_catalog import open_catalog, refresh_catalog, lookup_prefabs
+from entity_query import EntityRow, encode_cursor, decode_cursor, run_search_query, ensure_indexes, explain_search_query, check_query_plan
 
 # Setup logging
 def setup_logging(verbose):
@@ -42,18 +49,6 @@ txtcyn = "\033[0;36m"  # Cyan
 txtwht = "\033[0;37m"  # White
 txtrst = "\033[0m"     # Text Reset
 
-def get_bpname(cursor, entityid):
-    """
-    Fetch the blueprint name from the Structures table for a given entityid.
-    Returns the bpname or an empty string if not found.
-    """
-    try:
-        cursor.execute("SELECT bpname FROM Structures WHERE entityid = ?", (entityid,))
-        row = cursor.fetchone()
-        return row[0] if row and row[0] else ""
-    except sqlite3.Error:
-        return ""
-
 def etype_to_str(etype):
     """
     Translate etype integer to a human-readable string and game abbreviation.
@@ -86,19 +81,250 @@ def etype_abbr_to_id(abbr):
     }
     return abbr_map.get(abbr.upper())
 
-def get_owner_id(cursor, owner_name):
+def find_save_databases(saves_directory, game_exact=None, games=None):
+    """
+    Return the global.db paths of all main saves under saves_directory, sorted by path.
+    Optionally restrict to the exact game name or to games containing a substring.
+    """
+    main_save_dirs = []
+    for d in os.listdir(saves_directory):
+        if not os.path.isdir(os.path.join(saves_directory, d)) or not is_main_save_dir(d):
+            continue
+        if game_exact and d != game_exact:
+            continue
+        if games and games.lower() not in d.lower():
+            continue
+        main_save_dirs.append(os.path.join(saves_directory, d))
+    logging.debug(f"Main save directories: {[os.path.basename(d) for d in main_save_dirs]}")
+
+    # Collect all global.db files from main save directories only
+    db_files = []
+    for save_dir in main_save_dirs:
+        db_path = os.path.join(save_dir, "global.db")
+        if os.path.isfile(db_path):
+            db_files.append(db_path)
+            logging.debug(f"Found database: {os.path.relpath(db_path, saves_directory)}")
+    return sorted(db_files, key=lambda p: os.path.relpath(p, saves_directory))
+
+def iter_database(db_file, saves_directory, args, etype_id=None, pool=None, after_id=None, limit=None):
+    """
+    Yield the search results of a single global.db as EntityRow records, in id order.
+    The read-only connection is borrowed from pool (default: the shared pool in
+    empyrion_common), so several databases can be searched concurrently.
+    Owner, blueprint, playfield and star system names come from one set-based query.
+    after_id and limit restrict it to one keyset page (ids greater than after_id).
+    """
+    rel_db_file = os.path.relpath(db_file, saves_directory)
+    logging.debug(f"Searching in database: {rel_db_file}")
+    try:
+        with (pool or shared_pool).connection(db_file) as conn:
+            for entityid, name, etype, playfield, starsystem, facid, facgroup, owner, bpname in run_search_query(conn, args, etype_id, after_id, limit, db_file):
+                yield EntityRow(
+                    rel_db_file, bpname or "", starsystem or "", playfield or "",
+                    entityid, (owner or "") if facid else "", etype_to_str(etype)[1], name or ""
+                )
+    except sqlite3.Error as e:
+        logging.debug(f"Error accessing {rel_db_file}: {e}")
+
+def search_database(db_file, saves_directory, args, etype_id=None, pool=None, after_id=None):
+    """Run the entity search against a single global.db and return its EntityRow list sorted by id."""
+    return list(iter_database(db_file, saves_directory, args, etype_id, pool, after_id))
+
+def explain_databases(db_files, saves_directory, args, etype_id=None):
+    """
+    Print the EXPLAIN QUERY PLAN of the search statement for each database and report
+    any per-row (N+1) work found in it.
+    """
+    for db_file in db_files:
+        rel_db_file = os.path.relpath(db_file, saves_directory)
+        try:
+            with shared_pool.connection(db_file) as conn:
+                schema, plan = explain_search_query(conn, args, etype_id, db_file)
+        except sqlite3.Error as e:
+            print(f"{rel_db_file}: {txtred}error: {e}{txtrst}")
+            continue
+        print(f"{rel_db_file} (schema: {schema.variant}, starsystem={schema.starsystem}, structures={schema.structures})")
+        for _, _, detail in plan:
+            print(f"    {detail}")
+        problems = check_query_plan(plan)
+        if problems:
+            for problem in problems:
+                print(f"    {txtred}{problem}{txtrst}")
+        else:
+            print(f"    {txtgrn}OK: single set-based pass, no per-row queries{txtrst}")
+
+def resolve_jobs(jobs, db_count):
+    """
+    Return the number of worker threads to use for db_count databases.
+    A jobs value of 0 means one worker per CPU.
+    """
+    if not jobs or jobs < 0:
+        jobs = os.cpu_count() or 1
+    return max(1, min(jobs, db_count))
+
+def iter_entities(args, db_files=None, pool=None):
+    """
+    Yield an EntityRow for every match across the selected saves, in db then id order.
+    Rows are produced as each database returns them, so callers can stream results in
+    constant memory. Connections come from pool, or the shared pool in empyrion_common.
+    args.cursor resumes after a position returned by search_page and args.limit caps the
+    number of rows; each database is then read with a bounded keyset query.
+    Raises ValueError for an unknown args.type abbreviation or a malformed cursor.
+    """
+    saves_directory = args.saves
+    etype_id = None
+    if args.type:
+        etype_id = etype_abbr_to_id(args.type)
+        if etype_id is None:
+            raise ValueError(f"unknown type abbreviation '{args.type}'")
+    limit = getattr(args, "limit", None)
+    cursor = getattr(args, "cursor", None)
+    after = decode_cursor(cursor) if cursor else None
+    if db_files is None:
+        db_files = find_save_databases(saves_directory, args.game, args.games)
+    if after is not None:
+        # Databases before the cursor's database were fully returned by earlier pages
+        db_files = [f for f in db_files if os.path.relpath(f, saves_directory) >= after[0]]
+    jobs = getattr(args, "jobs", 1)
+    index_path = getattr(args, "index", None)
+
+    def after_id_for(db_file):
+        if after is not None and os.path.relpath(db_file, saves_directory) == after[0]:
+            return after[1]
+        return None
+
+    workers = resolve_jobs(jobs, len(db_files))
+    if index_path:
+        # Refresh changed saves in the sidecar index, then answer with one indexed query
+        index_conn = open_index(index_path)
+        try:
+            refreshed = refresh_index(index_conn, saves_directory, db_files)
+            logging.debug(f"Refreshed {refreshed} of {len(db_files)} saves in index {index_path}")
+            yield from search_index(index_conn, saves_directory, db_files, args, etype_id, after, limit)
+        finally:
+            index_conn.close()
+    elif limit is not None:
+        # One page: read databases in order, asking each only for the rows still needed
+        remaining = limit
+        for db_file in db_files:
+            if remaining <= 0:
+                break
+            for row in iter_database(db_file, saves_directory, args, etype_id, pool, after_id_for(db_file), remaining):
+                remaining -= 1
+                yield row
+    elif workers > 1:
+        # Search databases in parallel but yield them in db order, keeping only a
+        # window of finished databases in memory.
+        logging.debug(f"Searching {len(db_files)} databases with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for db_file in db_files:
+                pending.append(executor.submit(search_database, db_file, saves_directory, args, etype_id, pool, after_id_for(db_file)))
+                if len(pending) > workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    else:
+        for db_file in db_files:
+            yield from iter_database(db_file, saves_directory, args, etype_id, pool, after_id_for(db_file))
+
+def search_page(args, db_files=None, pool=None):
+    """
+    Return (rows, next_cursor) for one page of at most args.limit rows starting at args.cursor.
+    next_cursor is None on the last page. Raises ValueError like iter_entities.
+    """
+    limit = args.limit
+    if limit is None or limit < 1:
+        raise ValueError("limit must be at least 1")
+    # Ask for one extra row to know whether another page follows
+    page_args = argparse.Namespace(**{**vars(args), "limit": limit + 1})
+    rows = list(iter_entities(page_args, db_files, pool))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].db, rows[-1].id)
+    return rows, next_cursor
+
+OUTPUT_FIELDS = ["db", "starsystem", "playfield", "bp", "id", "owner", "type", "name"]
+
+# A search result with the prefab its bpname came from: the prefab's path relative to
+# --prefabs, "missing" if no such prefab exists any more, or "" for rows without a bpname.
+PrefabEntityRow = namedtuple("PrefabEntityRow", EntityRow._fields + ("prefab",))
+PREFAB_OUTPUT_FIELDS = OUTPUT_FIELDS + ["prefab"]
+
+def annotate_prefabs(rows, catalog_conn, prefabs_dir, batch_size=500):
+    """
+    Yield each row as a PrefabEntityRow, looking up the bpnames of batch_size rows at a
+    time in the prefab catalog so rows still stream.
+    """
+    def flush(batch):
+        found = lookup_prefabs(catalog_conn, prefabs_dir, [r.bp for r in batch])
+        for r in batch:
+            prefab = found[r.bp].path if r.bp in found else ("missing" if r.bp else "")
+            yield PrefabEntityRow(*r, prefab)
+
+    batch = []
+    for r in rows:
+        batch.append(r)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    yield from flush(batch)
+
+def write_rows(rows, output_format, out, fields=OUTPUT_FIELDS):
+    """
+    Stream rows to out as ndjson, csv or tsv, writing each row as it arrives.
+    Returns the number of rows written.
     """
-    Query the Entities table for the given owner name and return the entityid.
-    Returns None if not found.
+    count = 0
+    if output_format == "ndjson":
+        for r in rows:
+            out.write(json.dumps({field: getattr(r, field) for field in fields}) + "\n")
+            count += 1
+    else:
+        writer = csv.writer(out, delimiter="\t" if output_format == "tsv" else ",", lineterminator="\n")
+        writer.writerow(fields)
+        for r in rows:
+            writer.writerow([getattr(r, field) for field in fields])
+            count += 1
+    return count
+
+def print_table(rows, out=None, fields=OUTPUT_FIELDS):
+    """
+    Print rows as the padded, colored table. The table needs every row to size its
+    columns, so it buffers the results. Prints to out (default stdout).
+    Returns the number of rows printed.
     """
-    cursor.execute("SELECT entityid FROM Entities WHERE name = ?", (owner_name,))
-    row = cursor.fetchone()
-    return row[0] if row else None
+    all_results = []
+    widths = {field: len(field) for field in fields}
+    for r in rows:
+        r = r._replace(id=str(r.id))
+        all_results.append(r)
+        for field in fields:
+            widths[field] = max(widths[field], len(getattr(r, field)))
+
+    # Print header once
+    header = "  ".join(f"{field:<{widths[field]}}" for field in fields)
+    print(header, file=out)
+    print('-' * len(header), file=out)
+
+    # Print all results, already ordered by db then id
+    for r in all_results:
+        print("  ".join(
+            f"{txtylw if field == 'type' else txtred if field == 'prefab' and r.prefab == 'missing' else txtgrn}{getattr(r, field):<{widths[field]}}{txtrst}"
+            for field in fields
+        ), file=out)
+
+    print(f"Total structures found: {len(all_results)}", file=out)
+    if not all_results:
+        print("No matches found.", file=out)
+    return len(all_results)
 
 def search_entities(args):
     """
     Search for entities by entityid or partial name in all Empyrion save game databases within the given directory.
     Uses argparse.Namespace args for all options.
+    Databases are searched concurrently when args.jobs is greater than 1 (or 0 for one worker per CPU).
     """
     entity_id = args.id
     name_part = args.name
@@ -127,184 +353,68 @@ def search_entities(args):
         logging.debug(f"Not a directory: {saves_directory}")
         return
 
-    # List all subdirectories in saves_directory and filter to only main saves
-    if game_exact:
-        main_save_dirs = [
-            os.path.join(saves_directory, d)
-            for d in os.listdir(saves_directory)
-            if os.path.isdir(os.path.join(saves_directory, d)) and is_main_save_dir(d)
-            and d == game_exact
-        ]
-    elif games:
-        main_save_dirs = [
-            os.path.join(saves_directory, d)
-            for d in os.listdir(saves_directory)
-            if os.path.isdir(os.path.join(saves_directory, d)) and is_main_save_dir(d)
-            and games.lower() in d.lower()
-        ]
-    else:
-        main_save_dirs = [
-            os.path.join(saves_directory, d)
-            for d in os.listdir(saves_directory)
-            if os.path.isdir(os.path.join(saves_directory, d)) and is_main_save_dir(d)
-        ]
-    logging.debug(f"Main save directories: {[os.path.basename(d) for d in main_save_dirs]}")
-
-    # Collect all global.db files from main save directories only
-    db_files = []
-    for save_dir in main_save_dirs:
-        db_path = os.path.join(save_dir, "global.db")
-        if os.path.isfile(db_path):
-            db_files.append(db_path)
-            logging.debug(f"Found database: {os.path.relpath(db_path, saves_directory)}")
-
-    db_count = 0
-    match_found = False
-
-    blueprint_displayed = False
+    etype_id = None
+    if args.type:
+        etype_id = etype_abbr_to_id(args.type)
+        if etype_id is None:
+            print(f"{os.path.basename(sys.argv[0])}: unknown type abbreviation '{args.type}'. Valid: BA, CV, SV, HV, AST")
+            sys.exit(1)
+
+    db_files = find_save_databases(saves_directory, game_exact, games)
+
+    if getattr(args, "create_indexes", False):
+        for db_file in db_files:
+            created = ensure_indexes(db_file)
+            logging.debug(f"Created indexes {created} in {os.path.relpath(db_file, saves_directory)}")
+    if getattr(args, "explain", False):
+        explain_databases(db_files, saves_directory, args, etype_id)
+        return
 
-    all_results = []
+    output_format = getattr(args, "format", "table")
+    next_cursor = None
+    try:
+        if getattr(args, "limit", None) is not None:
+            rows, next_cursor = search_page(args, db_files)
+        else:
+            rows = iter_entities(args, db_files)
+            if getattr(args, "cursor", None):
+                decode_cursor(args.cursor)
+    except ValueError as e:
+        print(f"{os.path.basename(sys.argv[0])}: {e}")
+        sys.exit(1)
 
-    for db_file in db_files:
-        rel_db_file = os.path.relpath(db_file, saves_directory)
-        logging.debug(f"Searching in database: {rel_db_file}")
-        try:
-            conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
-            where_clauses = []
-            params = []
-
-            owner_id = None
-            if owner_name is not None:
-                logging.debug(f"Looking up owner ID for: {owner_name}")
-                owner_id = get_owner_id(cursor, owner_name)
-                if owner_id is None:
-                    logging.debug(f"Owner '{owner_name}' not found in {rel_db_file}.")
-                    conn.close()
-                    continue
-                where_clauses.append("e.facid = ?")
-                params.append(owner_id)
-
-            if entity_id is not None:
-                where_clauses.append("e.entityid = ?")
-                params.append(entity_id)
-            elif name_part:
-                where_clauses.append("e.name LIKE ?")
-                params.append(f"%{name_part}%")
-            if args.location:
-                where_clauses.append("p.name = ?")
-                params.append(args.location)
-            if args.type:
-                etype_id = etype_abbr_to_id(args.type)
-                if etype_id is not None:
-                    where_clauses.append("e.etype = ?")
-                    params.append(etype_id)
-                else:
-                    print(f"{prog_name}: unknown type abbreviation '{args.type}'. Valid: BA, CV, SV, HV, AST")
-                    print()
-                    parser.print_usage()
-                    print(f"Try '{prog_name} --help' for more information.")
-                    sys.exit(1)
-
-            # Always filter out removed entities
-            # Filter by removed status
-            if args.removed:
-                where_clauses.append("e.isremoved = 1")
-            else:
-                where_clauses.append("e.isremoved = 0")
-            where_clause = " AND ".join(where_clauses) if where_clauses else "1=1"
+    fields = OUTPUT_FIELDS
+    catalog_conn = None
+    if getattr(args, "show_prefabs", False):
+        if not args.prefabs or not os.path.isdir(args.prefabs):
+            print(f"{os.path.basename(sys.argv[0])}: prefabs directory does not exist: {args.prefabs}")
+            sys.exit(1)
+        # Only prefabs whose size or mtime changed since the last run are read again
+        catalog_conn = open_catalog(getattr(args, "prefab_catalog", None) or "prefab_catalog.db")
+        scanned = refresh_catalog(catalog_conn, args.prefabs)
+        logging.debug(f"Scanned {scanned} changed prefabs in {args.prefabs}")
+        rows = annotate_prefabs(rows, catalog_conn, args.prefabs)
+        fields = PREFAB_OUTPUT_FIELDS
 
+    try:
+        if output_format == "table":
+            count = print_table(rows, fields=fields)
+            if next_cursor:
+                print(f"More results: use --cursor {next_cursor}")
+        else:
             try:
-                query = f"""
-                    SELECT e.entityid, e.name, e.etype, p.name as playfield, s.name as starsystem, e.facid, e.facgroup, (SELECT bpname FROM Structures WHERE entityid = e.entityid)
-                    FROM Entities e
-                    LEFT JOIN Playfields p ON e.pfid = p.pfid
-                    LEFT JOIN SolarSystems s ON p.ssid = s.ssid
-                    WHERE {where_clause}
-                """
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-            except sqlite3.OperationalError:
-                try:
-                    query = f"SELECT entityid, name, etype, playfield, '' as starsystem, facid, facgroup, (SELECT bpname FROM Structures WHERE entityid = entityid) FROM Entities WHERE {where_clause}"
-                    cursor.execute(query, params)
-                    rows = cursor.fetchall()
-                except sqlite3.OperationalError:
-                    query = f"SELECT entityid, name, etype, '' as playfield, '' as starsystem, facid, facgroup, (SELECT bpname FROM Structures WHERE entityid = entityid) FROM Entities WHERE {where_clause}"
-                    cursor.execute(query, params)
-                    rows = cursor.fetchall()
-
-            owner_names = {}
-            for row in rows:
-                entityid, name, etype, playfield, starsystem, facid, facgroup, bpname = row
-                structure_owner_name = ""
-                if facid:
-                    if facid in owner_names:
-                        structure_owner_name = owner_names[facid]
-                    else:
-                        cursor.execute("SELECT name FROM Entities WHERE entityid = ?", (facid,))
-                        owner_row = cursor.fetchone()
-                        structure_owner_name = owner_row[0] if owner_row and owner_row[0] else ""
-                        owner_names[facid] = structure_owner_name
-                all_results.append((
-                    rel_db_file, bpname or "", starsystem or "", playfield or "",
-                    str(entityid), structure_owner_name, etype_to_str(etype)[1], name or ""
-                ))
-            conn.close()
-        except sqlite3.Error as e:
-            logging.debug(f"Error accessing {rel_db_file}: {e}")
-
-    # Sort results by db, bp, solarsystem, playfield, id
-    # Group output by db, and sort by id ascending within each db
-    from collections import defaultdict
-    grouped_results = defaultdict(list)
-    for r in all_results:
-        grouped_results[r[0]].append(r)
-    for db in grouped_results:
-        grouped_results[db].sort(key=lambda r: int(r[4]) if r[4].isdigit() else r[4])
-
-    # Calculate max widths for columns
-    max_db_len = max([len("db")] + [len(r[0]) for r in all_results]) if all_results else len("db")
-    max_sys_len = max([len("starsystem")] + [len(r[2]) for r in all_results]) if all_results else len("starsystem")
-    max_loc_len = max([len("playfield")] + [len(r[3]) for r in all_results]) if all_results else len("playfield")
-    max_bp_len = max([len("bp")] + [len(r[1]) for r in all_results]) if all_results else len("bp")
-    max_id_len = max([len("id")] + [len(r[4]) for r in all_results]) if all_results else len("id")
-    max_owner_len = max([len("owner")] + [len(r[5]) for r in all_results]) if all_results else len("owner")
-    max_type_len = max([len("type")] + [len(r[6]) for r in all_results]) if all_results else len("type")
-    max_name_len = max([len("name")] + [len(r[7]) for r in all_results]) if all_results else len("name")
-
-    # Print header once
-    header = (
-        f"{'db':<{max_db_len}}  "
-        f"{'starsystem':<{max_sys_len}}  "
-        f"{'playfield':<{max_loc_len}}  "
-        f"{'bp':<{max_bp_len}}  "
-        f"{'id':<{max_id_len}}  "
-        f"{'owner':<{max_owner_len}}  "
-        f"{'type':<{max_type_len}}  "
-        f"{'name':<{max_name_len}}"
-    )
-    print(header)
-    print('-' * len(header))
-
-    # Print all results grouped by db
-    for db in sorted(grouped_results.keys()):
-        for r in grouped_results[db]:
-            print(
-                f"{txtgrn}{r[0]:<{max_db_len}}{txtrst}  "
-                f"{txtgrn}{r[2]:<{max_sys_len}}{txtrst}  "
-                f"{txtgrn}{r[3]:<{max_loc_len}}{txtrst}  "
-                f"{txtgrn}{r[1]:<{max_bp_len}}{txtrst}  "
-                f"{txtgrn}{r[4]:<{max_id_len}}{txtrst}  "
-                f"{txtgrn}{r[5]:<{max_owner_len}}{txtrst}  "
-                f"{txtylw}{r[6]:<{max_type_len}}{txtrst}  "
-                f"{txtgrn}{r[7]:<{max_name_len}}{txtrst}"
-            )
-
-    print(f"Total structures found: {len(all_results)}")
-    logging.debug(f"Checked {len(db_files)} databases.")
-    if not all_results:
-        print("No matches found.")
+                count = write_rows(rows, output_format, sys.stdout, fields)
+                sys.stdout.flush()
+                if next_cursor:
+                    print(f"More results: use --cursor {next_cursor}", file=sys.stderr)
+            except BrokenPipeError:
+                # The reader (e.g. head) went away; stop quietly like other command line tools
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                return
+    finally:
+        if catalog_conn:
+            catalog_conn.close()
+    logging.debug(f"Checked {len(db_files)} databases, {count} rows.")
 
 def main():
     parser = CustomParser(
@@ -330,6 +440,15 @@ def main():
     parser.add_argument("--type", type=str, help="Filter by structure type: BA, CV, SV, HV, AST")
     parser.add_argument("--owner", type=str, help="Find all structures owned by the given entity NAME (resolved to entityid per database)")
     parser.add_argument("--removed", action="store_true", help="Show only removed structures/entities (isremoved=1)")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of databases to search in parallel (0 = one per CPU)")
+    parser.add_argument("--format", choices=["table", "ndjson", "csv", "tsv"], default="table", help="Output format (default: table); ndjson, csv and tsv stream rows as they are found")
+    parser.add_argument("--limit", type=int, help="Return at most N rows (one page)")
+    parser.add_argument("--cursor", type=str, help="Resume after the position printed by a previous --limit page")
+    parser.add_argument("--explain", action="store_true", help="Show the query plan used for each database and check it for per-row queries, then exit")
+    parser.add_argument("--create-indexes", action="store_true", help="Create missing indexes used by the search in each database (writes to the saves)")
+    parser.add_argument("--index", type=str, help="Use (and incrementally refresh) a cross-save entity index stored in this file")
+    parser.add_argument("--show-prefabs", action="store_true", help="Add a prefab column: the --prefabs blueprint each structure's bpname comes from, or 'missing'")
+    parser.add_argument("--prefab-catalog", type=str, default="prefab_catalog.db", help="File the --show-prefabs catalog of --prefabs is kept in (default: prefab_catalog.db)")
 
     prog_name = os.path.basename(sys.argv[0])
 
@@ -377,7 +496,7 @@ OPTIONS
         Search only saves for the game with this exact name (subdirectory of saves directory).
 
     --prefabs DIR
-        Directory containing blueprint .epb files (default: C:\\SteamLibrary\\steamapps\\common\\Empyrion - Galactic Survival\\Content\\Prefabs).
+        Directory containing blueprint .epb files, used by --show-prefabs (default: C:\\SteamLibrary\\steamapps\\common\\Empyrion - Galactic Survival\\Content\\Prefabs).
 
     --verbose
         Enable verbose output.
@@ -391,6 +510,47 @@ OPTIONS
     --owner OWNER_NAME
         Find all structures owned by the given entity NAME (resolved to entityid per database).
 
+    --removed
+        Show only removed structures/entities (isremoved=1).
+
+    --jobs N
+        Search up to N databases in parallel using read-only connections (default: 1, 0 = one per CPU).
+        Results are printed in the same db/id order as a serial search.
+
+    --format FORMAT
+        Output format: table (default), ndjson, csv or tsv. The table is padded to the
+        widest value, so it is printed once every row is known; the other formats are
+        written row by row as the databases return them, in constant memory.
+
+    --limit N
+        Return at most N rows. If more rows match, a cursor for the next page is printed
+        (on stderr for ndjson/csv/tsv output).
+
+    --cursor CURSOR
+        Continue after the last row of a previous page. Pages are keyset queries on
+        (db, entity id), so every page costs a bounded indexed query.
+
+    --explain
+        Print the EXPLAIN QUERY PLAN of the search for each database and report any
+        per-row (N+1) lookups or nested table scans, then exit without searching.
+
+    --create-indexes
+        Create the indexes the search relies on (Entities.facid, Entities.name,
+        Structures.entityid) where they are missing. This writes to the save databases,
+        so only use it while the game or server is stopped.
+
+    --index FILE
+        Keep a sidecar index of every save's entities in FILE and answer the search from it.
+        A save is only re-read when its global.db size, mtime or change counter (or its -wal file) changes.
+
+    --show-prefabs
+        Add a prefab column with the blueprint in --prefabs that each structure's bpname
+        refers to, or "missing" if that prefab no longer exists. The prefabs are catalogued
+        in --prefab-catalog, and only new or changed .epb files are read again.
+
+    --prefab-catalog FILE
+        Where the --show-prefabs catalog is stored (default: prefab_catalog.db).
+
 EXAMPLES
     List all structures in a specific game and location:
         python search_empyrion_entities.py --game MyWorld --location \"Balapru Moon Sector\" --list
@@ -412,6 +572,25 @@ EXAMPLES
 
     Find all structures owned by a specific entity:
         python search_empyrion_entities.py --owner 78910
+
+    List all structures across every save using 8 parallel workers:
+        python search_empyrion_entities.py --list --jobs 8
+
+    Export every structure in every save as CSV:
+        python search_empyrion_entities.py --list --format csv > structures.csv
+
+    Browse all structures 100 at a time:
+        python search_empyrion_entities.py --list --limit 100
+        python search_empyrion_entities.py --list --limit 100 --cursor <cursor from previous page>
+
+    Check that listing a large save runs as a single pass:
+        python search_empyrion_entities.py --game MyWorld --list --explain
+
+    Look up an entity ID through the cross-save index:
+        python search_empyrion_entities.py --id 123456 --index entity_index.db
+
+    List every base with the prefab it was built from:
+        python search_empyrion_entities.py --type BA --list --show-prefabs
 """)
         sys.exit(0)
 
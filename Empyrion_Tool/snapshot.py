@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import gzip
+import shutil
+import sqlite3
+import hashlib
+import threading
+import argparse
+import datetime
+import logging
+from empyrion_common import connect_readonly
+
+# Online snapshots of live save databases.
+# The SQLite backup API copies a consistent image of the database (including pages still
+# in the -wal file) a few pages at a time, pausing between steps so a running game or
+# dedicated server keeps its I/O. Snapshots are gzip-compressed and de-duplicated: a
+# snapshot identical to an existing one is dropped in favour of the existing file.
+
+CHUNK_SIZE = 1024 * 1024
+
+def print_progress(remaining, total):
+    """Progress callback that prints a single updating line to stderr."""
+    done = total - remaining
+    percent = 100 * done // total if total else 100
+    end = "\n" if remaining == 0 else ""
+    print(f"\rSnapshot: {percent:3d}% ({done}/{total} pages)", end=end, file=sys.stderr, flush=True)
+
+def compress_file(src_path, dest_path):
+    """gzip src_path into dest_path in large chunks and return the SHA-256 of the uncompressed data."""
+    digest = hashlib.sha256()
+    with open(src_path, 'rb') as src, gzip.open(dest_path, 'wb', compresslevel=6) as dest:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            dest.write(chunk)
+    return digest.hexdigest()
+
+def hash_file(path):
+    """Return the SHA-256 of a file, read in large chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def copy_hashed(src_path, dest_path):
+    """
+    Copy src_path to dest_path in large chunks, hashing the data as it is copied, and fsync
+    the result. Returns (SHA-256 of the data, bytes copied, size of the written file).
+    """
+    digest = hashlib.sha256()
+    copied = 0
+    with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            dest.write(chunk)
+            copied += len(chunk)
+        dest.flush()
+        os.fsync(dest.fileno())
+        written = os.fstat(dest.fileno()).st_size
+    return digest.hexdigest(), copied, written
+
+def temp_path(snapshot_dir, stem):
+    """Return a temporary file name in snapshot_dir that no other process or thread uses."""
+    return os.path.join(snapshot_dir, f".{stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def store_snapshot(tmp_path, snapshot_dir, stem, compress=True):
+    """
+    Move a finished snapshot file into snapshot_dir as <stem>_<timestamp>_<hash>.<ext>[.gz],
+    or drop it if a snapshot with the same content and stem already exists.
+    Returns the path of the stored (or existing) snapshot.
+    """
+    ext = os.path.splitext(stem)[1]
+    base = os.path.splitext(stem)[0]
+    if compress:
+        gz_tmp = tmp_path + ".gz"
+        digest = compress_file(tmp_path, gz_tmp)
+        os.remove(tmp_path)
+        tmp_path, suffix = gz_tmp, ext + ".gz"
+    else:
+        digest = hash_file(tmp_path)
+        suffix = ext
+    short_hash = digest[:12]
+
+    for name in sorted(os.listdir(snapshot_dir)):
+        if name.startswith(base + "_") and name.endswith(f"_{short_hash}{suffix}"):
+            logging.debug(f"Snapshot identical to {name}, not keeping a second copy")
+            os.remove(tmp_path)
+            return os.path.join(snapshot_dir, name)
+
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    snapshot_path = os.path.join(snapshot_dir, f"{base}_{timestamp}_{short_hash}{suffix}")
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+def snapshot_database(db_path, snapshot_dir, pages_per_step=256, pause=0.01, compress=True, progress=None, stem=None):
+    """
+    Take an online snapshot of a SQLite database into snapshot_dir using the backup API.
+    pages_per_step pages are copied per step with a pause (in seconds) between steps.
+    progress(remaining, total) is called after each step. stem names the snapshot
+    (default: the database file name). Returns the path of the snapshot file.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    stem = stem or os.path.basename(db_path)
+    tmp_path = temp_path(snapshot_dir, stem)
+
+    def on_step(status, remaining, total):
+        if progress:
+            progress(remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    src = connect_readonly(db_path)
+    try:
+        dest = sqlite3.connect(tmp_path)
+        try:
+            src.backup(dest, pages=pages_per_step, progress=on_step)
+        finally:
+            dest.close()
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        src.close()
+
+    snapshot_path = store_snapshot(tmp_path, snapshot_dir, stem, compress)
+    logging.debug(f"Snapshot of {db_path} stored as {snapshot_path}")
+    return snapshot_path
+
+def snapshot_file(path, snapshot_dir, compress=True, stem=None):
+    """Snapshot a regular (non-SQLite) file, e.g. a backup.epb about to be overwritten. Returns the snapshot path."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    stem = stem or os.path.basename(path)
+    tmp_path = temp_path(snapshot_dir, stem)
+    try:
+        shutil.copyfile(path, tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return store_snapshot(tmp_path, snapshot_dir, stem, compress)
+
+def restore_snapshot(snapshot_path, dest_path):
+    """Write a (possibly gzip-compressed) snapshot back to dest_path."""
+    opener = gzip.open if snapshot_path.endswith(".gz") else open
+    with opener(snapshot_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        shutil.copyfileobj(src, dest, CHUNK_SIZE)
+
+def main():
+    parser = argparse.ArgumentParser(description="Take an online, throttled snapshot of an Empyrion save database.")
+    parser.add_argument('database', help='Path to global.db')
+    parser.add_argument('--dest', help='Snapshot directory (default: a snapshots folder next to the database)')
+    parser.add_argument('--pages', type=int, default=256, help='Pages copied per step (default: 256)')
+    parser.add_argument('--pause', type=float, default=0.01, help='Seconds to pause between steps (default: 0.01)')
+    parser.add_argument('--no-compress', action='store_true', help='Store the snapshot uncompressed')
+    parser.add_argument('--restore', metavar='SNAPSHOT', help='Restore SNAPSHOT to the database path instead (game must be stopped)')
+    args = parser.parse_args()
+
+    if args.restore:
+        restore_snapshot(args.restore, args.database)
+        print(f"Restored {args.restore} to {args.database}")
+        return
+    dest = args.dest or os.path.join(os.path.dirname(os.path.abspath(args.database)), "snapshots")
+    path = snapshot_database(args.database, dest, args.pages, args.pause, not args.no_compress, print_progress)
+    print(f"Snapshot created: {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import numpy as np
+import matplotlib
+
+# Seeded terrain of the generated hex worlds (see world_gen and hex_tiles).
+# The elevation of a hex is a pure function of the seed and its world coordinates
+# (value noise over hashed lattice points), so any part of a world can be generated on
+# its own and neighboring parts always meet seamlessly.
+
+ELEVATION_LEVELS = 1000
+SEA_LEVEL = 0.25 * ELEVATION_LEVELS
+RIVER_THRESHOLD = 200   # hexes draining through a hex before it shows a river
+NOISE_SCALE = 512.0     # size in hexes of the coarsest noise features
+NOISE_OCTAVES = 7
+
+RIVER_COLOR = (30, 60, 220)
+TERRAIN_COLORS = (matplotlib.colormaps["terrain"](np.linspace(0, 1, ELEVATION_LEVELS + 1))[:, :3] * 255).astype(np.uint8)
+
+def hash_coords(seed, octave, i, j):
+    """Return a float in [0, 1) for every lattice point (i, j), fixed for a given seed and octave."""
+    h = np.uint64((seed * 0x9E3779B97F4A7C15 + octave * 0xC2B2AE3D27D4EB4F) & 0xFFFFFFFFFFFFFFFF)
+    h = h ^ (i.astype(np.uint64) * np.uint64(0xBF58476D1CE4E5B9)) ^ (j.astype(np.uint64) * np.uint64(0x94D049BB133111EB))
+    # splitmix64 finalizer
+    h ^= h >> np.uint64(31)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+def value_noise(seed, octave, x, y):
+    """Smoothly interpolated lattice noise in [0, 1) at points (x, y), lattice spacing 1."""
+    x0, y0 = np.floor(x), np.floor(y)
+    fx, fy = x - x0, y - y0
+    fx, fy = fx * fx * (3 - 2 * fx), fy * fy * (3 - 2 * fy)
+    i, j = x0.astype(np.int64), y0.astype(np.int64)
+    top = hash_coords(seed, octave, i, j) * (1 - fx) + hash_coords(seed, octave, i + 1, j) * fx
+    bottom = hash_coords(seed, octave, i, j + 1) * (1 - fx) + hash_coords(seed, octave, i + 1, j + 1) * fx
+    return top * (1 - fy) + bottom * fy
+
+def world_elevation(seed, rows, cols):
+    """Return the integer elevation levels (0..ELEVATION_LEVELS) of the world hexes at rows x cols."""
+    rows, cols = np.broadcast_arrays(np.asarray(rows)[:, None], np.asarray(cols)[None, :])
+    x = cols * 1.5
+    y = (rows + 0.5 * (cols % 2)) * np.sqrt(3)
+    total = np.zeros(x.shape)
+    amplitude, scale, weight = 1.0, NOISE_SCALE, 0.0
+    for octave in range(NOISE_OCTAVES):
+        total += amplitude * value_noise(seed, octave, x / scale, y / scale)
+        weight += amplitude
+        amplitude, scale = amplitude * 0.5, scale * 0.5
+    # Sums of octaves cluster around 0.5; stretch the usual range to the full scale
+    stretched = np.clip((total / weight - 0.2) / 0.6, 0, 1)
+    return np.rint(stretched * ELEVATION_LEVELS).astype(np.uint16)
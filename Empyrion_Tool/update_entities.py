@@ -1,83 +1,205 @@
+import io
+import os
+import sys
 import sqlite3
 import re
-import shutil
-import datetime
+import time
 import string
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from snapshot import snapshot_database, print_progress
+
+# Vessel etypes: capital vessels, small vessels and hover vessels
+VESSEL_ETYPES = (3, 4, 5)
+
+PRINTABLE_CHARS = frozenset(string.printable)
+
+# Name clean-up patterns, compiled once
+TRAILING_PARENS_RE = re.compile(r'\s*\([^)]+\)\s*$')  # Text in parentheses at the end and spaces around it
+TRAILING_VERSION_RE = re.compile(r'\s*\d+[a-zA-Z]+$')  # Trailing number with optional letter
+ACRONYM_RE = re.compile(r' (Mk|CV|T|HV|SV) ')  # Older version info and obvious acronyms
+LETTER_BEFORE_NUMBER_RE = re.compile(r'(\w)\s*(\d)$')  # Single letters before numbers at end
+BASE_NUMBER_RE = re.compile(r'(.*)\s+(\d+)$')  # Base name and trailing number
 
 def find_unprintable_chars(s):
     # List of unprintable characters
-    unprintable = [char for char in s if char not in string.printable]
+    unprintable = [char for char in s if char not in PRINTABLE_CHARS]
     return unprintable
 
-def update_entities(database):
-    # Create a backup of the database, and add date-timestamp suffix
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    backup_database = database.replace(".db", f"_backup_{timestamp}.db")
-    shutil.copy2(database, backup_database)  # Create a backup before modifying
-    print(f"Backup created: {backup_database}")
-        
+def compute_new_name(entityid, name):
+    """
+    Return the normalized name for a vessel, ending in its entityid, or None if the
+    name already ends with the right number.
+    """
+    # Remove any extra leading or trailing spaces before attempting the regex match
+    cleaned_name = name.strip()
+
+    # Remove older format like 'Eldon Miner Warp 3b' or '(3b)'
+    cleaned_name = TRAILING_PARENS_RE.sub('', cleaned_name)
+    cleaned_name = TRAILING_VERSION_RE.sub('', cleaned_name)
+    cleaned_name = ACRONYM_RE.sub(' ', cleaned_name)
+    cleaned_name = cleaned_name.replace('.', ' ')  # Remove periods
+    cleaned_name = LETTER_BEFORE_NUMBER_RE.sub(r'\2', cleaned_name)
+
+    match = BASE_NUMBER_RE.search(cleaned_name)
+    if match:
+        base_name, existing_number = match.groups()
+        if existing_number == str(entityid):
+            return None  # Skip update if the number is already correct
+        return f"{base_name} {entityid}".strip()
+    return f"{cleaned_name} {entityid}".strip()  # Append entityid if no number at the end
+
+def plan_renames(conn, out=None):
+    """
+    Compute every vessel rename without touching the database.
+    Returns (plan, scanned) where plan is a list of (entityid, etype, name, new_name).
+    Planning stops at the first name with unprintable characters (reported to out,
+    default stdout), as before.
+    """
+    placeholders = ", ".join("?" for _ in VESSEL_ETYPES)
+    rows = conn.execute(
+        "SELECT entityid, name, etype FROM Entities "
+        f"WHERE entityid IS NOT NULL AND name IS NOT NULL AND etype IN ({placeholders})",
+        VESSEL_ETYPES
+    )
+    plan = []
+    scanned = 0
+    for entityid, name, etype in rows:
+        scanned += 1
+        # Check for unprintable characters
+        unprintable_chars = find_unprintable_chars(name)
+        if unprintable_chars:
+            print("Unprintable characters found:", unprintable_chars, file=out or sys.stdout)
+            break
+        new_name = compute_new_name(entityid, name)
+        if new_name is not None:
+            plan.append((entityid, etype, name, new_name))
+    return plan, scanned
+
+def apply_renames(conn, plan, chunk_size=None):
+    """
+    Write the planned renames with executemany, in one transaction or in transactions
+    of chunk_size rows. Returns the number of rows updated.
+    """
+    update_query = "UPDATE Entities SET name = ? WHERE entityid = ?"
+    chunk_size = chunk_size or len(plan) or 1
+    updated = 0
+    for start in range(0, len(plan), chunk_size):
+        chunk = plan[start:start + chunk_size]
+        with conn:
+            conn.executemany(update_query, ((new_name, entityid) for entityid, _, _, new_name in chunk))
+        updated += len(chunk)
+    return updated
+
+def update_entities(database, dry_run=False, chunk_size=None, snapshot_dir=None, compress=True, progress=print_progress, quiet=False, out=None):
+    """
+    Rename every vessel in database so its name ends with its entityid.
+    All new names are computed first and then written in a single transaction (or in
+    chunks of chunk_size rows). With dry_run the plan is printed and nothing is written.
+    Before writing, an online snapshot is taken into snapshot_dir (default: next to the
+    database). Messages go to out (default stdout); quiet suppresses the per-vessel lines.
+    Returns a dict with the number of rows scanned and renamed (and the error, if any).
+    """
+    out = out or sys.stdout
+    if not dry_run:
+        # Snapshot the database with the backup API so a running game isn't stalled
+        snapshot_dir = snapshot_dir or os.path.dirname(os.path.abspath(database))
+        stem = os.path.basename(database).replace(".db", "_backup.db")
+        backup_database = snapshot_database(database, snapshot_dir, compress=compress, progress=progress, stem=stem)
+        print(f"Backup created: {backup_database}", file=out)
+
+    stats = {"scanned": 0, "renamed": 0}
+    conn = sqlite3.connect(database)
     try:
-        # Connect to the database and auto-commit. This will allow us to see the
-        # changes we make in the database, and will also allow other programs to
-        # see the changes we make.
-        conn = sqlite3.connect(database, isolation_level=None, autocommit=True)
-        cursor = conn.cursor()
-        
-        # Select all rows
-        select_query = "SELECT entityid, name, etype FROM Entities"
-        cursor.execute(select_query)
-        rows = cursor.fetchall()
-        
-        # Update the column conditionally using regex or other complex logic
-        for entityid, name, etype in rows:
-            if entityid is None or name is None or etype is None:
-                continue
-
-            # Skip non-vessel entities which are hovercraft, small vessels, and capital ships.
-            if etype != 3 and etype != 4 and etype != 5:
-                # Skip non-vessel entities, which are etype 3, 4 and 5 in Empyrion 
-                continue
-
-            # Check for unprintable characters
-            unprintable_chars = find_unprintable_chars(name)
-
-            if unprintable_chars:
-                print("Unprintable characters found:", unprintable_chars)
-                break
-
-            # Remove any extra leading or trailing spaces before attempting the regex match
-            cleaned_name = name.strip()
-
-            # Remove older format like 'Eldon Miner Warp 3b' or '(3b)'
-            cleaned_name = re.sub(r'\s*\([^)]+\)\s*$', '', cleaned_name)  # Remove text in parentheses at the end and spaces around it.
-            cleaned_name = re.sub(r'\s*\d+[a-zA-Z]+$', '', cleaned_name)  # Remove trailing number with optional letter
-            cleaned_name = re.sub(r' (Mk|CV|T|HV|SV) ', ' ', cleaned_name)  # Remove older version info and obvious acronyms
-            cleaned_name = re.sub(r'\.', ' ', cleaned_name)  # Remove periods
-            # remove single letters before numbers at end
-            cleaned_name = re.sub(r'(\w)\s*(\d)$', r'\2', cleaned_name)
-
-            match = re.search(r'(.*)\s+(\d+)$', cleaned_name)  # Extract base name and trailing number
-            if match:
-                base_name, existing_number = match.groups()
-                if existing_number == str(entityid):
-                    continue  # Skip update if the number is already correct
-                new_name = f"{base_name} {entityid}".strip()
-            else:
-                new_name = f"{cleaned_name} {entityid}".strip()  # Append entityid if no number at the end
-            
-            print(f"Updating {entityid=}, {etype=}, {name=}, {new_name=}")
-
-            update_query = "UPDATE Entities SET name = ? WHERE entityid = ?"
-            cursor.execute(update_query, (new_name, entityid))
-        
-        print(f"Update successful. Changes saved in {database}")
-        
+        plan, stats["scanned"] = plan_renames(conn, out)
+        for entityid, etype, name, new_name in ([] if quiet else plan):
+            print(f"{'Would update' if dry_run else 'Updating'} {entityid=}, {etype=}, {name=}, {new_name=}", file=out)
+        stats["planned"] = len(plan)
+        if dry_run:
+            print(f"Dry run: {len(plan)} of {stats['scanned']} vessels would be renamed in {database}", file=out)
+            return stats
+        stats["renamed"] = apply_renames(conn, plan, chunk_size)
+        print(f"Update successful. {stats['renamed']} of {stats['scanned']} vessels renamed. Changes saved in {database}", file=out)
     except sqlite3.Error as e:
-        print("SQLite error:", e)
+        print("SQLite error:", e, file=out)
+        stats["error"] = str(e)
     finally:
         conn.close()
+    return stats
+
+def rename_save(db_file, dry_run=False, chunk_size=None, snapshot_dir=None, compress=True):
+    """
+    Process-pool worker: run update_entities quietly on one save and return (db_file, stats,
+    seconds, output), where output holds its messages for the parent to print.
+    """
+    start = time.perf_counter()
+    out = io.StringIO()
+    try:
+        stats = update_entities(db_file, dry_run, chunk_size, snapshot_dir, compress, progress=None, quiet=True, out=out)
+    except Exception as e:
+        stats = {"scanned": 0, "renamed": 0, "error": f"{type(e).__name__}: {e}"}
+    return db_file, stats, time.perf_counter() - start, out.getvalue()
+
+def update_all_saves(saves_directory, game_exact=None, games=None, jobs=0, dry_run=False, chunk_size=None, snapshot_dir=None, compress=True):
+    """
+    Run the rename pipeline on every main save under saves_directory (found the same way as
+    search_empyrion_entities) in a process pool of jobs workers (0 = one per CPU), then
+    print the messages of each save in save order and a combined summary. Snapshots go to a per-game folder under snapshot_dir if given.
+    Returns a list of (db_file, stats, seconds) in save order.
+    """
+    from search_empyrion_entities import find_save_databases
+    db_files = find_save_databases(saves_directory, game_exact, games)
+    if not db_files:
+        print(f"No saves found in {saves_directory}")
+        return []
+    workers = max(1, min(jobs or os.cpu_count() or 1, len(db_files)))
+    print(f"{'Checking' if dry_run else 'Renaming'} vessels in {len(db_files)} saves with {workers} workers...")
+
+    def snapshot_dir_for(db_file):
+        if not snapshot_dir:
+            return None
+        return os.path.join(snapshot_dir, os.path.basename(os.path.dirname(db_file)))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(rename_save, db_file, dry_run, chunk_size, snapshot_dir_for(db_file), compress)
+                   for db_file in db_files]
+        results = []
+        for future in futures:
+            db_file, stats, seconds, output = future.result()
+            # Workers never print, so the messages of different saves don't interleave
+            sys.stdout.write(output)
+            results.append((db_file, stats, seconds))
+
+    # Combined summary
+    name_len = max([len("save")] + [len(os.path.relpath(db_file, saves_directory)) for db_file, _, _ in results])
+    header = f"{'save':<{name_len}}  {'scanned':>8}  {'renamed' if not dry_run else 'to rename':>9}  {'time':>8}"
+    print(header)
+    print('-' * len(header))
+    total_scanned = total_renamed = 0
+    for db_file, stats, seconds in results:
+        renamed = stats.get("planned", 0) if dry_run else stats["renamed"]
+        total_scanned += stats["scanned"]
+        total_renamed += renamed
+        error = f"  ERROR: {stats['error']}" if "error" in stats else ""
+        print(f"{os.path.relpath(db_file, saves_directory):<{name_len}}  {stats['scanned']:>8}  {renamed:>9}  {seconds:>7.2f}s{error}")
+    print('-' * len(header))
+    print(f"{'total':<{name_len}}  {total_scanned:>8}  {total_renamed:>9}")
+    return results
 
-# Example usage:
 if __name__ == "__main__":
-    database_file = r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Saves\Games\Creative\global.db"
-    update_entities(database_file)
+    parser = argparse.ArgumentParser(description="Rename Empyrion vessels so each name ends with its entity ID.")
+    parser.add_argument('database', nargs='?', default=r"C:\SteamLibrary\steamapps\common\Empyrion - Galactic Survival\Saves\Games\Creative\global.db", help='Path to global.db')
+    parser.add_argument('--dry-run', action='store_true', help='Print the planned renames without changing the database')
+    parser.add_argument('--chunk-size', type=int, help='Commit every N renames instead of in one transaction')
+    parser.add_argument('--snapshot-dir', help='Directory for the pre-update snapshot (default: next to the database)')
+    parser.add_argument('--no-compress', action='store_true', help='Store the pre-update snapshot uncompressed')
+    parser.add_argument('--saves', help='Rename vessels in every main save under this SAVES directory instead of a single database')
+    parser.add_argument('--games', help='With --saves: only saves for games containing this name (substring match)')
+    parser.add_argument('--game', help='With --saves: only the save for the game with this exact name')
+    parser.add_argument('--jobs', type=int, default=0, help='With --saves: number of saves processed in parallel (default: 0 = one per CPU)')
+    args = parser.parse_args()
+
+    if args.saves:
+        update_all_saves(args.saves, args.game, args.games, args.jobs, args.dry_run, args.chunk_size, args.snapshot_dir, not args.no_compress)
+    else:
+        update_entities(args.database, args.dry_run, args.chunk_size, args.snapshot_dir, not args.no_compress)
@@ -0,0 +1,571 @@
+import io
+import os
+import heapq
+import json
+import time
+import argparse
+import contextlib
+import logging
+import numpy as np
+import matplotlib.image
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from flow_routing import priority_flood, flow_accumulation
+from hex_grid import HexGrid, NO_DIRECTION, neighbor_rowcol
+from terrain import world_elevation, TERRAIN_COLORS, RIVER_COLOR, RIVER_THRESHOLD, SEA_LEVEL
+
+# Chunked, multi-process generation of very large hex worlds.
+# The world is stored in a directory as memory-mapped .npy arrays, which the worker
+# processes share: each one writes only its own chunk and reads a HALO of hexes around it
+# from its neighbors' chunks. Generation runs in passes over all chunks, in parallel:
+#   1. elevation of every chunk (the noise of terrain, so chunks join seamlessly)
+#   2. filled elevation, as in the parallel priority flood of Barnes (2016): each chunk is
+#      flooded from its own border and every hex labeled with the border hex it drains to;
+#      a small priority flood over the graph of touching labels (serial) finds the level
+#      each label spills at, and every hex is raised to the spill level of its label
+#   3. flat distances: on the flats the filling left, the distance to the nearest hex that
+#      can drain lower, exchanged through the halos; a chunk runs again only while the
+#      part of its halo that it reads from its neighbors changes
+#   4. flow directions (always to a lower hex, or along a flat to a smaller distance) and
+#      flow accumulation inside each chunk; for every hex on the chunk border, the hex in
+#      another chunk its water finally flows into
+#   5. (serial, only border hexes) the water entering each chunk from its neighbors,
+#      propagated along those border-to-border links across the whole world
+#   6. the entering water added along its path through each chunk
+# The filled levels and distances are exactly those of one flood over the whole world, so
+# flow never loops between chunks and rivers cross chunk borders as if there were none.
+
+WORLD_ARRAYS = {"elevation": np.uint16, "filled": np.uint16, "distance": np.uint32,
+                "direction": np.int8, "accumulation": np.uint32}
+WORLD_VERSION = 1
+
+# Not (yet) known distances, and a level above every filled level
+UNKNOWN_LEVEL = np.iinfo(np.uint16).max
+UNKNOWN_DISTANCE = np.iinfo(np.uint32).max
+
+# Hexes around a chunk read from its neighbors; even, so chunk windows start on even columns
+HALO = 2
+
+# Chunk of the world: rows r0..r1-1 and columns c0..c1-1
+Chunk = namedtuple("Chunk", ["r0", "c0", "r1", "c1"])
+
+# Cells read at once when rendering a window of the world
+RENDER_BAND_CELLS = 1 << 22
+
+def chunk_layout(rows, cols, chunk_size):
+    """Split a rows x cols world into chunks of chunk_size (an even number) hexes per side."""
+    return [Chunk(r0, c0, min(r0 + chunk_size, rows), min(c0 + chunk_size, cols))
+            for r0 in range(0, rows, chunk_size) for c0 in range(0, cols, chunk_size)]
+
+# (dr, dc) offsets of the chunks around a chunk
+NEIGHBOR_OFFSETS = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+
+def chunk_neighbors(chunks, chunk_size):
+    """Return, for each chunk, {(dr, dc): index} of the (up to 8) chunks around it."""
+    position = {(chunk.r0 // chunk_size, chunk.c0 // chunk_size): i for i, chunk in enumerate(chunks)}
+    return [{(dr, dc): position[(r + dr, c + dc)] for dr, dc in NEIGHBOR_OFFSETS if (r + dr, c + dc) in position}
+            for r, c in position]
+
+def touched_neighbors(changed):
+    """Return the (dr, dc) offsets of the neighboring chunks whose halo holds a changed hex of a chunk."""
+    bands = {-1: slice(0, HALO), 0: slice(None), 1: slice(-HALO, None)}
+    return [(dr, dc) for dr, dc in NEIGHBOR_OFFSETS if changed[bands[dr], bands[dc]].any()]
+
+def chunk_window(chunk, rows, cols, halo=HALO):
+    """Return (window, inner): the world slices of a chunk plus its halo, and the chunk's slices within that window."""
+    hr0, hc0 = max(0, chunk.r0 - halo), max(0, chunk.c0 - halo)
+    hr1, hc1 = min(rows, chunk.r1 + halo), min(cols, chunk.c1 + halo)
+    return ((slice(hr0, hr1), slice(hc0, hc1)),
+            (slice(chunk.r0 - hr0, chunk.r1 - hr0), slice(chunk.c0 - hc0, chunk.c1 - hc0)))
+
+def window_masks(window, inner, rows, cols):
+    """Return (in_chunk, world_edge) boolean masks over a chunk window."""
+    shape = (window[0].stop - window[0].start, window[1].stop - window[1].start)
+    in_chunk = np.zeros(shape, dtype=bool)
+    in_chunk[inner] = True
+    r = np.arange(window[0].start, window[0].stop)[:, None]
+    c = np.arange(window[1].start, window[1].stop)[None, :]
+    world_edge = (r == 0) | (r == rows - 1) | (c == 0) | (c == cols - 1)
+    return in_chunk, world_edge & in_chunk
+
+def array_path(world_dir, name):
+    return os.path.join(world_dir, f"{name}.npy")
+
+def open_world(world_dir, mode="r"):
+    """Return (metadata, {name: memmap}) of a generated world."""
+    with open(os.path.join(world_dir, "world.json")) as f:
+        meta = json.load(f)
+    return meta, {name: np.load(array_path(world_dir, name), mmap_mode=mode) for name in WORLD_ARRAYS}
+
+def create_world(world_dir, meta):
+    """Create the world directory with empty arrays and its world.json."""
+    os.makedirs(world_dir, exist_ok=True)
+    for name, dtype in WORLD_ARRAYS.items():
+        array = np.lib.format.open_memmap(array_path(world_dir, name), mode="w+", dtype=dtype, shape=(meta["rows"], meta["cols"]))
+        del array
+    tmp_path = os.path.join(world_dir, f"world.json.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(world_dir, "world.json"))
+
+def generate_elevation(world_dir, seed, chunk):
+    """Pass 1: write the elevation of a chunk."""
+    _, arrays = open_world(world_dir, "r+")
+    window = (slice(chunk.r0, chunk.r1), slice(chunk.c0, chunk.c1))
+    arrays["elevation"][window] = world_elevation(seed, np.arange(chunk.r0, chunk.r1), np.arange(chunk.c0, chunk.c1))
+    arrays["elevation"].flush()
+
+def lowest_passes(a, b, level):
+    """Return the (a, b, level) pairs with a < b, keeping only the lowest level of each pair."""
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    order = np.lexsort((level, b, a))
+    a, b, level = a[order], b[order], level[order]
+    first = np.ones(len(a), dtype=bool)
+    first[1:] = (a[1:] != a[:-1]) | (b[1:] != b[:-1])
+    return a[first], b[first], level[first]
+
+def flood_chunk(world_dir, chunk):
+    """
+    Pass 2a: priority-flood a chunk from its own border hexes, as if the rest of the world
+    were not there, and write those filled levels. Every hex is labeled with the border hex
+    its water drains to (label 1 + its world index, kept in the distance array until pass
+    2c). Returns (a, b, level): for each pair of touching labels a < b the lowest level at
+    which water passes between them, where label 0 is off the world edge and the labels of
+    the hexes just outside the chunk are those of the neighboring chunks.
+    """
+    _, arrays = open_world(world_dir, "r+")
+    rows, cols = arrays["elevation"].shape
+    window, inner = chunk_window(chunk, rows, cols, halo=1)
+    in_chunk, world_edge = window_masks(window, inner, rows, cols)
+    elevation = np.array(arrays["elevation"][window])
+    grid = HexGrid(elevation[inner])
+    filled, direction, _ = priority_flood(grid)
+
+    # Follow the hexes each hex was flooded from back to a border hex, doubling the
+    # distance jumped every step
+    cells = np.arange(grid.size)
+    root = grid.neighbor_index(cells, direction.ravel())
+    root = np.where(root < 0, cells, root)
+    while True:
+        jumped = root[root]
+        if (jumped == root).all():
+            break
+        root = jumped
+    r, c = grid.rowcol(root)
+    label = 1 + (r + chunk.r0) * cols + c + chunk.c0
+
+    # Water passes between touching labels at the higher of the two filled levels; one
+    # direction of each opposite pair visits every pair of neighbors once
+    flat_filled = filled.ravel().astype(np.int64)
+    passes = [[], [], []]
+    for d in (1, 2, 3):
+        neighbor = grid.neighbor_index(cells, d)
+        a, b = cells[neighbor >= 0], neighbor[neighbor >= 0]
+        touching = label[a] != label[b]
+        a, b = a[touching], b[touching]
+        for part, values in zip(passes, (label[a], label[b], np.maximum(flat_filled[a], flat_filled[b]))):
+            part.append(values)
+
+    # Border hexes pass water to the border hexes of the neighboring chunks, which are
+    # labeled by their own index, and off the world edge
+    window_grid = HexGrid(elevation)
+    window_label = np.zeros(elevation.shape, dtype=np.int64)
+    window_label[inner] = label.reshape(grid.shape)
+    r, c = border_cells(chunk)
+    border = (r + inner[0].start) * window_grid.cols + c + inner[1].start
+    flat_elevation = elevation.ravel().astype(np.int64)
+    flat_in_chunk = in_chunk.ravel()
+    for d in range(6):
+        neighbor = window_grid.neighbor_index(border, d)
+        outside = (neighbor >= 0) & ~flat_in_chunk[np.maximum(neighbor, 0)]
+        a, b = border[outside], neighbor[outside]
+        r, c = window_grid.rowcol(b)
+        passes[0].append(window_label.ravel()[a])
+        passes[1].append(1 + (r + window[0].start) * cols + c + window[1].start)
+        passes[2].append(np.maximum(flat_elevation[a], flat_elevation[b]))
+    edge = np.flatnonzero(world_edge)
+    passes[0].append(window_label.ravel()[edge])
+    passes[1].append(np.zeros(len(edge), dtype=np.int64))
+    passes[2].append(flat_elevation[edge])
+
+    arrays["filled"][chunk.r0:chunk.r1, chunk.c0:chunk.c1] = filled
+    arrays["distance"][chunk.r0:chunk.r1, chunk.c0:chunk.c1] = label.reshape(grid.shape)
+    arrays["filled"].flush()
+    arrays["distance"].flush()
+    return lowest_passes(*(np.concatenate(part) for part in passes))
+
+def solve_spill(passes):
+    """
+    Pass 2b: from the flood_chunk results of all chunks, return (labels, spill): every label
+    and the level water has to rise to in it before it can leave the world (a priority
+    flood over the graph of labels, starting off the world edge).
+    """
+    a, b, level = lowest_passes(*(np.concatenate(part) for part in zip(*passes)))
+    labels, index = np.unique(np.concatenate([a, b]), return_inverse=True)
+    source = index
+    target = np.concatenate([index[len(a):], index[:len(a)]])
+    level = np.concatenate([level, level])
+    order = np.argsort(source, kind="stable")
+    target, level = target[order].tolist(), level[order].tolist()
+    starts = np.searchsorted(source[order], np.arange(len(labels) + 1)).tolist()
+
+    spill = [None] * len(labels)
+    pending = [(0, 0)]   # label 0 (off the world edge) sorts first
+    while pending:
+        water, node = heapq.heappop(pending)
+        if spill[node] is not None:
+            continue
+        spill[node] = water
+        for i in range(starts[node], starts[node + 1]):
+            if spill[target[i]] is None:
+                heapq.heappush(pending, (max(water, level[i]), target[i]))
+    return labels, np.array(spill, dtype=np.int64)
+
+def apply_spill(world_dir, chunk, labels, spill):
+    """Pass 2c: raise the filled levels of a chunk to the spill level of their labels and clear the labels."""
+    _, arrays = open_world(world_dir, "r+")
+    window = (slice(chunk.r0, chunk.r1), slice(chunk.c0, chunk.c1))
+    level = spill[np.searchsorted(labels, arrays["distance"][window])]
+    arrays["filled"][window] = np.maximum(arrays["filled"][window], level)
+    arrays["distance"][window] = UNKNOWN_DISTANCE
+    arrays["filled"].flush()
+    arrays["distance"].flush()
+
+def flat_distances(grid, filled, movable, seeds, seed_distances):
+    """
+    Return the breadth-first distance of every hex from the seeds (flat indices, starting at
+    seed_distances), moving only between neighbors with equal filled levels and only into
+    movable hexes. Unreached hexes get UNKNOWN_DISTANCE.
+    """
+    distance = np.full(grid.size, UNKNOWN_DISTANCE, dtype=np.int64)
+    np.minimum.at(distance, seeds, seed_distances)
+    order = np.argsort(seed_distances, kind="stable")
+    seeds, seed_distances = seeds[order], np.asarray(seed_distances)[order]
+    flat_filled, movable = filled.ravel(), movable.ravel()
+    directions = np.arange(6, dtype=np.int8)
+    # Removes repeated hexes from a wave without sorting it: of the positions a hex was
+    # written at, only the one stored in stamp is kept
+    stamp = np.zeros(grid.size, dtype=np.int64)
+
+    def distinct(cells):
+        positions = np.arange(len(cells))
+        stamp[cells] = positions
+        return cells[stamp[cells] == positions]
+
+    frontier = np.zeros(0, dtype=np.int64)
+    start = 0
+    level = 0
+    while frontier.size or start < len(seeds):
+        if not frontier.size:
+            level = int(seed_distances[start])
+        # Seeds starting at this distance join the wave
+        end = np.searchsorted(seed_distances, level, side="right")
+        starting = seeds[start:end]
+        start = end
+        frontier = distinct(np.concatenate([frontier, starting[distance[starting] == level]]))
+        neighbors = grid.neighbor_index(frontier[:, None], directions[None, :])
+        sources = np.broadcast_to(frontier[:, None], neighbors.shape)
+        valid = neighbors >= 0
+        neighbors, sources = neighbors[valid], sources[valid]
+        step = movable[neighbors] & (flat_filled[neighbors] == flat_filled[sources]) & (distance[neighbors] > level + 1)
+        frontier = distinct(neighbors[step])
+        distance[frontier] = level + 1
+        level += 1
+    return distance.reshape(grid.shape)
+
+def drains_lower(grid, filled):
+    """Return a mask of the hexes with a neighbor at a lower filled level."""
+    cells = np.arange(grid.size)
+    flat_filled = filled.ravel()
+    lower = np.zeros(grid.size, dtype=bool)
+    for d in range(6):
+        neighbors = grid.neighbor_index(cells, d)
+        lower |= (neighbors >= 0) & (flat_filled[np.maximum(neighbors, 0)] < flat_filled)
+    return lower.reshape(grid.shape)
+
+def relax_distances(world_dir, chunk):
+    """
+    Pass 3: distances across the flats of a chunk to the nearest hex that drains lower (or
+    to the world edge), continuing the known distances of its halo. Returns the offsets of
+    the neighboring chunks whose halo changed (see touched_neighbors).
+    """
+    _, arrays = open_world(world_dir, "r+")
+    rows, cols = arrays["elevation"].shape
+    window, inner = chunk_window(chunk, rows, cols)
+    in_chunk, world_edge = window_masks(window, inner, rows, cols)
+    filled = np.array(arrays["filled"][window])
+    known = np.array(arrays["distance"][window]).astype(np.int64)
+    grid = HexGrid(filled)
+
+    outlets = in_chunk & (world_edge | drains_lower(grid, filled))
+    seeds = np.flatnonzero(outlets | (~in_chunk & (known != UNKNOWN_DISTANCE)))
+    distance = flat_distances(grid, filled, in_chunk, seeds, np.where(outlets, 0, known).ravel()[seeds])[inner]
+
+    changed = distance != known[inner]
+    if not changed.any():
+        return []
+    arrays["distance"][chunk.r0:chunk.r1, chunk.c0:chunk.c1] = distance
+    arrays["distance"].flush()
+    return touched_neighbors(changed)
+
+def flow_directions(grid, filled, distance, world_edge):
+    """
+    Return the flow direction of every hex: towards its lowest neighbor if one is lower,
+    otherwise along the flat towards a neighbor one step closer to its outlet. Hexes on the
+    world edge drain off the map. The first direction wins ties, so every chunk picks the
+    same direction for a hex.
+    """
+    cells = np.arange(grid.size)
+    flat_filled = filled.ravel().astype(np.int64)
+    flat_distance = distance.ravel().astype(np.int64)
+    lowest = flat_filled.copy()
+    direction = np.full(grid.size, NO_DIRECTION, dtype=np.int8)
+    neighbors = [grid.neighbor_index(cells, d) for d in range(6)]
+    for d, neighbor in enumerate(neighbors):
+        level = np.where(neighbor >= 0, flat_filled[neighbor], UNKNOWN_LEVEL)
+        lower = level < lowest
+        lowest[lower] = level[lower]
+        direction[lower] = d
+    for d, neighbor in enumerate(neighbors):
+        closer = ((direction == NO_DIRECTION) & (neighbor >= 0) & (flat_filled[neighbor] == flat_filled) &
+                  (flat_distance[neighbor] + 1 == flat_distance))
+        direction[closer] = d
+    direction[world_edge.ravel()] = NO_DIRECTION
+    return direction.reshape(grid.shape)
+
+def route_chunk(world_dir, chunk):
+    """
+    Pass 4: write the flow directions and the accumulation within a chunk.
+    Returns (border, links, exits, outflow): the world indices of the chunk's border hexes,
+    the hex outside the chunk each one finally flows into (or -1), and the hexes outside the
+    chunk receiving water directly from it with the amounts they receive.
+    """
+    _, arrays = open_world(world_dir, "r+")
+    rows, cols = arrays["elevation"].shape
+    window, inner = chunk_window(chunk, rows, cols)
+    in_chunk, world_edge = window_masks(window, inner, rows, cols)
+    filled = np.array(arrays["filled"][window])
+    distance = np.array(arrays["distance"][window])
+    grid = HexGrid(filled)
+    direction = flow_directions(grid, filled, distance, world_edge)
+
+    # Water only ever flows to a lower (filled, distance) key, so hexes grouped by key in
+    # ascending order are a topological order of the flow
+    cells = np.flatnonzero(in_chunk)
+    key = (filled.ravel()[cells].astype(np.int64) << 32) | distance.ravel()[cells]
+    order = np.argsort(key, kind="stable")
+    cells, key = cells[order], key[order]
+    batches = np.split(cells, np.flatnonzero(np.diff(key)) + 1)
+
+    # Accumulate only within the chunk: water flowing into the halo stops at the first halo
+    # hex, so the halo ends up holding what leaves the chunk and where it goes
+    local_direction = np.where(in_chunk, direction, NO_DIRECTION).astype(np.int8)
+    accumulation = flow_accumulation(grid, local_direction, batches, in_chunk)
+    halo_r, halo_c = np.nonzero(~in_chunk & (accumulation > 0))
+    exits = (halo_r + window[0].start) * cols + halo_c + window[1].start
+    outflow = accumulation[halo_r, halo_c]
+
+    chunk_direction = direction[inner]
+    arrays["direction"][chunk.r0:chunk.r1, chunk.c0:chunk.c1] = chunk_direction
+    arrays["accumulation"][chunk.r0:chunk.r1, chunk.c0:chunk.c1] = accumulation[inner]
+    arrays["direction"].flush()
+    arrays["accumulation"].flush()
+
+    r, c = border_cells(chunk)
+    links = follow_paths(chunk_direction, chunk, cols, r, c)
+    return (r + chunk.r0) * cols + c + chunk.c0, links, exits, outflow
+
+def border_cells(chunk):
+    """Return the (r, c) chunk-local coordinates of the hexes on the border of a chunk."""
+    rows, cols = chunk.r1 - chunk.r0, chunk.c1 - chunk.c0
+    border = np.zeros((rows, cols), dtype=bool)
+    border[[0, -1], :] = True
+    border[:, [0, -1]] = True
+    return np.nonzero(border)
+
+def follow_paths(direction, chunk, world_cols, r, c, amounts=None, accumulation=None):
+    """
+    Follow the flow from the chunk-local hexes (r, c) until it leaves the chunk, and return
+    the world flat index of the hex outside the chunk each path flows into (-1 if it ends
+    at the world edge). With amounts, add each path's amount to accumulation (the chunk's
+    window) on every hex it passes.
+    """
+    rows, cols = direction.shape
+    target = np.full(len(r), -1, dtype=np.int64)
+    active = np.arange(len(r))
+    while active.size:
+        if accumulation is not None:
+            np.add.at(accumulation, (r, c), amounts[active])
+        d = direction[r, c]
+        flowing = d != NO_DIRECTION
+        active, r, c, d = active[flowing], r[flowing], c[flowing], d[flowing]
+        # Chunks start on even columns, so chunk-local and world column parity agree
+        r, c = neighbor_rowcol(r, c, d)
+        inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+        target[active[~inside]] = (r[~inside] + chunk.r0) * world_cols + c[~inside] + chunk.c0
+        active, r, c = active[inside], r[inside], c[inside]
+    return target
+
+def resolve_inflows(routes):
+    """
+    Pass 5: from the route_chunk results of all chunks, return (border, inflow): every
+    border hex of the world and the water entering it from other chunks. Water entering a
+    border hex flows on to its link, so it is propagated along the links in topological order.
+    """
+    border = np.concatenate([route[0] for route in routes])
+    links = np.concatenate([route[1] for route in routes])
+    order = np.argsort(border)
+    border, links = border[order], links[order]
+
+    inflow = np.zeros(len(border), dtype=np.int64)
+    for _, _, exits, outflow in routes:
+        np.add.at(inflow, np.searchsorted(border, exits), outflow)
+    successor = np.where(links >= 0, np.searchsorted(border, np.maximum(links, 0)), -1)
+
+    pending = np.bincount(successor[successor >= 0], minlength=len(border))
+    ready = np.flatnonzero(pending == 0)
+    while ready.size:
+        ready = ready[successor[ready] >= 0]
+        targets = successor[ready]
+        np.add.at(inflow, targets, inflow[ready])
+        np.subtract.at(pending, targets, 1)
+        targets = np.unique(targets)
+        ready = targets[pending[targets] == 0]
+    if pending.any():
+        raise RuntimeError(f"{int((pending > 0).sum())} border hexes lie on flow cycles between chunks")
+    return border, inflow
+
+def add_inflow(world_dir, chunk, border, inflow):
+    """Pass 6: add the water entering a chunk along its paths through the chunk."""
+    _, arrays = open_world(world_dir, "r+")
+    cols = arrays["elevation"].shape[1]
+    r, c = np.divmod(border, cols)
+    window = (slice(chunk.r0, chunk.r1), slice(chunk.c0, chunk.c1))
+    direction = np.array(arrays["direction"][window])
+    accumulation = arrays["accumulation"][window].astype(np.int64)
+    follow_paths(direction, chunk, cols, r - chunk.r0, c - chunk.c0, inflow, accumulation)
+    arrays["accumulation"][window] = accumulation
+    arrays["accumulation"].flush()
+
+def relax_rounds(mapper, function, world_dir, chunks, neighbors):
+    """
+    Run function(world_dir, chunk) over all chunks, then again over the neighbors whose
+    halo it changed (function returns their offsets), until no halo changes. Returns the
+    number of chunk runs.
+    """
+    active = list(range(len(chunks)))
+    runs = 0
+    while active:
+        touched = list(mapper(function, [world_dir] * len(active), [chunks[i] for i in active]))
+        runs += len(active)
+        active = sorted({neighbors[i][offset] for i, offsets in zip(active, touched) for offset in offsets if offset in neighbors[i]})
+    return runs
+
+def generate_world(world_dir, rows, cols, seed, chunk_size=1024, jobs=0):
+    """
+    Generate a rows x cols world into world_dir in chunks of chunk_size hexes (see the
+    module comment), using jobs worker processes (0 = one per CPU, 1 = in this process).
+    """
+    if rows * cols >= UNKNOWN_DISTANCE:
+        raise ValueError(f"a world can have at most {UNKNOWN_DISTANCE - 1} hexes")
+    # Chunks start on even columns so hex neighbors agree with the world's
+    chunk_size = max(2, chunk_size + chunk_size % 2)
+    chunks = chunk_layout(rows, cols, chunk_size)
+    neighbors = chunk_neighbors(chunks, chunk_size)
+    create_world(world_dir, {"version": WORLD_VERSION, "rows": rows, "cols": cols, "seed": seed, "chunk_size": chunk_size})
+    dirs = [world_dir] * len(chunks)
+    workers = min(jobs or os.cpu_count() or 1, len(chunks))
+
+    start = time.perf_counter()
+    with (ProcessPoolExecutor(max_workers=workers) if workers > 1 else contextlib.nullcontext()) as executor:
+        mapper = executor.map if executor else map
+        list(mapper(generate_elevation, dirs, [seed] * len(chunks), chunks))
+        logging.debug(f"Elevation of {len(chunks)} chunks: {time.perf_counter() - start:.2f}s")
+        labels, spill = solve_spill(list(mapper(flood_chunk, dirs, chunks)))
+        list(mapper(apply_spill, dirs, chunks, [labels] * len(chunks), [spill] * len(chunks)))
+        logging.debug(f"Filled levels ({len(labels)} labels): {time.perf_counter() - start:.2f}s")
+        runs = relax_rounds(mapper, relax_distances, world_dir, chunks, neighbors)
+        logging.debug(f"Flat distances in {runs} chunk runs: {time.perf_counter() - start:.2f}s")
+        routes = list(mapper(route_chunk, dirs, chunks))
+        border, inflow = resolve_inflows(routes)
+        entering = inflow > 0
+        border, inflow = border[entering], inflow[entering]
+        r, c = np.divmod(border, cols)
+        per_chunk = [(r >= chunk.r0) & (r < chunk.r1) & (c >= chunk.c0) & (c < chunk.c1) for chunk in chunks]
+        list(mapper(add_inflow, dirs, chunks, [border[m] for m in per_chunk], [inflow[m] for m in per_chunk]))
+    logging.debug(f"World of {rows}x{cols} hexes: {time.perf_counter() - start:.2f}s")
+    return chunks
+
+def render_window(world_dir, r0, c0, rows, cols, max_pixels=1024, threshold=RIVER_THRESHOLD):
+    """
+    Return an RGB image of the window of rows x cols hexes at (r0, c0), at most max_pixels
+    per side. Only the window is read from the memory-mapped arrays, one band at a time;
+    each pixel shows the average elevation of its block of hexes, a lake if most of them
+    are under a filled depression, or else a river if any has one.
+    """
+    _, arrays = open_world(world_dir)
+    world_rows, world_cols = arrays["elevation"].shape
+    r0, c0 = max(0, r0), max(0, c0)
+    r1, c1 = min(world_rows, r0 + rows), min(world_cols, c0 + cols)
+    factor = max(1, -(-max(r1 - r0, c1 - c0) // max_pixels))
+    out_rows, out_cols = -(-(r1 - r0) // factor), -(-(c1 - c0) // factor)
+    image = np.empty((out_rows, out_cols, 3), dtype=np.uint8)
+    band = max(1, RENDER_BAND_CELLS // (factor * factor * out_cols))
+    for top in range(0, out_rows, band):
+        a, b = r0 + top * factor, min(r1, r0 + (top + band) * factor)
+        elevation = np.array(arrays["elevation"][a:b, c0:c1])
+        filled = arrays["filled"][a:b, c0:c1]
+        lake = (filled > elevation) & (filled >= SEA_LEVEL)
+        # Water crossing a lake runs in parallel lines over its flat surface; draw the lake instead
+        river = (arrays["accumulation"][a:b, c0:c1] >= threshold) & (elevation >= SEA_LEVEL) & ~lake
+        # Partial blocks at the window edge are padded with copies of their edge hexes
+        pad = ((0, -(b - a) % factor), (0, -(c1 - c0) % factor))
+        shape = (-(-(b - a) // factor), factor, out_cols, factor)
+        elevation = np.pad(elevation.astype(np.float32), pad, mode="edge").reshape(shape).mean(axis=(1, 3))
+        river = np.pad(river, pad).reshape(shape).any(axis=(1, 3))
+        lake = np.pad(lake, pad, mode="edge").reshape(shape).mean(axis=(1, 3)) > 0.5
+        rgb = TERRAIN_COLORS[np.rint(elevation).astype(np.intp)]
+        rgb[river | lake] = RIVER_COLOR
+        image[top:top + len(rgb)] = rgb
+    # Row 0 is the southernmost row; images are stored top row first
+    return image[::-1]
+
+def render_png(world_dir, r0, c0, rows, cols, max_pixels=1024, threshold=RIVER_THRESHOLD):
+    """Return render_window as PNG in an io.BytesIO positioned at 0."""
+    buffer = io.BytesIO()
+    matplotlib.image.imsave(buffer, render_window(world_dir, r0, c0, rows, cols, max_pixels, threshold), format="png")
+    buffer.seek(0)
+    return buffer
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate huge hex worlds in parallel chunks and render parts of them.")
+    parser.add_argument('world', help='World directory (memory-mapped .npy arrays and world.json)')
+    parser.add_argument('--verbose', action='store_true', help='Enable debug logging')
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help='Generate a new world')
+    generate.add_argument('--rows', type=int, default=4096, help='Rows of hexes (default: 4096)')
+    generate.add_argument('--cols', type=int, default=4096, help='Columns of hexes (default: 4096)')
+    generate.add_argument('--seed', type=int, default=1, help='World seed (default: 1)')
+    generate.add_argument('--chunk-size', type=int, default=1024, help='Hexes per chunk side (default: 1024)')
+    generate.add_argument('--jobs', type=int, default=0, help='Number of worker processes (default: 0 = one per CPU)')
+    render = commands.add_parser('render', help='Render a window of a generated world to PNG')
+    render.add_argument('output', help='PNG file to write')
+    render.add_argument('--window', type=int, nargs=4, metavar=('ROW', 'COL', 'ROWS', 'COLS'), help='Window to render (default: the whole world)')
+    render.add_argument('--pixels', type=int, default=1024, help='Largest image side in pixels (default: 1024)')
+    render.add_argument('--threshold', type=int, default=RIVER_THRESHOLD, help=f'Accumulation that makes a river (default: {RIVER_THRESHOLD})')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    if args.command == 'generate':
+        start = time.perf_counter()
+        chunks = generate_world(args.world, args.rows, args.cols, args.seed, args.chunk_size, args.jobs)
+        print(f"Generated {args.rows}x{args.cols} hexes in {len(chunks)} chunks into {args.world} in {time.perf_counter() - start:.2f}s")
+    else:
+        meta, _ = open_world(args.world)
+        window = args.window or (0, 0, meta["rows"], meta["cols"])
+        with open(args.output, 'wb') as f:
+            f.write(render_png(args.world, *window, args.pixels, args.threshold).getvalue())
+        print(f"Rendered {window[2]}x{window[3]} hexes at ({window[0]}, {window[1]}) to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The tools are flat script modules that import each other by name; the MCP server
+# also imports them as the Empyrion_Tool package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("Empyrion_Tool", "EmpyrionMCPServer", ""):
+    sys.path.insert(0, os.path.join(ROOT, directory))
@@ -0,0 +1,65 @@
+import os
+import pytest
+from blob_store import BlobStore, link_or_copy
+
+def test_hardlink_put_does_not_share_the_source_inode(tmp_path):
+    source = tmp_path / "backup.epb"
+    source.write_bytes(b"original blueprint")
+    store = BlobStore(str(tmp_path / "store"))
+    try:
+        digest = store.put(str(source), mode="hardlink")
+        blob = store.blob_path(digest)
+        assert os.stat(blob).st_ino != os.stat(source).st_ino
+        # The game rewrites save files in place
+        with open(source, "r+b") as f:
+            f.write(b"REWRITTEN")
+        with open(blob, "rb") as f:
+            assert f.read() == b"original blueprint"
+    finally:
+        store.close()
+
+def test_hardlink_checkout_does_not_share_the_blob_inode(tmp_path):
+    source = tmp_path / "backup.epb"
+    source.write_bytes(b"original blueprint")
+    dest = tmp_path / "Shared" / "2" / "backup.epb"
+    store = BlobStore(str(tmp_path / "store"))
+    try:
+        digest = store.put(str(source))
+        assert store.checkout(digest, str(dest), mode="hardlink") in ("reflink", "copy")
+        blob = store.blob_path(digest)
+        assert os.stat(blob).st_ino != os.stat(dest).st_ino
+        with open(dest, "r+b") as f:
+            f.write(b"REWRITTEN")
+        with open(blob, "rb") as f:
+            assert f.read() == b"original blueprint"
+    finally:
+        store.close()
+
+def test_corrupt_blob_is_not_checked_out(tmp_path):
+    source = tmp_path / "backup.epb"
+    source.write_bytes(b"original blueprint")
+    dest = tmp_path / "dest.epb"
+    store = BlobStore(str(tmp_path / "store"))
+    try:
+        digest = store.put(str(source))
+        with open(store.blob_path(digest), "r+b") as f:
+            f.write(b"X")
+        for mode in ("hardlink", "reflink", "copy"):
+            with pytest.raises(OSError, match="Checksum mismatch"):
+                store.checkout(digest, str(dest), mode)
+        assert not dest.exists()
+    finally:
+        store.close()
+
+def test_unknown_link_mode_is_rejected(tmp_path):
+    source = tmp_path / "backup.epb"
+    source.write_bytes(b"blueprint")
+    with pytest.raises(ValueError, match="reflink, hardlink, copy"):
+        link_or_copy(str(source), str(tmp_path / "copy.epb"), "bogus")
+
+def test_copy_backup_endpoint_rejects_unknown_link_mode(tmp_path):
+    from fastapi.testclient import TestClient
+    from main import app
+    response = TestClient(app).post("/copy_backup", json={
+        "src_game": "A", "src_id": "1", "dest_game": "B", "dest_id": "2", "saves": str(tmp_path), "link_mode": "bogus"})
+    assert response.status_code == 400
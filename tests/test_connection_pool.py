@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+import time
+
+import empyrion_common
+from empyrion_common import ConnectionPool
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    return conn
+
+
+def test_data_version_changes_on_commit(tmp_path):
+    db = str(tmp_path / "global.db")
+    writer = make_db(db)
+    pool = ConnectionPool()
+    first = pool.data_version(db)
+    assert pool.data_version(db) == first
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+    assert pool.data_version(db) != first
+    writer.close()
+    pool.close()
+
+
+def test_data_version_does_not_hold_pool_lock(tmp_path, monkeypatch):
+    db = str(tmp_path / "global.db")
+    make_db(db).close()
+    pool = ConnectionPool()
+    opened = threading.Event()
+    release = threading.Event()
+    connect = empyrion_common.connect_readonly
+
+    def slow_connect(path):
+        opened.set()
+        release.wait(5)
+        return connect(path)
+
+    monkeypatch.setattr(empyrion_common, "connect_readonly", slow_connect)
+    watcher = threading.Thread(target=pool.data_version, args=(db,))
+    watcher.start()
+    assert opened.wait(5)
+    # The pool lock is free while the watcher connection is being opened
+    assert pool._lock.acquire(timeout=1)
+    pool._lock.release()
+    release.set()
+    watcher.join()
+    pool.close()
+
+
+def test_borrowed_connections_are_limited_per_database(tmp_path):
+    db = str(tmp_path / "global.db")
+    make_db(db).close()
+    pool = ConnectionPool(max_per_db=2)
+    opened = []
+    release = threading.Event()
+
+    def borrow():
+        with pool.connection(db):
+            opened.append(1)
+            release.wait(5)
+
+    threads = [threading.Thread(target=borrow) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    # Only max_per_db borrowers got a connection, the others wait
+    assert len(opened) == 2
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(opened) == 4
+    assert not pool._borrowed
+    pool.close()
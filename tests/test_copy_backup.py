@@ -0,0 +1,118 @@
+import os
+import hashlib
+import sqlite3
+import pytest
+import snapshot
+import copy_backup
+from blob_store import BlobStore
+
+def truncate_on_fsync(monkeypatch):
+    """Make every file written by copy_hashed lose its last byte before it is synced."""
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        os.ftruncate(fd, os.fstat(fd).st_size - 1)
+        real_fsync(fd)
+    monkeypatch.setattr(snapshot.os, "fsync", fsync)
+
+def test_copy_verified_catches_short_write(tmp_path, monkeypatch):
+    src, dest = tmp_path / "src.epb", tmp_path / "dest.epb"
+    src.write_bytes(b"new blueprint")
+    dest.write_bytes(b"old blueprint")
+    truncate_on_fsync(monkeypatch)
+    with pytest.raises(OSError, match="Short write"):
+        copy_backup.copy_file(str(src), str(dest))
+    assert dest.read_bytes() == b"old blueprint"
+    assert sorted(os.listdir(tmp_path)) == ["dest.epb", "src.epb"]
+
+def test_copy_verified_reads_source_once(tmp_path, monkeypatch):
+    src, dest = tmp_path / "src.epb", tmp_path / "dest.epb"
+    src.write_bytes(b"new blueprint")
+    monkeypatch.setattr(copy_backup, "hash_file", None)
+    digest = copy_backup.copy_verified(str(src), str(dest))
+    assert digest == hashlib.sha256(b"new blueprint").hexdigest()
+    assert dest.read_bytes() == b"new blueprint"
+
+def test_copy_verified_checks_known_source_digest(tmp_path):
+    src, dest = tmp_path / "src.epb", tmp_path / "dest.epb"
+    src.write_bytes(b"new blueprint")
+    with pytest.raises(OSError, match="Checksum mismatch"):
+        copy_backup.copy_file(str(src), str(dest), src_digest="0" * 64)
+    assert not dest.exists()
+
+def test_store_catches_short_blob_write(tmp_path, monkeypatch):
+    src, dest = tmp_path / "src.epb", tmp_path / "dest.epb"
+    src.write_bytes(b"new blueprint")
+    truncate_on_fsync(monkeypatch)
+    store = BlobStore(str(tmp_path / "store"))
+    try:
+        with pytest.raises(OSError, match="Short write"):
+            copy_backup.copy_file(str(src), str(dest), store, "copy")
+        assert not dest.exists()
+        assert store.stats()["blobs"] == 0
+    finally:
+        store.close()
+
+def test_store_checks_copies_against_digest(tmp_path):
+    src, dest = tmp_path / "src.epb", tmp_path / "dest.epb"
+    src.write_bytes(b"new blueprint")
+    store = BlobStore(str(tmp_path / "store"))
+    try:
+        digest = store.put(str(src), "copy")
+        with open(store.blob_path(digest), "r+b") as f:
+            f.write(b"X")
+        with pytest.raises(OSError, match="Checksum mismatch"):
+            store.checkout(digest, str(dest), "copy")
+        assert not dest.exists()
+    finally:
+        store.close()
+
+def test_store_copy_round_trip(tmp_path):
+    src, dest = tmp_path / "src.epb", tmp_path / "dest.epb"
+    src.write_bytes(b"new blueprint")
+    store = BlobStore(str(tmp_path / "store"))
+    try:
+        copy_backup.copy_file(str(src), str(dest), store, "copy")
+    finally:
+        store.close()
+    assert dest.read_bytes() == b"new blueprint"
+
+def create_game(saves, game, entity_ids):
+    os.makedirs(saves / game)
+    conn = sqlite3.connect(saves / game / "global.db")
+    conn.execute("CREATE TABLE Entities (entityid INTEGER PRIMARY KEY, etype INTEGER)")
+    conn.executemany("INSERT INTO Entities VALUES (?, 4)", ((entityid,) for entityid in entity_ids))
+    conn.commit()
+    conn.close()
+    for entityid in entity_ids:
+        os.makedirs(saves / game / "Shared" / str(entityid))
+        (saves / game / "Shared" / str(entityid) / "backup.epb").write_bytes(f"{game} {entityid}".encode())
+
+def test_batch_reports_failures_per_item_and_game(tmp_path, monkeypatch):
+    saves = tmp_path / "Games"
+    for game in ("Source", "Locked", "Good"):
+        create_game(saves, game, [1, 2])
+    real_snapshot_database = copy_backup.snapshot_database
+    real_copy_file = copy_backup.copy_file
+
+    def snapshot_database(db_path, snapshot_dir, stem):
+        if "Locked" in db_path:
+            raise sqlite3.OperationalError("database is locked")
+        return real_snapshot_database(db_path, snapshot_dir, stem=stem)
+
+    def copy_file(src_path, dest_path, *args, **kwargs):
+        if dest_path.endswith(os.path.join("2", "backup.epb")):
+            raise sqlite3.DatabaseError("database disk image is malformed")
+        return real_copy_file(src_path, dest_path, *args, **kwargs)
+    monkeypatch.setattr(copy_backup, "snapshot_database", snapshot_database)
+    monkeypatch.setattr(copy_backup, "copy_file", copy_file)
+
+    items = [copy_backup.CopyItem("Source", "1", "Locked", "1"),
+             copy_backup.CopyItem("Source", "1", "Good", "1"),
+             copy_backup.CopyItem("Source", "2", "Good", "2")]
+    results = copy_backup.copy_backup_batch(items, str(saves), jobs=2, snapshot_dir=str(tmp_path / "snapshots"))
+    assert [result["success"] for result in results] == [False, True, False]
+    assert "database is locked" in results[0]["message"]
+    assert "malformed" in results[2]["message"]
+    assert (saves / "Good" / "Shared" / "1" / "backup.epb").read_bytes() == b"Source 1"
+    assert (saves / "Locked" / "Shared" / "1" / "backup.epb").read_bytes() == b"Locked 1"
@@ -0,0 +1,76 @@
+import sqlite3
+import argparse
+from entity_index import open_index, refresh_index, search_index
+from search_empyrion_entities import iter_entities
+
+# A save from before Entities.isremoved, Playfields and Structures existed
+OLD_SCHEMA = """
+CREATE TABLE Entities (entityid INTEGER PRIMARY KEY, name TEXT, etype INTEGER, playfield TEXT, facid INTEGER, facgroup INTEGER);
+INSERT INTO Entities VALUES (1000, 'Player 0', 1, 'Akua', 0, 0);
+INSERT INTO Entities VALUES (1001, 'SV Miner 1001', 4, 'Akua', 1000, 1);
+INSERT INTO Entities VALUES (1002, 'CV Hauler 1002', 3, 'Omicron', 0, 0);
+"""
+
+def search_args(saves, **overrides):
+    args = argparse.Namespace(
+        id=None, name=None, list=True, location=None, saves=saves, games=None, game=None,
+        type=None, owner=None, removed=False, jobs=1, index=None
+    )
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
+def create_old_save(saves):
+    db_file = saves / "OldGame" / "global.db"
+    db_file.parent.mkdir(parents=True)
+    conn = sqlite3.connect(db_file)
+    conn.executescript(OLD_SCHEMA)
+    conn.close()
+    return str(db_file)
+
+def test_index_reads_old_schema_save(tmp_path):
+    saves = tmp_path / "Games"
+    db_file = create_old_save(saves)
+    conn = open_index(str(tmp_path / "index.db"))
+    try:
+        assert refresh_index(conn, str(saves), [db_file]) == 1
+        indexed = list(search_index(conn, str(saves), [db_file], search_args(str(saves))))
+    finally:
+        conn.close()
+    live = list(iter_entities(search_args(str(saves))))
+    assert len(indexed) == 3
+    assert indexed == live
+    assert indexed[1].owner == "Player 0" and indexed[1].playfield == "Akua"
+
+def test_unreadable_save_is_not_recorded(tmp_path):
+    saves = tmp_path / "Games"
+    db_file = saves / "Broken" / "global.db"
+    db_file.parent.mkdir(parents=True)
+    sqlite3.connect(db_file).close()
+    conn = open_index(str(tmp_path / "index.db"))
+    try:
+        assert refresh_index(conn, str(saves), [str(db_file)]) == 0
+        assert conn.execute("SELECT COUNT(*) FROM saves").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+# Two entities named 'Player 0' (the live search resolves an owner name to the lowest
+# entityid) and a structure whose owner is missing from the save
+DUPLICATE_OWNERS = """
+INSERT INTO Entities VALUES (1003, 'Player 0', 1, 'Akua', 0, 0);
+INSERT INTO Entities VALUES (1004, 'BA Outpost 1004', 2, 'Akua', 1003, 1);
+INSERT INTO Entities VALUES (1005, 'SV Drifter 1005', 4, 'Omicron', 9999, 1);
+"""
+
+def test_index_and_live_search_return_the_same_rows(tmp_path):
+    saves = tmp_path / "Games"
+    db_file = create_old_save(saves)
+    conn = sqlite3.connect(db_file)
+    conn.executescript(DUPLICATE_OWNERS)
+    conn.close()
+    index_path = str(tmp_path / "index.db")
+    for overrides in ({}, {"owner": "Player 0"}, {"owner": "Nobody"}, {"name": "SV"}, {"location": "Akua"}):
+        live = list(iter_entities(search_args(str(saves), **overrides)))
+        indexed = list(iter_entities(search_args(str(saves), index=index_path, **overrides)))
+        assert indexed == live, overrides
+    assert [row.id for row in iter_entities(search_args(str(saves), index=index_path, owner="Player 0"))] == [1001]
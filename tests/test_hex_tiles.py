@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import os
+import hex_tiles
+from hex_grid import HexGrid
+from hex_tiles import TILE_SIZE, ensure_world, get_tile, render_tile, tile_path
+from terrain import RIVER_THRESHOLD, SEA_LEVEL, TERRAIN_COLORS
+from world_gen import open_world, render_window
+
+@pytest.fixture(scope="module")
+def cache_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("tiles"))
+
+@pytest.fixture(scope="module")
+def world_dir(cache_dir):
+    # A world of 2 x 2 tiles at full zoom
+    return ensure_world(cache_dir, 7, max_zoom=1, jobs=1)
+
+def test_neighbouring_tiles_join_seamlessly(world_dir):
+    tiles = {(x, y): render_tile(world_dir, 1, x, y) for x in (0, 1) for y in (0, 1)}
+    # Tile rows run north to south and tile y grows northwards
+    stitched = np.vstack([np.hstack([tiles[0, 1], tiles[1, 1]]), np.hstack([tiles[0, 0], tiles[1, 0]])])
+    assert (stitched == render_window(world_dir, 0, 0, 2 * TILE_SIZE, 2 * TILE_SIZE, 2 * TILE_SIZE)).all()
+
+def test_rivers_continue_across_tile_edges(world_dir):
+    _, arrays = open_world(world_dir)
+    river = (arrays["accumulation"] >= RIVER_THRESHOLD) & (arrays["elevation"] >= SEA_LEVEL)
+    grid = HexGrid(np.array(arrays["elevation"]))
+    edge = np.flatnonzero(river[:, TILE_SIZE - 1]) * grid.cols + TILE_SIZE - 1
+    downstream = grid.neighbor_index(edge, np.array(arrays["direction"]).ravel()[edge])
+    crossing = downstream[(downstream >= 0) & (grid.rowcol(downstream)[1] == TILE_SIZE)]
+    assert crossing.size
+    assert (np.array(arrays["accumulation"]).ravel()[crossing] >= RIVER_THRESHOLD).all()
+
+def test_lower_zoom_and_outside_tiles(world_dir):
+    assert render_tile(world_dir, 0, 0, 0).shape == (TILE_SIZE, TILE_SIZE, 3)
+    assert (render_tile(world_dir, 1, -1, 0) == TERRAIN_COLORS[0]).all()
+
+def test_get_tile_caches_on_disk(cache_dir, world_dir):
+    png = get_tile(7, 1, 1, 0, cache_dir, max_zoom=1)
+    assert png.startswith(b"\x89PNG")
+    assert os.path.isfile(tile_path(cache_dir, 7, 1, 1, 0, max_zoom=1))
+    assert get_tile(7, 1, 1, 0, cache_dir, max_zoom=1) is png
+
+def test_zoom_beyond_the_world_is_rejected(cache_dir, world_dir):
+    with pytest.raises(ValueError, match="zoom"):
+        render_tile(world_dir, 2, 0, 0)
+    with pytest.raises(ValueError, match="zoom"):
+        get_tile(7, 2, 0, 0, cache_dir, max_zoom=1)
+
+def test_tiles_of_a_missing_world_are_generated_in_the_background(tmp_path):
+    cache_dir = str(tmp_path)
+    assert get_tile(8, 0, 0, 0, cache_dir, wait=False, max_zoom=0) is None
+    for thread in list(hex_tiles.world_builds.values()):
+        thread.join()
+    assert os.path.isdir(hex_tiles.world_path(cache_dir, 8, max_zoom=0))
+    assert get_tile(8, 0, 0, 0, cache_dir, wait=False, max_zoom=0).startswith(b"\x89PNG")
+
+def test_tile_route_answers_503_until_the_world_exists(tmp_path, monkeypatch):
+    import geography
+    monkeypatch.setattr(geography, "TILE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(hex_tiles, "start_world", lambda cache_dir, seed, max_zoom: None)
+    client = geography.app.test_client()
+    response = client.get("/tiles/9/0/0/0")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert client.get(f"/tiles/9/{hex_tiles.MAX_ZOOM + 1}/0/0").status_code == 404
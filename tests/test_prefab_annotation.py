@@ -0,0 +1,31 @@
+import zipfile
+
+from entity_query import EntityRow
+
+
+def test_annotation_runs_outside_prefab_lock(tmp_path, monkeypatch):
+    import main
+    prefabs = tmp_path / "Prefabs"
+    prefabs.mkdir()
+    with zipfile.ZipFile(prefabs / "BaseA.epb", "w") as z:
+        z.writestr("blueprint", b"data")
+    monkeypatch.setattr(main, "PREFAB_CATALOG", str(tmp_path / "catalog.db"))
+    monkeypatch.setattr(main, "prefab_catalog", None)
+    monkeypatch.setattr(main, "prefab_refreshed", {})
+    rows = [EntityRow("db", "BaseA", "sys", "pf", 1, "o", "BA", "a"),
+            EntityRow("db", "Gone", "sys", "pf", 2, "o", "BA", "b")]
+
+    lock_free = []
+    annotate = main.search_empyrion_entities.annotate_prefabs
+
+    def checking_annotate(*args):
+        lock_free.append(main.prefab_lock.acquire(blocking=False))
+        if lock_free[-1]:
+            main.prefab_lock.release()
+        return annotate(*args)
+
+    monkeypatch.setattr(main.search_empyrion_entities, "annotate_prefabs", checking_annotate)
+    for _ in range(2):
+        annotated = main.with_prefabs(rows, str(prefabs))
+        assert [r.prefab for r in annotated] == ["BaseA.epb", "missing"]
+    assert lock_free == [True, True]
@@ -0,0 +1,25 @@
+import main
+
+def search_args(**overrides):
+    fields = dict(id=None, name=None, list=False, location=None, saves="Games", games=None, game=None,
+                  prefabs=None, verbose=False, man=False, type=None, owner=None, removed=False, jobs=1)
+    fields.update(overrides)
+    return main.make_search_args(**fields)
+
+def test_requests_cannot_start_their_own_search_threads():
+    assert search_args(jobs=0).jobs == 1
+    assert search_args(jobs=64).jobs == 1
+
+def test_list_and_plain_searches_do_not_share_a_cache_entry():
+    assert main.search_cache_key(search_args(list=True), []) != main.search_cache_key(search_args(), [])
+
+def test_result_cache_is_limited_by_rows():
+    cache = main.LRUCache(max_entries=10, max_weight=5, weigh=lambda page: len(page[0]))
+    cache.put("a", ([1, 2, 3], None))
+    cache.put("b", ([1, 2], None))
+    cache.put("c", ([1, 2], None))
+    assert cache.get("a") is None
+    assert cache.stats()["weight"] == 4
+    cache.put("huge", (list(range(6)), None))
+    assert cache.get("huge") is None
+    assert cache.get("b") and cache.get("c")
@@ -0,0 +1,34 @@
+import gzip
+import sqlite3
+import threading
+from snapshot import snapshot_database
+
+def test_concurrent_snapshots_of_one_database(tmp_path):
+    db_path = tmp_path / "global.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE Entities (entityid INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO Entities VALUES (?, ?)", ((i, "x" * 200) for i in range(5000)))
+    conn.commit()
+    conn.close()
+    snapshot_dir = tmp_path / "snapshots"
+    results, errors = [], []
+
+    def take():
+        try:
+            results.append(snapshot_database(str(db_path), str(snapshot_dir), pages_per_step=8, pause=0.001))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=take) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    for path in results:
+        restored = tmp_path / "restored.db"
+        restored.write_bytes(gzip.open(path).read())
+        conn = sqlite3.connect(restored)
+        assert conn.execute("SELECT COUNT(*) FROM Entities").fetchone()[0] == 5000
+        conn.close()
+    assert not [name for name in snapshot_dir.iterdir() if name.name.endswith(".tmp")]
@@ -0,0 +1,17 @@
+import os
+from fake_saves import generate_saves
+from update_entities import update_all_saves
+
+def test_all_saves_print_their_messages_in_save_order(tmp_path, capfd):
+    generate_saves(str(tmp_path), saves=2, entities=200, structures=50, blueprints=1, seed=3)
+    games_dir = tmp_path / "Saves" / "Games"
+    results = update_all_saves(str(games_dir), jobs=2, snapshot_dir=str(tmp_path / "snapshots"))
+    out = capfd.readouterr().out
+    positions = []
+    for db_file, stats, _ in results:
+        assert "error" not in stats
+        backup = out.index(f"Backup created: {os.path.join(str(tmp_path / 'snapshots'), os.path.basename(os.path.dirname(db_file)))}")
+        success = out.index(f"Changes saved in {db_file}")
+        positions += [backup, success]
+    # Each save's lines come as one block, saves in order
+    assert positions == sorted(positions)
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from flow_routing import route_flow
+from hex_grid import HexGrid, NO_DIRECTION
+from world_gen import generate_world, open_world
+
+@pytest.mark.parametrize("rows, cols, chunk_size", [(130, 90, 40), (96, 160, 32)])
+def test_chunked_world_matches_one_chunk(tmp_path, rows, cols, chunk_size):
+    generate_world(str(tmp_path / "chunked"), rows, cols, 11, chunk_size=chunk_size, jobs=1)
+    generate_world(str(tmp_path / "single"), rows, cols, 11, chunk_size=max(rows, cols), jobs=1)
+    _, chunked = open_world(str(tmp_path / "chunked"))
+    _, single = open_world(str(tmp_path / "single"))
+    for name in ("elevation", "filled", "distance", "direction", "accumulation"):
+        assert (chunked[name] == single[name]).all(), name
+    # Filled levels are those of one priority flood over the whole world
+    assert (route_flow(HexGrid(np.array(chunked["elevation"]))).filled == chunked["filled"]).all()
+    # Every hex drains off the world exactly once
+    assert chunked["accumulation"][np.array(chunked["direction"]) == NO_DIRECTION].sum() == rows * cols